@@ -0,0 +1,26 @@
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.retention import RetentionManager
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one retention/compaction pass on the logs DB.")
+    parser.add_argument("--db_path", type=str, default="data/target/logs.duckdb", help="Path to the logs database.")
+    parser.add_argument("--config", type=str, default="config/retention_config.yaml", help="Retention config (relative to project root).")
+    args = parser.parse_args()
+
+    # Needs the write lock: use this when no ingestion worker is running.
+    # The worker runs the same passes in the background on its own.
+    db = DuckDBConnector(db_path=args.db_path)
+    try:
+        RetentionManager(db, config_path=args.config).apply()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
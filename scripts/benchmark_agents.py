@@ -25,6 +25,8 @@ def main():
         print("\n📊 SQL Generation Results:")
         print(df)
         print(f"Average Score: {df['score'].mean():.2f}")
+        print(f"Valid SQL Rate: {df['valid'].mean():.2f}")
+        print(f"LLM Calls per Question: {df['attempts'].mean():.2f} (wasted: {(df['attempts'] - 1).sum()})")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,162 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Add project root and the bulk loader to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(ROOT)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/bulk-loader/src")))
+
+from scripts.generate_corpus import generate_corpus
+from shared.db.duckdb_client import DuckDBConnector
+from shared.log_schema import LogRecord
+from shared.utils.log_parser import LogParser
+from shared.utils.pii_masker import PIIMasker
+from shared.utils.template_miner import LogTemplateMiner
+
+BATCH_SIZE = 2000 # As the bulk loader
+
+def read_lines(directory: str) -> List[str]:
+    lines = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            lines.extend(f)
+    return lines
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+# Each stage gets the raw sample lines, prepares its own input untimed, and reports the timed seconds
+def stage_parse(lines: List[str]) -> Dict[str, Any]:
+    parser = LogParser()
+    return {"seconds": timed(lambda: [parser.parse(line) for line in lines])}
+
+def stage_mask(lines: List[str]) -> Dict[str, Any]:
+    parser, masker = LogParser(), PIIMasker()
+    bodies = [parser.parse(line)["body"] for line in lines]
+    return {"seconds": timed(lambda: [masker.mask_text(body) for body in bodies])}
+
+def mined_records(lines: List[str], miner: LogTemplateMiner) -> List[LogRecord]:
+    parser, masker = LogParser(), PIIMasker()
+    records = []
+    for line in lines:
+        parsed = parser.parse(line)
+        template_id, template = miner.mine_template_with_id(masker.mask_text(parsed["body"]))
+        records.append(LogRecord(timestamp=parsed["timestamp"], severity=parsed["severity"],
+                                 service_name=parsed["service_name"], body=template, template_id=template_id,
+                                 host=parsed.get("context", {}).get("host"), context=parsed.get("context", {})))
+    return records
+
+def stage_mine(lines: List[str]) -> Dict[str, Any]:
+    parser, masker = LogParser(), PIIMasker()
+    bodies = [masker.mask_text(parser.parse(line)["body"]) for line in lines]
+    miner = LogTemplateMiner("data/state/bench_drain.bin")
+    seconds = timed(lambda: [miner.mine_template_with_id(body) for body in bodies])
+    return {"seconds": seconds, "templates": miner.get_total_clusters()}
+
+def stage_insert(lines: List[str]) -> Dict[str, Any]:
+    records = mined_records(lines, LogTemplateMiner("data/state/bench_insert_drain.bin"))
+    db = DuckDBConnector(db_path="data/target/bench_insert.duckdb")
+    batches = [records[i:i + BATCH_SIZE] for i in range(0, len(records), BATCH_SIZE)]
+    seconds = timed(lambda: [db.insert_batch(batch) for batch in batches])
+    db.close()
+    return {"seconds": seconds}
+
+STAGES = {"LogParser.parse": stage_parse, "PIIMasker.mask_text": stage_mask,
+          "LogTemplateMiner.mine": stage_mine, "DuckDB insert_batch": stage_insert}
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process or its largest child (ru_maxrss is in KB on Linux)."""
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+
+def run_stage(name: str, sample_dir: str, conn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        lines = read_lines(sample_dir)
+        result = STAGES[name](lines)
+    conn.send({**result, "lines": len(lines), "bytes": sum(map(len, lines)), "peak_rss_mb": peak_rss_mb()})
+
+def run_end_to_end(landing: str, read_workers: int, mining_workers: int, native: bool, conn):
+    from log_loader import BulkLoaderJob
+    with contextlib.redirect_stdout(io.StringIO()):
+        job = BulkLoaderJob(mining_workers=mining_workers, read_workers=read_workers, native=native, discovery=False)
+        seconds = timed(lambda: job.run(landing))
+        lines = job.db.query("SELECT count(*) FROM logs")[0][0]
+        job.db.close()
+    size = sum(os.path.getsize(os.path.join(landing, name)) for name in os.listdir(landing))
+    conn.send({"lines": lines, "bytes": size, "seconds": seconds, "peak_rss_mb": peak_rss_mb(),
+               "busy_sec": {name: stage["busy_sec"] for name, stage in job.profiler.totals().items() if stage["items"]}})
+
+def in_child(target, *args) -> Dict[str, Any]:
+    """Runs one measurement in a fresh process, so its peak RSS is its own."""
+    ctx = mp.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=target, args=(*args, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        process.join()
+        raise RuntimeError(f"{target.__name__}{args[:1]} exited with code {process.exitcode}")
+    process.join()
+    return {**result, "lines_per_sec": result["lines"] / result["seconds"],
+            "mb_per_sec": result["bytes"] / 1e6 / result["seconds"]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage and end-to-end ingestion throughput on a synthetic corpus.")
+    parser.add_argument("--megabytes", type=int, default=1024, help="Corpus size for the end-to-end bulk load.")
+    parser.add_argument("--sample_mb", type=int, default=32, help="Corpus size for the per-stage runs (held in memory, so part of their peak RSS).")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed.")
+    parser.add_argument("--pii_density", type=float, default=0.05, help="Share of lines carrying PII.")
+    parser.add_argument("--read_workers", type=int, default=0, help="Bulk loader parse/mask processes.")
+    parser.add_argument("--mining_workers", type=int, default=0, help="Bulk loader mining processes.")
+    parser.add_argument("--no_native", action="store_true", help="Parse JSON lines in Python instead of DuckDB.")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON.")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        sample_dir, landing = os.path.join(workdir, "sample"), os.path.join(workdir, "landing")
+        workers = (os.cpu_count() or 1) - 1
+        generate_corpus(sample_dir, args.sample_mb, args.seed + 1, pii_density=args.pii_density, workers=workers)
+        if args.megabytes:
+            generate_corpus(landing, args.megabytes, args.seed, pii_density=args.pii_density, workers=workers)
+        print(f"⏱️  Stages on {args.sample_mb} MB, end to end on {args.megabytes} MB ({os.cpu_count()} CPUs)")
+
+        for name in STAGES:
+            results[name] = in_child(run_stage, name, sample_dir)
+            templates = results[name].get("templates")
+            print(f"   {name}: {results[name]['lines_per_sec']:,.0f} lines/s"
+                  f"{f' ({templates:,} templates)' if templates else ''}")
+        if args.megabytes:
+            label = f"bulk loader end to end{'' if args.no_native else ' (JSON via DuckDB)'}"
+            results[label] = in_child(run_end_to_end, landing, args.read_workers, args.mining_workers,
+                                      not args.no_native)
+        os.chdir(ROOT)
+
+    print(f"\n{'Stage':<40}{'lines':>12}{'lines/s':>12}{'MB/s':>9}{'peak RSS MB':>13}")
+    for name, result in results.items():
+        print(f"{name:<40}{result['lines']:>12,}{result['lines_per_sec']:>12,.0f}"
+              f"{result['mb_per_sec']:>9.1f}{result['peak_rss_mb']:>13,.0f}")
+    if output:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump({"config": {key: value for key, value in vars(args).items() if key != "output"},
+                       "cpus": os.cpu_count(), "stages": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+if __name__ == "__main__":
+    main()
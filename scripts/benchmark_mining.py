@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from shared.utils.template_miner import LogTemplateMiner
+from shared.utils.sharded_miner import ShardedTemplateMiner, tree_stats
+
+WORDS = ["request", "user", "cache", "query", "session", "token", "payment", "order", "disk", "queue"]
+VERBS = ["started", "failed", "completed", "timed out", "retried", "rejected"]
+
+def build_corpus(count: int, services: int, templates: int, seed: int):
+    """Each service emits its own template family, with variable ids/durations."""
+    rng = random.Random(seed)
+    families = {}
+    for s in range(services):
+        service = f"svc-{s:02d}"
+        families[service] = [
+            f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(VERBS)} for {rng.choice(WORDS)}" + " {} after {} ms" * rng.randint(1, 3)
+            for _ in range(templates)
+        ]
+    names = list(families)
+    corpus = []
+    for _ in range(count):
+        service = rng.choice(names)
+        template = rng.choice(families[service])
+        corpus.append((service, template.format(*[rng.randrange(10000) for _ in range(template.count("{}"))])))
+    return corpus
+
+def summarize(stats):
+    trees = list(stats.values())
+    return {
+        "trees": len(trees),
+        "clusters": sum(t["clusters"] for t in trees),
+        "max_tree_clusters": max(t["clusters"] for t in trees),
+        "max_tree_nodes": max(t["nodes"] for t in trees),
+        "max_leaf": max(t["max_leaf"] for t in trees),
+    }
+
+def run_single(corpus, workdir):
+    miner = LogTemplateMiner(persistence_file=os.path.join(workdir, "single", "state.bin"))
+    started = time.perf_counter()
+    for _, message in corpus:
+        miner.mine_template_with_id(message)
+    elapsed = time.perf_counter() - started
+    stats = summarize({"all": tree_stats(miner)})
+    miner.close()
+    return elapsed, stats
+
+def run_sharded(corpus, workdir, processes, batch_size):
+    miner = ShardedTemplateMiner(state_dir=os.path.join(workdir, f"sharded-{processes}"), processes=processes)
+    miner.mine_batch(corpus[:1]) # Exclude worker start-up from the timing
+    started = time.perf_counter()
+    for i in range(0, len(corpus), batch_size):
+        miner.mine_batch(corpus[i:i + batch_size])
+    elapsed = time.perf_counter() - started
+    stats = summarize(miner.tree_stats())
+    miner.close()
+    return elapsed, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-tree and per-service sharded template mining.")
+    parser.add_argument("--count", type=int, default=200000, help="Messages to mine.")
+    parser.add_argument("--services", type=int, default=16, help="Distinct services.")
+    parser.add_argument("--templates", type=int, default=40, help="Templates per service.")
+    parser.add_argument("--processes", type=str, default="0,2,4", help="Worker process counts to try (0 = in-process shards).")
+    parser.add_argument("--batch_size", type=int, default=5000, help="Messages per mine_batch call.")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed.")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count, args.services, args.templates, args.seed)
+    print(f"⛏️  Mining {len(corpus)} messages from {args.services} services ({os.cpu_count()} CPUs)")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [("single tree", *run_single(corpus, workdir))]
+        for processes in [int(p) for p in args.processes.split(",")]:
+            label = f"sharded x{processes} proc" if processes else "sharded in-process"
+            results.append((label, *run_sharded(corpus, workdir, processes, args.batch_size)))
+
+    print(f"\n{'Mode':<22}{'msgs/sec':>12}{'trees':>7}{'clusters':>10}{'max tree':>10}{'max nodes':>11}{'max leaf':>10}")
+    for label, elapsed, s in results:
+        print(f"{label:<22}{len(corpus) / elapsed:>12.0f}{s['trees']:>7}{s['clusters']:>10}"
+              f"{s['max_tree_clusters']:>10}{s['max_tree_nodes']:>11}{s['max_leaf']:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.pii_backfill import PIIBackfill
+from shared.utils.pii_masker import PIIMasker
+
+# Bodies as they sit in `logs` after mining; a few carry PII that predates a rule
+SYNTHETIC_LOGS = """
+    INSERT INTO logs (timestamp, severity, service_name, body, context, template_id)
+    SELECT
+        TIMESTAMP '2025-01-01' + to_milliseconds(i),
+        CASE WHEN i % 10 = 0 THEN 'ERROR' ELSE 'INFO' END,
+        'svc-' || (i % 8),
+        CASE
+            WHEN i % 100 < ? THEN 'Refund sent to user' || (i % 997) || '@example.com from 10.1.' || (i % 250) || '.7'
+            WHEN i % 2 = 0 THEN 'Payment processed for order <*> in <*> ms'
+            ELSE 'Cache miss for key session:<*>'
+        END,
+        json_object('user_id', (i % 5000)::VARCHAR, 'order_id', i),
+        (i % 3)::VARCHAR
+    FROM range(?) t(i)
+"""
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="rows/sec of the mask_pii UDF and the in-place PII backfill.")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Rows in the synthetic logs table.")
+    parser.add_argument("--pii_percent", type=int, default=2, help="Share of rows whose body holds PII.")
+    parser.add_argument("--workers", type=int, default=None, help="Backfill workers (default: one per CPU).")
+    parser.add_argument("--chunk_rows", type=int, default=1_000_000, help="Rows per backfill range.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        db = DuckDBConnector(db_path=os.path.join(workdir, "logs.duckdb"))
+        db.conn.execute(SYNTHETIC_LOGS, [args.pii_percent, args.rows])
+        print(f"📚 {args.rows:,} rows, {args.pii_percent}% with PII ({os.cpu_count()} CPUs)")
+
+        masker = PIIMasker()
+        masker.register(db.conn)
+        sample = [row[0] for row in db.conn.execute("SELECT body FROM logs LIMIT 200000").fetchall()]
+        _, python_seconds = timed(lambda: [masker.mask_text(body) for body in sample])
+        _, udf_seconds = timed(lambda: db.conn.execute("SELECT count(mask_pii(body)) FROM logs").fetchall())
+
+        backfill = PIIBackfill(db, masker, chunk_rows=args.chunk_rows, workers=args.workers)
+        first = backfill.run(["logs"])["logs"]
+        again = backfill.run(["logs"])["logs"]
+        db.close()
+
+    print(f"\n{'Pass':<36}{'rows/s':>14}")
+    print(f"{'mask_text per row (Python)':<36}{len(sample) / python_seconds:>14,.0f}")
+    print(f"{'mask_pii UDF in a SELECT':<36}{args.rows / udf_seconds:>14,.0f}")
+    print(f"{'backfill, rewriting PII rows':<36}{first['rows_per_sec']:>14,.0f}")
+    print(f"{'backfill, nothing left to mask':<36}{again['rows_per_sec']:>14,.0f}")
+
+if __name__ == "__main__":
+    main()
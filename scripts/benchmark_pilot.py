@@ -0,0 +1,243 @@
+import argparse
+import contextlib
+import contextvars
+import functools
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+import yaml
+
+# Add project root to path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.append(ROOT)
+
+from shared.llm.client import LLMClient
+from shared.llm.stub_server import StubLLMServer
+from shared.log_schema import LogEvent
+from services.evaluator.src.fixture import build_fixture, fixture_rows
+
+NODES = ["rewrite_query", "classify_intent", "generate_sql", "validate_sql",
+         "execute_sql", "retrieve_context", "synthesize_answer"]
+
+# Canned traffic. `sql` answers the first attempt; `fixed` answers a retry after a rejection.
+QUERIES = [
+    {"query": "How many errors in auth-service?", "intent": "sql",
+     "sql": "SELECT count(*) FROM logs WHERE service_name='auth-service' AND severity='ERROR'"},
+    {"query": "Errors per service per hour", "intent": "sql",
+     "sql": "SELECT date_trunc('hour', timestamp) AS hour, service_name, count(*) FROM logs "
+            "WHERE severity='ERROR' GROUP BY ALL ORDER BY hour DESC LIMIT 50"},
+    {"query": "Show the 10 slowest requests", "intent": "sql",
+     "sql": "SELECT timestamp, service_name, body FROM logs "
+            "ORDER BY (context->>'latency_ms')::INT DESC LIMIT 10"},
+    {"query": "Average latency by service", "intent": "sql",
+     "sql": "SELECT service_name, avg(latency) FROM logs GROUP BY 1",
+     "fixed": "SELECT service_name, avg((context->>'latency_ms')::INT) FROM logs GROUP BY 1"},
+    {"query": "List them", "rewritten": "List errors in payment-service", "intent": "sql",
+     "sql": "SELECT * FROM logs WHERE service_name='payment-service' AND severity='ERROR' "
+            "ORDER BY timestamp DESC LIMIT 50",
+     "messages": [{"role": "user", "content": "How many errors in payment-service?"},
+                  {"role": "assistant", "content": "I found 42 errors in payment-service."}]},
+    {"query": "Why are payments being declined?", "intent": "rag"},
+    {"query": "How do I fix upstream timeouts?", "intent": "rag"},
+    {"query": "Hello", "intent": "ambiguous"},
+]
+CANNED = {item.get("rewritten", item["query"]): item for item in QUERIES}
+
+def section(prompt: str, header: str) -> str:
+    """The text under a `### header` of a rendered prompt, up to the next header."""
+    return prompt.split(f"### {header}", 1)[-1].split("###", 1)[0].strip()
+
+def rewrite(prompt: str) -> str:
+    question = section(prompt, "User Question")
+    for item in QUERIES:
+        if item["query"] == question:
+            return item.get("rewritten", question)
+    return question
+
+def classify(prompt: str) -> str:
+    return CANNED.get(section(prompt, "User Query"), {}).get("intent", "ambiguous")
+
+def write_sql(prompt: str) -> str:
+    item = CANNED.get(section(prompt, "User Question"), {})
+    if "### Previous Attempt" in prompt:
+        return item.get("fixed", item.get("sql", "SELECT 1"))
+    return item.get("sql", "SELECT 1")
+
+STUB_RULES = [
+    # LlamaIndex's text QA template, sent by KnowledgeStore.query
+    ("Context information is below", "Declines and timeouts follow upstream errors; retry with backoff."),
+    ("### Rewritten Query", rewrite),
+    ("### Intent", classify),
+    ("### SQL Query", write_sql),
+    ("### Context", "I found the answer in your logs. ✅"),
+]
+
+_trace: contextvars.ContextVar = contextvars.ContextVar("trace")
+
+def timed_node(name: str, fn, client: LLMClient):
+    """Records (node, seconds, llm calls) into the running request's trace."""
+    @functools.wraps(fn)
+    def node(state):
+        started = time.perf_counter()
+        with client.track_usage() as usage:
+            try:
+                return fn(state)
+            finally:
+                _trace.get().append((name, time.perf_counter() - started, usage["calls"]))
+    return node
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1), "p99_ms": round(float(p99), 1)}
+
+def build_kb(client: LLMClient, docs: int, seed: int):
+    """Chroma fixture with constant mock embeddings; the query engine answers through the stub."""
+    from llama_index.core import Settings
+    from llama_index.core.embeddings import MockEmbedding
+    from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+    from llama_index.core.llms.callbacks import llm_completion_callback
+    from services.knowledge_base.src.store import KnowledgeStore
+
+    class ClientLLM(CustomLLM):
+        """Routes LlamaIndex completions through LLMClient, so they count as the node's calls."""
+        client: Any = None
+
+        @property
+        def metadata(self) -> LLMMetadata:
+            return LLMMetadata(model_name="stub")
+
+        @llm_completion_callback()
+        def complete(self, prompt: str, formatted: bool = False, **kwargs) -> CompletionResponse:
+            return CompletionResponse(text=self.client.generate(prompt))
+
+        @llm_completion_callback()
+        def stream_complete(self, prompt: str, formatted: bool = False, **kwargs):
+            yield self.complete(prompt)
+
+    Settings.llm = ClientLLM(client=client)
+    kb = KnowledgeStore(embed_model=MockEmbedding(embed_dim=384))
+    records = fixture_rows(docs, seed)
+    logs = [LogEvent(**{key: record[key] for key in ("timestamp", "severity", "service_name", "body", "context")})
+            for record in records]
+    kb.add_logs(logs, doc_ids=[f"fixture-{i}" for i in range(len(logs))])
+    return kb
+
+def run_request(graph, item: dict) -> Dict[str, Any]:
+    trace = []
+    _trace.set(trace)
+    state = {"query": item["query"], "messages": item.get("messages", []), "retry_count": 0, "history": []}
+    started = time.perf_counter()
+    try:
+        final = graph.invoke(state)
+        error = final.get("sql_error") or ("llm" if str(final.get("final_answer", "")).startswith("❌") else None)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"seconds": time.perf_counter() - started, "trace": trace, "error": error}
+
+def run_level(graph, stub: StubLLMServer, concurrency: int, requests: int) -> Dict[str, Any]:
+    stub.calls.clear()
+    items = [QUERIES[i % len(QUERIES)] for i in range(requests)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(concurrency) as pool:
+        # Each request gets a fresh context, so traces never leak between requests
+        results = list(pool.map(lambda item: contextvars.copy_context().run(run_request, graph, item), items))
+    wall = time.perf_counter() - started
+
+    nodes = {}
+    for name in NODES:
+        spans = [(seconds, calls) for result in results for node, seconds, calls in result["trace"] if node == name]
+        if spans:
+            nodes[name] = {"count": len(spans), "llm_calls": sum(calls for _, calls in spans),
+                           **percentiles([seconds for seconds, _ in spans])}
+    errors = [result["error"] for result in results if result["error"]]
+    llm_calls = sum(calls for result in results for _, _, calls in result["trace"])
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / wall, 2),
+        "latency": percentiles([result["seconds"] for result in results]),
+        "llm_calls_per_request": round(llm_calls / requests, 2),
+        "errors": len(errors),
+        "error_samples": sorted({error.splitlines()[0][:120] for error in errors})[:5],
+        "nodes": nodes,
+        "stub_calls": dict(stub.calls),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-node latency of pilot_graph against a stub LLM and seeded fixtures.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub LLM latency per call, in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Extra latency per call, up to this many seconds.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrent requests per level.")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level.")
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows in the DuckDB fixture.")
+    parser.add_argument("--kb_docs", type=int, default=500, help="Logs in the Chroma fixture.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the fixtures and the stub jitter.")
+    parser.add_argument("--output", default="data/benchmarks/pilot_graph.json", help="Where to write the JSON results.")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    stub = StubLLMServer(STUB_RULES, latency=args.latency, jitter=args.jitter, seed=args.seed).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        config_path = os.path.join(workdir, "llm_config.yaml")
+        with open(config_path, "w") as f:
+            yaml.safe_dump(stub.config(), f)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_fixture("data/target/logs.duckdb", rows=args.rows, seed=args.seed).close()
+            client = LLMClient(config_path=config_path)
+            from services.pilot_orchestrator.src import nodes
+            nodes.llm_client = client
+            nodes.sql_tool.llm = client
+            nodes._kb_store = build_kb(client, args.kb_docs, args.seed)
+            # graph.py binds the node functions at import, so wrap them first
+            for name in NODES:
+                setattr(nodes, name, timed_node(name, getattr(nodes, name), client))
+            from services.pilot_orchestrator.src.graph import pilot_graph
+        print(f"📚 Fixtures: {args.rows:,} rows in DuckDB, {args.kb_docs:,} logs in Chroma")
+        print(f"🤖 Stub LLM at {stub.url}: {args.latency * 1000:.0f} ms + up to {args.jitter * 1000:.0f} ms per call")
+
+        run_level(pilot_graph, stub, 1, len(QUERIES)) # Warm-up: caches, connections, lazy imports
+        levels = {}
+        for concurrency in args.concurrency:
+            levels[str(concurrency)] = level = run_level(pilot_graph, stub, concurrency, args.requests)
+            latency = level["latency"]
+            print(f"\n⚡ concurrency={concurrency}: {level['throughput_rps']:.1f} req/s, "
+                  f"p50 {latency['p50_ms']:.0f} ms, p95 {latency['p95_ms']:.0f} ms, p99 {latency['p99_ms']:.0f} ms, "
+                  f"{level['llm_calls_per_request']:.2f} LLM calls/request, {level['errors']} errors")
+            print(f"   {'Node':<20}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'LLM calls':>11}")
+            for name, node in level["nodes"].items():
+                print(f"   {name:<20}{node['count']:>7}{node['p50_ms']:>9.1f}{node['p95_ms']:>9.1f}"
+                      f"{node['p99_ms']:>9.1f}{node['llm_calls']:>11}")
+            for error in level["error_samples"]:
+                print(f"   ❌ {error}")
+        nodes.get_db_client().close() # The pool that sql_tool shares
+        os.chdir(ROOT)
+    stub.stop()
+
+    results = {"commit": git_commit(), "cpus": os.cpu_count(),
+               "config": {key: value for key, value in vars(args).items() if key != "output"}, "levels": levels}
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    print(f"\n💾 Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import gzip
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root and the bulk loader to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/bulk-loader/src")))
+
+from scripts.generate_logs import generate_logs
+from log_reader import LineStream, newline_chunks, read_range, zstandard
+
+def build_corpus(workdir: str, megabytes: int) -> str:
+    """Repeats a generated sample until the plain file reaches `megabytes`."""
+    sample_dir = os.path.join(workdir, "sample")
+    generate_logs(output_dir=sample_dir, count=5000)
+    sample = b"".join(open(os.path.join(sample_dir, name), "rb").read() for name in sorted(os.listdir(sample_dir)))
+    path = os.path.join(workdir, "corpus.log")
+    with open(path, "wb") as f:
+        for _ in range(max(1, megabytes * 1024 * 1024 // len(sample))):
+            f.write(sample)
+    return path
+
+def count_lines(lines) -> int:
+    return sum(1 for _ in lines)
+
+def count_range(task) -> int:
+    return sum(1 for _ in read_range(*task))
+
+def timed(label, size, fn):
+    started = time.perf_counter()
+    lines = fn()
+    elapsed = time.perf_counter() - started
+    return label, lines, size / 1e6 / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Sustained MB/sec of the bulk loader's readers per codec.")
+    parser.add_argument("--megabytes", type=int, default=256, help="Size of the plain corpus.")
+    parser.add_argument("--workers", type=int, default=2, help="Processes for the parallel mmap reader.")
+    parser.add_argument("--chunk_mb", type=int, default=32, help="mmap range size.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        plain = build_corpus(workdir, args.megabytes)
+        size = os.path.getsize(plain)
+        with open(plain, "rb") as src, gzip.open(plain + ".gz", "wb", compresslevel=6) as dst:
+            dst.write(src.read())
+        if zstandard:
+            with open(plain, "rb") as src, open(plain + ".zst", "wb") as dst:
+                zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+        print(f"📚 Corpus: {size / 1e6:.0f} MB plain ({os.cpu_count()} CPUs)")
+
+        chunks = [(plain, start, end) for start, end in newline_chunks(plain, args.chunk_mb * 1024 * 1024)]
+        results = [
+            timed("plain, text-mode lines", size, lambda: count_lines(open(plain, "r"))),
+            timed("plain, LineStream", size, lambda: count_lines(LineStream(plain))),
+            timed("plain, mmap ranges", size, lambda: sum(count_range(task) for task in chunks)),
+        ]
+        with ProcessPoolExecutor(args.workers) as pool:
+            pool.submit(int).result() # Exclude worker start-up from the timing
+            results.append(timed(f"plain, mmap ranges x{args.workers}", size,
+                                 lambda: sum(pool.map(count_range, chunks))))
+        results += [
+            timed("gzip, gzip.open text-mode", size, lambda: count_lines(io.TextIOWrapper(gzip.open(plain + ".gz")))),
+            timed("gzip, LineStream", size, lambda: count_lines(LineStream(plain + ".gz"))),
+        ]
+        if zstandard:
+            results.append(timed("zstd, LineStream", size, lambda: count_lines(LineStream(plain + ".zst"))))
+
+    print(f"\n{'Reader':<30}{'lines':>12}{'MB/s raw':>12}")
+    for label, lines, mb_per_sec in results:
+        print(f"{label:<30}{lines:>12}{mb_per_sec:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from shared.log_schema import LogEvent, LogRecord, RecordValidator
+
+def parsed_events(count: int):
+    """Parser-shaped dicts, as they reach the mine stage."""
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "timestamp": start + timedelta(milliseconds=i),
+        "severity": "ERROR" if i % 10 == 0 else "INFO",
+        "service_name": f"svc-{i % 8}",
+        "body": "Payment processed for user_id=<*> amount=<*>",
+        "template_id": str(i % 50),
+        "context": {"user_id": str(i), "amount": "50.00"},
+    } for i in range(count)]
+
+def pydantic_dump(p):
+    return LogEvent(timestamp=p["timestamp"], severity=p["severity"], service_name=p["service_name"],
+                    body=p["body"], template_id=p["template_id"], context=p["context"]).model_dump()
+
+def record(p):
+    return LogRecord(timestamp=p["timestamp"], severity=p["severity"], service_name=p["service_name"],
+                     body=p["body"], template_id=p["template_id"], context=p["context"])
+
+def measure(label, build, inputs):
+    """CPU per event, and bytes per event kept alive (batch) and allocated at peak."""
+    started = time.perf_counter()
+    for p in inputs:
+        build(p)
+    cpu_us = (time.perf_counter() - started) / len(inputs) * 1e6
+
+    tracemalloc.start()
+    kept = [build(p) for p in inputs]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return label, cpu_us, current / len(inputs), peak / len(inputs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-event cost of pydantic LogEvent vs LogRecord on the ingestion hot path.")
+    parser.add_argument("--count", type=int, default=100000, help="Events to build per variant.")
+    parser.add_argument("--sample_rate", type=float, default=0.01, help="Share of records validated in sample mode.")
+    args = parser.parse_args()
+
+    inputs = parsed_events(args.count)
+    sampled = RecordValidator(mode="sample", sample_rate=args.sample_rate)
+    strict = RecordValidator(mode="strict")
+    events = [LogEvent(**p) for p in inputs[:1000]]
+    records = [record(p) for p in inputs[:1000]]
+
+    results = [
+        measure("LogEvent + model_dump", pydantic_dump, inputs),
+        measure("LogRecord", record, inputs),
+        measure(f"LogRecord, {args.sample_rate:.0%} validated", lambda p: sampled.check(record(p)), inputs),
+        measure("LogRecord, strict", lambda p: strict.check(record(p)), inputs),
+        measure("WAL encode (pydantic)", lambda i: events[i % 1000].model_dump_json(), range(args.count)),
+        measure("WAL encode (record)", lambda i: records[i % 1000].to_json(), range(args.count)),
+    ]
+    payload = records[0].to_json()
+    results += [
+        measure("WAL decode (pydantic)", lambda _: LogEvent.model_validate_json(payload), range(args.count)),
+        measure("WAL decode (record)", lambda _: LogRecord.from_json(payload), range(args.count)),
+    ]
+
+    print(f"\n{'Variant':<30}{'us/event':>10}{'kept B/event':>14}{'peak B/event':>14}")
+    for label, cpu_us, kept, peak in results:
+        print(f"{label:<30}{cpu_us:>10.2f}{kept:>14.0f}{peak:>14.0f}")
+
+if __name__ == "__main__":
+    main()
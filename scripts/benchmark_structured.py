@@ -0,0 +1,93 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add project root and the bulk loader to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/bulk-loader/src")))
+
+from log_loader import BulkLoaderJob
+from shared.utils.log_parser import LogParser
+
+SERVICES = ["payment-service", "auth-service", "inventory-service", "search-api"]
+MESSAGES = [
+    "Payment of {n} USD processed for order {n}",
+    "User {n} logged in from 10.0.{n}.1",
+    "Stock for SKU {n} below threshold",
+    "Query took {n} ms",
+]
+
+def write_corpus(path: str, count: int):
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({
+                "timestamp": (start + timedelta(milliseconds=i)).isoformat(),
+                "level": rng.choice(["INFO", "INFO", "WARN", "ERROR"]),
+                "service": rng.choice(SERVICES),
+                "message": rng.choice(MESSAGES).format(n=rng.randint(1, 999)),
+                "user_id": str(rng.randint(1, 5000)),
+                "region": rng.choice(["eu-west-1", "us-east-1"]),
+            }) + "\n")
+
+def load(workdir: str, native: bool) -> float:
+    """End-to-end bulk load of the landing zone into a fresh database; returns seconds."""
+    os.chdir(workdir)
+    job = BulkLoaderJob(validate="off", native=native)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        job.run(landing_zone="landing")
+    elapsed = time.perf_counter() - started
+    job.db.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON-lines ingestion: DuckDB native scan vs the per-line parser.")
+    parser.add_argument("--lines", type=int, default=200000, help="Events in the generated file.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    corpus = os.path.join(root, "events.jsonl")
+    write_corpus(corpus, args.lines)
+    print(f"📚 {args.lines} JSON lines, {os.path.getsize(corpus) / 1e6:.1f} MB")
+
+    # Field mapping alone: json.loads + mapping per line vs DuckDB's scan into the staging table
+    log_parser = LogParser()
+    started = time.perf_counter()
+    with open(corpus) as f:
+        for line in f:
+            log_parser.parse(line)
+    python_map = time.perf_counter() - started
+
+    results = {}
+    for native in (False, True):
+        workdir = os.path.join(root, "native" if native else "parser")
+        os.makedirs(os.path.join(workdir, "landing"))
+        os.link(corpus, os.path.join(workdir, "landing", "events.jsonl"))
+        results[native] = load(workdir, native)
+
+    job = BulkLoaderJob(validate="off")
+    started = time.perf_counter()
+    job.structured.stage(corpus, "plain", {"format": "json"}, "events.jsonl")
+    native_map = time.perf_counter() - started
+    job.db.close()
+
+    print(f"\n{'Stage':<34}{'seconds':>10}{'lines/s':>12}")
+    for label, seconds in [
+        ("parse + map, LogParser", python_map),
+        ("parse + map, DuckDB scan", native_map),
+        ("end-to-end, line parser", results[False]),
+        ("end-to-end, DuckDB scan", results[True]),
+    ]:
+        print(f"{label:<34}{seconds:>10.2f}{args.lines / seconds:>12.0f}")
+
+if __name__ == "__main__":
+    main()
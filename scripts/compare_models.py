@@ -1,5 +1,7 @@
+import argparse
 import sys
 import os
+import time
 import pandas as pd
 
 # Add project root to path
@@ -7,35 +9,54 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
 from services.evaluator.src.runner import EvalRunner
 
-def run_comparison():
-    print("⚖️  Starting Model Comparison: Local (M4) vs. Cloud (OpenAI/Gemini)\n")
-    
-    # 1. Run Cloud Evaluation
-    print("☁️  Running Cloud Evaluation...")
-    cloud_runner = EvalRunner(provider="openai")
-    cloud_results = cloud_runner.evaluate_schema_discovery()
-    cloud_score = cloud_results["score"].mean()
-    print(f"   Cloud Score: {cloud_score:.2f}")
-
-    # 2. Run Local Evaluation
-    print("\n💻 Running Local Evaluation...")
-    local_runner = EvalRunner(provider="local")
-    local_results = local_runner.evaluate_schema_discovery()
-    local_score = local_results["score"].mean()
-    print(f"   Local Score: {local_score:.2f}")
-    
-    # 3. Compare
-    print("\n📊 Final Comparison:")
-    print(f"   Cloud: {cloud_score:.2f}")
-    print(f"   Local: {local_score:.2f}")
-    
-    diff = cloud_score - local_score
-    if diff > 0.1:
-        print("   👉 Recommendation: Use Cloud for complex tasks.")
-    elif diff < -0.1:
-        print("   👉 Recommendation: Local is surprisingly better!")
-    else:
-        print("   👉 Recommendation: Local is good enough (and cheaper/faster).")
+def evaluate(provider: str, concurrency: int) -> dict:
+    """Runs both evaluations for one provider; returns accuracy and speed figures."""
+    runner = EvalRunner(provider=provider, concurrency=concurrency)
+    try:
+        started = time.perf_counter()
+        sql = runner.evaluate_sql_gen()
+        sql_seconds = time.perf_counter() - started
+        schema = runner.evaluate_schema_discovery()
+    finally:
+        runner.close()
+    both = pd.concat([sql, schema])
+    return {
+        "provider": provider,
+        "sql_accuracy": sql["score"].mean(),
+        "regex_accuracy": schema["score"].mean(),
+        "score": both["score"].mean(),
+        "p50_latency_s": both["latency_s"].median(),
+        "p95_latency_s": both["latency_s"].quantile(0.95),
+        "tokens_per_item": (both["prompt_tokens"] + both["completion_tokens"]).mean(),
+        "sql_wall_s": sql_seconds,
+    }
+
+def run_comparison(providers, concurrency: int):
+    print(f"⚖️  Starting Model Comparison: {' vs. '.join(providers)}\n")
+
+    rows = []
+    for provider in providers:
+        print(f"🤖 Running {provider} Evaluation...")
+        rows.append(evaluate(provider, concurrency))
+        print(f"   {provider} Score: {rows[-1]['score']:.2f}\n")
+
+    print("📊 Final Comparison:")
+    print(pd.DataFrame(rows).set_index("provider").round(3).to_string())
+
+    if len(rows) == 2:
+        cloud, local = rows
+        diff = cloud["score"] - local["score"]
+        if diff > 0.1:
+            print(f"   👉 Recommendation: Use {cloud['provider']} for complex tasks.")
+        elif diff < -0.1:
+            print(f"   👉 Recommendation: {local['provider']} is surprisingly better!")
+        else:
+            faster = min(rows, key=lambda row: row["p50_latency_s"])
+            print(f"   👉 Recommendation: Accuracy is on par; {faster['provider']} answers faster.")
 
 if __name__ == "__main__":
-    run_comparison()
+    parser = argparse.ArgumentParser(description="Compare LLM providers on accuracy, latency and tokens.")
+    parser.add_argument("--providers", nargs="+", default=["openai", "local"], help="Providers from config/llm_config.yaml.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent LLM calls during the SQL evaluation.")
+    args = parser.parse_args()
+    run_comparison(args.providers, args.concurrency)
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+
+# Add project root and the bulk loader to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/bulk-loader/src")))
+
+from log_reader import LineStream, detect_codec, is_log_file
+from services.schema_discovery.src.agent import DiscoveryAgent
+from shared.utils.log_parser import LogParser
+from shared.utils.parser_registry import ParserRegistry
+
+def unparsed_lines(paths, registry: ParserRegistry, max_lines: int):
+    """Lines that neither the built-in formats nor a learned parser can read."""
+    parser = LogParser()
+    seen = 0
+    for path in paths:
+        for _, line in LineStream(path, detect_codec(path), hold_partial=False):
+            line = line.strip()
+            if not line:
+                continue
+            seen += 1
+            if seen > max_lines:
+                return
+            if parser.parse(line).get("context", {}).get("parse_error") == "format_unknown" and not registry.match(line):
+                yield line
+
+def main():
+    parser = argparse.ArgumentParser(description="Learn parsers for a backlog of unparsed log lines, one LLM discovery per line shape.")
+    parser.add_argument("--input", type=str, default="data/source/landing_zone", help="Log file or directory of log files.")
+    parser.add_argument("--registry", type=str, default="data/state/parser_registry.json", help="Parser registry to extend.")
+    parser.add_argument("--sample_size", type=int, default=5, help="Lines per shape sent to the LLM.")
+    parser.add_argument("--max_lines", type=int, default=1_000_000, help="Stop reading after this many lines.")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input):
+        paths = [os.path.join(args.input, name) for name in sorted(os.listdir(args.input)) if is_log_file(name)]
+    else:
+        paths = [args.input]
+
+    registry = ParserRegistry(args.registry)
+    agent = DiscoveryAgent(sample_size=args.sample_size)
+    # Shapes discovered (or failed) before are not sent again
+    agent.cache.update({fp: entry.get("regex") for fp, entry in registry.entries.items()})
+
+    discovered = agent.discover_groups(unparsed_lines(paths, registry, args.max_lines))
+    learned = sum(registry.add(fp, regex, sample) for fp, (regex, sample) in discovered.items())
+    registry.close()
+    print(f"✅ {learned}/{len(discovered)} new shapes learned with {agent.llm_calls} LLM calls")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import collections
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SERVICES = ["payment-service", "auth-service", "db-service", "frontend", "search-api", "inventory-service",
+            "shipping-service", "notification-service", "billing-api", "gateway", "scheduler", "media-service"]
+HOSTS = [f"server-{i:03d}" for i in range(1, 65)]
+ACTIONS = {"INFO": ["Processed", "Completed", "Received", "Sent", "Opened", "Closed", "Cached", "Flushed",
+                    "Validated", "Scheduled", "Started", "Loaded"],
+           "WARN": ["Retrying", "Throttled", "Evicted", "Slow", "Deferred"],
+           "ERROR": ["Failed", "Rejected", "Timed out on", "Dropped", "Aborted"]}
+OBJECTS = ["payment", "order", "session", "invoice", "request", "job", "query", "connection", "upload", "token",
+           "refund", "shipment", "report", "webhook", "batch", "profile", "cart", "index", "message", "cache entry"]
+# Variable slots: the key shown in the message and how its values are drawn
+SLOTS = {"id": ("int", 1_000_000), "attempt": ("int", 6), "shard": ("int", 32), "bytes": ("int", 5_000_000),
+         "duration": ("ms", 5000), "trace": ("hex", 0), "status": ("choice", ["ok", "partial", "stale", "queued"]),
+         "table": ("choice", ["users", "orders", "products", "events", "carts"]),
+         "region": ("choice", ["us-east-1", "us-west-2", "eu-central-1", "ap-south-1"])}
+PATHS = ["/", "/home", "/api/orders", "/api/orders/{n}", "/api/users/{n}", "/search", "/cart", "/checkout",
+         "/static/app.js", "/static/style.css", "/login", "/logout", "/api/payments", "/health"]
+DEFAULT_MIX = {"standard": 55, "json": 20, "syslog": 15, "nginx": 10}
+CHUNK_LINES = 100_000
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def build_templates(rng: np.random.Generator, count: int) -> Tuple[List[Dict], np.ndarray]:
+    """
+    `count` distinct message templates (action, object, two slots), each owned
+    by one service and severity, and their Zipf-like popularity (rank^-1.1).
+    """
+    slot_names = list(SLOTS)
+    # At most one template per (action, object, ordered slot pair); Drain keeps it as one cluster
+    count = min(count, sum(map(len, ACTIONS.values())) * len(OBJECTS) * len(slot_names) * (len(slot_names) - 1))
+    templates, seen = [], set()
+    while len(templates) < count:
+        severity = rng.choice(["INFO"] * 8 + ["WARN"] * 2 + ["ERROR"])
+        action = rng.choice(ACTIONS[severity])
+        obj = rng.choice(OBJECTS)
+        slots = tuple(rng.choice(slot_names, size=2, replace=False))
+        key = (action, obj, slots)
+        if key in seen:
+            continue
+        seen.add(key)
+        templates.append({"severity": str(severity), "service": str(rng.choice(SERVICES)),
+                          "format": f"{action} {obj} {slots[0]}=%s {slots[1]}=%s", "slots": slots})
+    weights = 1.0 / np.arange(1, len(templates) + 1) ** 1.1
+    return templates, weights / weights.sum()
+
+def slot_values(rng: np.random.Generator, kind: str, arg, n: int) -> np.ndarray:
+    """`n` values of one slot kind, as strings."""
+    if kind == "int":
+        return rng.integers(0, arg, n).astype(str)
+    if kind == "ms":
+        return np.char.add(rng.integers(1, arg, n).astype(str), "ms")
+    if kind == "hex":
+        return np.char.mod("%08x", rng.integers(0, 2 ** 32, n, dtype=np.uint64))
+    return np.array(arg)[rng.integers(0, len(arg), n)]
+
+def pii_values(rng: np.random.Generator, n: int, density: float) -> np.ndarray:
+    """A PII suffix (email, IPv4, card number or SSN) on `density` of the lines, else ''."""
+    suffix = np.full(n, "", dtype=object)
+    hit = np.flatnonzero(rng.random(n) < density)
+    kinds = rng.integers(0, 4, len(hit))
+    a, b, c = (rng.integers(0, 10_000, len(hit)) for _ in range(3))
+    for i, kind, x, y, z in zip(hit.tolist(), kinds.tolist(), a.tolist(), b.tolist(), c.tolist()):
+        if kind == 0:
+            suffix[i] = f" email=user{x}@example.com"
+        elif kind == 1:
+            suffix[i] = f" client_ip=10.{x % 256}.{y % 256}.{z % 256}"
+        elif kind == 2:
+            suffix[i] = f" card=4111 {x:04d} {y:04d} {z:04d}"
+        else:
+            suffix[i] = f" ssn={x % 900 + 100}-{y % 90 + 10}-{z:04d}"
+    return suffix
+
+def format_seconds(seconds: np.ndarray, fmt: str) -> List[str]:
+    """strftime per distinct second only: consecutive lines mostly share one."""
+    unique, inverse = np.unique(seconds, return_inverse=True)
+    texts = np.array([datetime.fromtimestamp(int(s), timezone.utc).strftime(fmt) for s in unique], dtype=object)
+    return texts[inverse].tolist()
+
+def render(fmt_name: str, rng: np.random.Generator, millis: np.ndarray, tids: np.ndarray,
+           templates: List[Dict], pii_density: float) -> str:
+    """Renders one format's share of a chunk; every column is drawn for the whole share at once."""
+    n = len(tids)
+    seconds = millis // 1000
+    hosts = np.array(HOSTS)[rng.integers(0, len(HOSTS), n)].tolist()
+    pii = pii_values(rng, n, pii_density)
+
+    if fmt_name == "nginx":
+        # Access logs: the client IP is PII on every line; the path and status vary
+        ips = np.char.add(np.char.add("10.0.", rng.integers(0, 256, n).astype(str)),
+                          np.char.add(".", rng.integers(1, 255, n).astype(str))).tolist()
+        paths = np.array(PATHS)[tids % len(PATHS)]
+        paths = [path.replace("{n}", str(v)) for path, v in zip(paths.tolist(), rng.integers(1, 100_000, n).tolist())]
+        methods = np.array(["GET", "GET", "GET", "POST", "PUT"])[rng.integers(0, 5, n)].tolist()
+        status = np.array([200] * 17 + [301, 404, 500])[rng.integers(0, 20, n)].tolist()
+        sizes = rng.integers(100, 50_000, n).tolist()
+        stamps = format_seconds(seconds, "%d/%b/%Y:%H:%M:%S +0000")
+        return "".join(map('%s - - [%s] "%s %s HTTP/1.1" %d %d\n'.__mod__,
+                           zip(ips, stamps, methods, paths, status, sizes)))
+
+    bodies = np.empty(n, dtype=object)
+    services = np.empty(n, dtype=object)
+    severities = np.empty(n, dtype=object)
+    for tid in np.unique(tids).tolist():
+        rows = np.flatnonzero(tids == tid)
+        template = templates[tid]
+        first, second = (slot_values(rng, *SLOTS[slot], len(rows)).tolist() for slot in template["slots"])
+        bodies[rows] = list(map(template["format"].__mod__, zip(first, second)))
+        services[rows] = template["service"]
+        severities[rows] = template["severity"]
+    bodies = (bodies + pii).tolist()
+    services, severities = services.tolist(), severities.tolist()
+
+    if fmt_name == "json":
+        stamps = format_seconds(seconds, "%Y-%m-%dT%H:%M:%S")
+        ms = (millis % 1000).tolist()
+        return "".join(map('{"timestamp": "%s.%03dZ", "level": "%s", "service": "%s", "message": "%s", "host": "%s"}\n'.__mod__,
+                           zip(stamps, ms, severities, services, bodies, hosts)))
+    if fmt_name == "syslog":
+        stamps = format_seconds(seconds, "%b %d %H:%M:%S")
+        pids = rng.integers(100, 32_768, n).tolist()
+        return "".join(map("%s %s %s[%d]: %s\n".__mod__, zip(stamps, hosts, services, pids, bodies)))
+    stamps = format_seconds(seconds, "%Y-%m-%d %H:%M:%S")
+    return "".join(map("%s %s %s: %s host=%s\n".__mod__, zip(stamps, severities, services, bodies, hosts)))
+
+def render_chunk(task) -> Dict[str, bytes]:
+    """
+    Worker entry point: chunk `index` of the corpus, per format. Each chunk has
+    its own generator (seed, index) and a fixed time span, so the output does
+    not depend on how many workers rendered it.
+    """
+    seed, index, template_list, popularity, mix, pii_density = task
+    rng = np.random.default_rng([seed, index])
+    names = list(mix)
+    shares = np.array([mix[name] for name in names], dtype=float)
+    # Gaps average 5 ms (about 17M lines per simulated day), scaled to end exactly at the chunk's span
+    gaps = rng.exponential(5.0, CHUNK_LINES)
+    span = 5 * CHUNK_LINES
+    millis = int(START.timestamp() * 1000) + index * span + (np.cumsum(gaps) * ((span - 1) / gaps.sum())).astype(np.int64)
+    formats = rng.choice(len(names), CHUNK_LINES, p=shares / shares.sum())
+    tids = rng.choice(len(template_list), CHUNK_LINES, p=popularity)
+    chunk = {}
+    for i, name in enumerate(names):
+        rows = np.flatnonzero(formats == i)
+        if len(rows):
+            chunk[name] = render(name, rng, millis[rows], tids[rows], template_list, pii_density).encode()
+    return chunk
+
+def generate_corpus(output_dir: str = "data/source/landing_zone", megabytes: int = 1024, seed: int = 42,
+                    templates: int = 400, pii_density: float = 0.05, mix: Dict[str, int] = None,
+                    file_megabytes: int = 256, workers: int = 0) -> Dict[str, int]:
+    """
+    Writes a seeded corpus of about `megabytes` MB: `corpus-<format>-NNN.log`
+    files (`.jsonl` for JSON), rotated every `file_megabytes`. Chunks of
+    CHUNK_LINES lines are rendered by `workers` processes (0 = in process).
+    The same arguments always produce the same bytes, whatever `workers` is.
+    """
+    mix = mix or DEFAULT_MIX
+    os.makedirs(output_dir, exist_ok=True)
+    template_list, popularity = build_templates(np.random.default_rng(seed), templates)
+    tasks = ((seed, index, template_list, popularity, mix, pii_density) for index in itertools.count())
+
+    target = megabytes * 1024 * 1024
+    limit = file_megabytes * 1024 * 1024
+    files = {name: {"part": 0, "size": 0, "handle": None} for name in mix}
+    total_bytes = chunks = 0
+    print(f"Generating {megabytes} MB into {output_dir} (seed {seed}, {len(template_list)} templates, "
+          f"{pii_density:.0%} PII)...")
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    try:
+        # Two chunks in flight per worker; chunks past the target are discarded unwritten
+        window = collections.deque()
+        while total_bytes < target:
+            while len(window) < max(1, 2 * workers):
+                task = next(tasks)
+                window.append(pool.submit(render_chunk, task) if pool else task)
+            head = window.popleft()
+            chunk = head.result() if pool else render_chunk(head)
+            chunks += 1
+            for name, data in chunk.items():
+                state = files[name]
+                if state["handle"] is None or state["size"] >= limit:
+                    if state["handle"]:
+                        state["handle"].close()
+                        state["part"] += 1
+                    extension = "jsonl" if name == "json" else "log"
+                    path = os.path.join(output_dir, f"corpus-{name}-{state['part']:03d}.{extension}")
+                    state["handle"], state["size"] = open(path, "wb"), 0
+                state["handle"].write(data)
+                state["size"] += len(data)
+                total_bytes += len(data)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        for state in files.values():
+            if state["handle"]:
+                state["handle"].close()
+
+    elapsed = time.perf_counter() - started
+    count = sum(state["part"] + 1 for state in files.values() if state["handle"])
+    lines = chunks * CHUNK_LINES
+    print(f"✅ {lines:,} lines, {total_bytes / 1e6:,.0f} MB in {count} files "
+          f"({total_bytes / 1e6 / elapsed:.0f} MB/s)")
+    return {"files": count, "lines": lines, "bytes": total_bytes}
+
+def mix_share(item: str) -> Tuple[str, int]:
+    """argparse type for one `--mix` entry, e.g. `json=20`."""
+    name, _, share = item.partition("=")
+    if name not in DEFAULT_MIX or not share.isdigit():
+        raise argparse.ArgumentTypeError(f"expected <{'|'.join(DEFAULT_MIX)}>=<share>, got {item!r}")
+    return name, int(share)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded, multi-format log corpus of any size.")
+    parser.add_argument("--megabytes", type=int, default=1024, help="Approximate corpus size.")
+    parser.add_argument("--output_dir", type=str, default="data/source/landing_zone", help="Output directory.")
+    parser.add_argument("--seed", type=int, default=42, help="Same seed and arguments, same bytes.")
+    parser.add_argument("--templates", type=int, default=400, help="Distinct message templates.")
+    parser.add_argument("--pii_density", type=float, default=0.05, help="Share of lines carrying PII.")
+    parser.add_argument("--mix", nargs="+", type=mix_share, default=None, help="Format shares, e.g. standard=55 json=20 syslog=15 nginx=10.")
+    parser.add_argument("--file_megabytes", type=int, default=256, help="Rotate to a new file at this size.")
+    parser.add_argument("--workers", type=int, default=(os.cpu_count() or 1) - 1,
+                        help="Rendering processes (0 = in process).")
+    args = parser.parse_args()
+    generate_corpus(args.output_dir, args.megabytes, args.seed, args.templates, args.pii_density,
+                    dict(args.mix) if args.mix else None, args.file_megabytes, args.workers)
@@ -18,7 +18,11 @@ def ingest_kb():
     
     # 2. Fetch logs (Limit to 200 for demo speed)
     print("   Fetching logs from DuckDB...")
-    rows = db.query("SELECT * FROM logs LIMIT 200")
+    rows = db.query("""
+        SELECT timestamp, severity, service_name, body, environment, app_id,
+               department, host, region, trace_id, context, template_id
+        FROM logs LIMIT 200
+    """)
     
     if not rows:
         print("⚠️ No logs found in DuckDB. Run bulk loader first.")
@@ -27,10 +31,8 @@ def ingest_kb():
     # 3. Convert to LogEvents
     logs = []
     for row in rows:
-        # Row format: (timestamp, severity, service_name, body, environment, app_id, department, host, region, trace_id, context)
-        # Note: DuckDB returns tuples. We need to map them correctly.
-        # Assuming schema order from DuckDBConnector._init_schema:
-        # timestamp, severity, service_name, body, environment, app_id, department, host, region, trace_id, context
+        # Row format: (timestamp, severity, service_name, body, environment, app_id, department, host, region, trace_id, context, template_id)
+        # Note: DuckDB returns tuples. Columns are selected explicitly above so the order is fixed.
         
         try:
             context_str = row[10]
@@ -47,6 +49,7 @@ def ingest_kb():
                 host=row[7],
                 region=row[8],
                 trace_id=row[9],
+                template_id=row[11],
                 context=context
             )
             logs.append(event)
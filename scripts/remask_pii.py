@@ -0,0 +1,27 @@
+import argparse
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.pii_backfill import MASKED_COLUMNS, PIIBackfill
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-mask PII in rows already loaded, with the current PIIMasker rules.")
+    parser.add_argument("--db_path", type=str, default="data/target/logs.duckdb", help="Path to the logs database.")
+    parser.add_argument("--tables", nargs="+", choices=list(MASKED_COLUMNS), help="Tables to mask (default: all).")
+    parser.add_argument("--chunk_rows", type=int, default=1_000_000, help="Rows per rowid range (one transaction each).")
+    parser.add_argument("--workers", type=int, default=None, help="Ranges processed in parallel (default: one per CPU).")
+    args = parser.parse_args()
+
+    # Needs the write lock: use this when no ingestion worker or bulk loader is running
+    db = DuckDBConnector(db_path=args.db_path)
+    try:
+        PIIBackfill(db, chunk_rows=args.chunk_rows, workers=args.workers).run(args.tables)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
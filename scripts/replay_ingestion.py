@@ -0,0 +1,111 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root and the ingestion worker to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../services/ingestion-worker/src")))
+
+from scripts.generate_logs import generate_logs
+from main import LogIngestor
+from sources import QueueSource
+
+def load_lines(input_path: str, count: int, workdir: str):
+    """Reads replay lines from a file/dir, or generates a sample corpus."""
+    if not input_path:
+        input_path = os.path.join(workdir, "corpus")
+        generate_logs(output_dir=input_path, count=count)
+    paths = sorted(glob.glob(os.path.join(input_path, "*.log"))) if os.path.isdir(input_path) else [input_path]
+    lines = []
+    for path in paths:
+        with open(path, "r") as f:
+            lines.extend(line.rstrip("\n") for line in f if line.strip())
+    return lines
+
+def produce(source: QueueSource, lines, repeat: int, rate: float):
+    """Publishes the corpus `repeat` times, optionally throttled to `rate` events/sec."""
+    started = time.perf_counter()
+    sent = 0
+    chunk = 1000
+    for _ in range(repeat):
+        for i in range(0, len(lines), chunk):
+            part = lines[i:i + chunk]
+            source.publish_many(part)
+            sent += len(part)
+            if rate > 0:
+                ahead = sent / rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    source.end_of_stream()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a log corpus through the ingestion pipeline and measure sustained events/sec.")
+    parser.add_argument("--input", type=str, help="Log file or directory of *.log files (default: generate a corpus).")
+    parser.add_argument("--count", type=int, default=20000, help="Lines to generate when no --input is given.")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the corpus this many times.")
+    parser.add_argument("--rate", type=float, default=0, help="Target events/sec (0 = as fast as possible).")
+    parser.add_argument("--sink", choices=["duckdb", "null"], default="duckdb", help="'null' measures the parse/mask/mine stages alone.")
+    parser.add_argument("--kb", action="store_true", help="Also write to ChromaDB (slow; loads the embedding model).")
+    parser.add_argument("--batch_size", type=int, default=0, help="Fixed rows per DuckDB batch (default: adaptive).")
+    parser.add_argument("--queue_size", type=int, default=1000, help="Capacity of each stage queue.")
+    parser.add_argument("--fsync", choices=["always", "batch", "interval", "none", "off"], default="batch", help="WAL sync policy ('off' disables the WAL).")
+    parser.add_argument("--output", type=str, help="Write the stats as JSON to this file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        lines = load_lines(args.input, args.count, workdir)
+        print(f"🔁 Replaying {len(lines)} lines x{args.repeat} (sink={args.sink}, rate={args.rate or 'max'}, wal={args.fsync})")
+
+        # Throwaway DB and miner state so the replay never touches real data
+        ingestor = LogIngestor(
+            db_path=os.path.join(workdir, "replay.duckdb"),
+            enable_kb=args.kb,
+            miner_state=os.path.join(workdir, "drain3_shards"),
+            wal_dir=None if args.fsync == "off" else os.path.join(workdir, "wal"),
+            fsync="batch" if args.fsync == "off" else args.fsync,
+            parser_registry=os.path.join(workdir, "parser_registry.json"),
+            discovery=False, # Throughput only, no LLM calls
+            stats_path=os.path.join(workdir, "stats.jsonl"),
+        )
+        if args.batch_size:
+            ingestor.flush_policy["duckdb"].update(min_rows=args.batch_size, max_rows=args.batch_size)
+        ingestor.queue_size = args.queue_size
+
+        source = QueueSource(name="queue:replay")
+        pipeline = ingestor.build_pipeline(source)
+        if args.sink == "null":
+            pipeline.sink = lambda batch: None
+
+        producer = threading.Thread(target=produce, args=(source, lines, args.repeat, args.rate), daemon=True)
+        producer.start()
+        stats = ingestor.run_pipeline(pipeline)
+        producer.join()
+        if ingestor.wal:
+            ingestor.wal.close()
+        ingestor.miner.close()
+        ingestor.db.close()
+
+    print("\n📊 Replay Results")
+    print(f"   Events:            {stats['written']} / {stats['read']}")
+    print(f"   Elapsed:           {stats['elapsed_sec']}s")
+    print(f"   Sustained:         {stats['events_per_sec']} events/sec")
+    print(f"   Backpressure:      {stats['backpressure_sec']}s (reader blocked on full queue)")
+    print(f"   Sink time:         {stats['sink_sec']}s over {stats['batches']} batches (adaptive target {stats['batch_target_rows']} rows)")
+    for name, tap in stats["taps"].items():
+        print(f"   Tap {name:<8}       {tap['written']} written, {tap['dropped']} dropped, {tap['sink_sec']}s")
+    for name, s in stats["stages"].items():
+        print(f"   Stage {name:<6}       busy {s['busy_sec']}s, errors {s['errors']}")
+    print(f"   Max queue depth:   {stats['max_queue_depth']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(stats, f, indent=2)
+        print(f"💾 Stats written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,11 @@ def reset_environment():
         "data/target/logs.duckdb",
         "data/target/vector_store",
         "data/source/landing_zone",
-        "data/state/drain3_state.bin"
+        "data/state/drain3_state.bin",
+        "data/state/drain3_state.bin.journal",
+        "data/state/drain3_shards",
+        "data/state/wal",
+        "data/state/offsets"
     ]
     
     # 2. Clean up
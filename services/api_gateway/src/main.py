@@ -1,6 +1,7 @@
 import sys
 import os
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 
 # Add project root to path
@@ -8,6 +9,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.
 
 from services.api_gateway.src.models import QueryRequest, QueryResponse
 from services.pilot_orchestrator.src.graph import pilot_graph
+from shared.utils.telemetry import metrics, tracer
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,6 +25,11 @@ app = FastAPI(title="LogPilot API", version="2.0.0", lifespan=lifespan)
 async def health_check():
     return {"status": "healthy", "service": "api-gateway"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint; same series as the orchestrator's /metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/query", response_model=QueryResponse)
 async def query_agent(request: QueryRequest):
     """
@@ -38,7 +45,8 @@ async def query_agent(request: QueryRequest):
         
         # Invoke LangGraph
         # Note: invoke is synchronous. For high throughput, we'd use ainvoke or run in a threadpool.
-        result = pilot_graph.invoke(initial_state)
+        with tracer.span("api.query"):
+            result = pilot_graph.invoke(initial_state)
         
         response_context = {}
         if result.get("intent") == "sql":
@@ -0,0 +1,78 @@
+import os
+import time
+from typing import Dict, List, Tuple
+
+from log_reader import is_log_file
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError: # Falls back to polling
+    INotify = None
+
+class LandingWatcher:
+    """
+    Reports landing-zone files that may have new data.
+
+    Uses inotify when available (new, appended, and renamed-in files) and
+    otherwise polls size and mtime. With inotify a full rescan still runs
+    every `rescan_interval` seconds, and after a queue overflow, so no
+    change is missed.
+    """
+    def __init__(self, landing_zone: str, poll_interval: float = 1.0, settle: float = 0.2,
+                 rescan_interval: float = 60.0, use_inotify: bool = True):
+        self.landing_zone = landing_zone
+        self.poll_interval = poll_interval
+        self.settle = settle # Lets a burst of writes arrive as one change
+        self.rescan_interval = rescan_interval
+        self.seen: Dict[str, Tuple[int, int]] = self._scan()
+        self.last_scan = time.monotonic()
+        self.inotify = None
+        if use_inotify and INotify is not None:
+            self.inotify = INotify()
+            self.inotify.add_watch(landing_zone, flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.MOVED_TO)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify else "polling"
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for item in os.scandir(self.landing_zone):
+            if item.is_file() and is_log_file(item.name):
+                st = item.stat()
+                stats[item.name] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+    def _rescan(self) -> List[str]:
+        current = self._scan()
+        changed = [name for name, stat in current.items() if self.seen.get(name) != stat]
+        self.seen = current
+        self.last_scan = time.monotonic()
+        return changed
+
+    def changes(self) -> List[str]:
+        """Blocks for up to one poll interval; returns paths to (re)load, oldest first."""
+        if self.inotify is None:
+            time.sleep(self.poll_interval)
+            names = self._rescan()
+        elif time.monotonic() - self.last_scan >= self.rescan_interval:
+            names = self._rescan()
+        else:
+            events = self.inotify.read(timeout=int(self.poll_interval * 1000), read_delay=int(self.settle * 1000))
+            if any(event.mask & flags.Q_OVERFLOW for event in events):
+                names = self._rescan()
+            else:
+                names = {event.name for event in events if is_log_file(event.name)}
+        stamped = []
+        for name in names:
+            path = os.path.join(self.landing_zone, name)
+            try:
+                stamped.append((os.path.getmtime(path), path))
+            except FileNotFoundError: # Removed since the event
+                continue
+        # Oldest first: a rotated file is loaded before the file that replaced it
+        return [path for _, path in sorted(stamped)]
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
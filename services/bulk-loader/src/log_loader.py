@@ -1,115 +1,397 @@
 import sys
 import os
 import time
+import hashlib
+import signal
 import random
 import json
 import argparse
+import multiprocessing as mp
+import duckdb
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 # Add project root to python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+# Sibling modules (the hyphenated service dir is not an importable package)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from shared.log_schema import LogEvent
+from shared.log_schema import LogRecord, RecordValidator
 from shared.db.duckdb_client import DuckDBConnector
 from shared.utils.log_parser import LogParser
-from shared.utils.template_miner import LogTemplateMiner
+from shared.utils.parser_registry import ParserRegistry
+from shared.utils.sharded_miner import ShardedTemplateMiner
 from shared.utils.pii_masker import PIIMasker
+from shared.utils.stage_profiler import StackSampler, StageProfiler
+from services.schema_discovery.src.agent import lazy_discovery
+
+from log_reader import CodecStats, LineStream, detect_codec, is_log_file, newline_chunks, read_head, read_range
+from landing_watcher import LandingWatcher
+from structured_loader import StructuredLoader, sniff_format
+
+_tools = None
+HEAD_BYTES = 4096
+
+def prepare_line(parser: LogParser, masker: PIIMasker, line: str,
+                 timings: Optional[List[float]] = None) -> Optional[dict]:
+    """
+    Parses and masks one line; None for blank or unparseable lines.
+    `timings` ([parse_sec, mask_sec, lines]) accumulates the time spent in each step.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        started = time.perf_counter()
+        # 1. Parse (Multi-Format)
+        parsed = parser.parse(line)
+        parsed_at = time.perf_counter()
+        # 2. Mask PII
+        parsed["body"] = masker.mask_text(parsed["body"])
+        if timings is not None:
+            timings[0] += parsed_at - started
+            timings[1] += time.perf_counter() - parsed_at
+            timings[2] += 1
+        return parsed
+    except Exception as e:
+        print(f"\n⚠️ Error processing line: {line[:50]}... -> {e}")
+        return None
+
+def prepare_range(task: Tuple[str, int, int]) -> Tuple[int, List[Tuple[int, dict]], List[float]]:
+    """
+    Worker entry point: parses and masks one newline-aligned range of a plain file.
+    Returns the range end, `(end_offset, parsed)` per parsed line and the step timings.
+    """
+    global _tools
+    if _tools is None:
+        # Learned parsers apply here too; discovery is left to the main process
+        _tools = (LogParser(ParserRegistry(read_only=True)), PIIMasker())
+    path, start, end = task
+    timings = [0.0, 0.0, 0]
+    prepared = ((offset, prepare_line(*_tools, line, timings)) for offset, line in read_range(path, start, end))
+    return end, [(offset, parsed) for offset, parsed in prepared if parsed is not None], timings
+
+def stop_watching(signum, frame):
+    raise KeyboardInterrupt
+
+def same_head(head: bytes, known: Dict[str, Any]) -> bool:
+    """True if `head` starts with the content hashed into a manifest entry."""
+    return (known["head_bytes"] > 0 and len(head) >= known["head_bytes"]
+            and hashlib.sha1(head[:known["head_bytes"]]).hexdigest() == known["head_hash"])
 
 class BulkLoaderJob:
-    def __init__(self):
+    def __init__(self, mining_workers: int = 0, validate: str = "sample", read_workers: int = 0, native: bool = True,
+                 discovery: bool = True, stats_path: Optional[str] = "data/state/bulk_loader_stats.jsonl",
+                 stats_interval: float = 10.0):
         self.db = DuckDBConnector()
-        self.miner = LogTemplateMiner(persistence_file="data/state/drain3_state.bin")
-        self.parser = LogParser()
+        # One Drain tree per service; with workers, shards are mined in parallel processes
+        self.miner = ShardedTemplateMiner(state_dir="data/state/drain3_shards", processes=mining_workers)
+        # Unknown line shapes are sent to schema discovery once; learned regexes persist
+        self.parser = LogParser(ParserRegistry(discover=lazy_discovery() if discovery else None))
         self.pii_masker = PIIMasker()
+        self.validator = RecordValidator(mode=validate) # pydantic only on a sample of records
+        self.batch_size = 2000
+        # JSON-lines and CSV files skip the per-line parser
+        self.structured = StructuredLoader(self.db, self.miner, self.pii_masker, self.batch_size) if native else None
+        self.buffer_size = 1024 * 1024 # Read size for streamed (and decompressed) files
+        self.mmap_threshold = 64 * 1024 * 1024 # Plain files at least this big are split into ranges
+        self.chunk_bytes = 32 * 1024 * 1024
+        self.read_stats = CodecStats()
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self.retired: List[Dict[str, Any]] = [] # Entries whose path now holds another file
+        self.file_counts = {"loaded": 0, "resumed": 0, "skipped": 0}
+        # spawn: the miner may already run worker processes
+        self.read_workers = read_workers
+        self.pool = ProcessPoolExecutor(read_workers, mp_context=mp.get_context("spawn")) if read_workers > 0 else None
+        # Per-stage timings, summarized every `stats_interval` seconds (progress report + stats file)
+        # Lines are loaded either by the per-line path ("insert") or by a DuckDB scan ("native_scan")
+        self.profiler = StageProfiler(stats_path, interval=stats_interval, throughput=("insert", "native_scan"))
+        for stage in ("native_scan", "parse", "mask", "mine", "validate", "insert"):
+            self.profiler.timer(stage)
+        self.sampler: Optional[StackSampler] = None # On-demand stack sampling, see run()
+
+    def plan(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Decides where to (re)start a file from its manifest entry.
+        Returns None for a fully loaded, unchanged file (a stat, no reads).
+        """
+        st = os.stat(file_path)
+        known = self.manifest.get(file_path)
+        if known and known["status"] == "done" and (known["size"], known["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            return None
 
-    def process_file(self, file_path: str):
-        """Reads a log file and loads it into DuckDB."""
+        codec = detect_codec(file_path)
+        head = read_head(file_path, codec, HEAD_BYTES)
+        entry = {
+            "path": file_path, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "head_hash": hashlib.sha1(head).hexdigest(), "head_bytes": len(head), "codec": codec,
+            "committed_offset": 0, "lines": 0, "status": "partial",
+        }
+        # Same head and no shrinkage: a partial load or an appended file, so continue it.
+        # Anything else (rotated into this name, truncated) is a new file.
+        if known and st.st_size >= known["size"] and same_head(head, known):
+            origin = known
+        else:
+            if known:
+                self.retired.append(known) # Its content may reappear under a rotated name
+            origin = self.rotated_from(file_path, head)
+            if origin:
+                print(f"🔁 {os.path.basename(file_path)} is {os.path.basename(origin['path'])}, rotated")
+        if origin:
+            entry["committed_offset"] = origin["committed_offset"]
+            entry["lines"] = origin["lines"]
+        return entry
+
+    def rotated_from(self, file_path: str, head: bytes) -> Optional[Dict[str, Any]]:
+        """
+        A loaded file whose content now lives at `file_path` (renamed, or copied
+        and truncated by logrotate, possibly compressed), or None.
+        """
+        candidates: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+        for known in self.retired + list(self.manifest.values()):
+            if known["path"] != file_path and 0 < known["head_bytes"] <= len(head):
+                candidates.setdefault((known["head_bytes"], known["head_hash"]), []).append(known)
+        # One hash per distinct head length, not per entry
+        for length in sorted({length for length, _ in candidates}, reverse=True):
+            for known in candidates.get((length, hashlib.sha1(head[:length]).hexdigest()), []):
+                try:
+                    # Still at its old path: a copy, not a rotation
+                    if same_head(read_head(known["path"], None, length), known):
+                        continue
+                except (OSError, EOFError, RuntimeError):
+                    pass
+                return known
+        return None
+
+    def process_file(self, file_path: str) -> bool:
+        """
+        Loads a log file (plain, .gz or .zst) into DuckDB, resuming from its manifest entry.
+        Returns False if a database error stopped it; a retry resumes from its checkpoint.
+        """
+        file_path = os.path.abspath(file_path)
         filename = os.path.basename(file_path)
-        print(f"📄 Processing file: {filename}")
-        
-        batch_size = 100
-        batch = []
-        
+        started = time.perf_counter()
+        pending = []
         try:
-            with open(file_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
+            entry = self.plan(file_path)
+            if entry is None:
+                self.file_counts["skipped"] += 1
+                return True
+            codec, size, start = entry["codec"], entry["size"], entry["committed_offset"]
+            self.file_counts["resumed" if start else "loaded"] += 1
+            print(f"📄 Processing file: {filename} ({codec}{f', from byte {start}' if start else ''})")
 
-                    try:
-                        # 1. Parse (Multi-Format)
-                        parsed = self.parser.parse(line)
-                        
-                        # 2. Mask PII
-                        safe_body = self.pii_masker.mask_text(parsed["body"])
-                        
-                        # 3. Mine Template
-                        template = self.miner.mine_template(safe_body)
-                        
-                        # 4. Extract Context
-                        context = parsed.get("context", {})
-                        context["source_file"] = filename
-                        
-                        # Extract standard metadata from context if present
-                        environment = context.get("environment") or context.get("env")
-                        app_id = context.get("app_id")
-                        department = context.get("department") or context.get("dept")
-                        host = context.get("host")
-                        region = context.get("region")
-
-                        event = LogEvent(
-                            timestamp=parsed["timestamp"],
-                            severity=parsed["severity"],
-                            service_name=parsed["service_name"],
-                            body=template,
-                            environment=environment,
-                            app_id=app_id,
-                            department=department,
-                            host=host,
-                            region=region,
-                            context=context
-                        )
-                        
-                        batch.append(event.model_dump())
-                        
-                        if len(batch) >= batch_size:
-                            self.db.insert_batch(batch)
-                            batch = []
-                            sys.stdout.write(".")
-                            sys.stdout.flush()
-                    except Exception as e:
-                        print(f"\n⚠️ Error processing line: {line[:50]}... -> {e}")
-                        continue
+            # Whole JSON-lines / CSV files are scanned natively by DuckDB
+            sniffed = sniff_format(file_path, codec) if self.structured and start == 0 else None
+            if sniffed:
+                try:
+                    with self.profiler.time("native_scan") as timing:
+                        rows = timing.items = self.structured.load(file_path, codec, sniffed, entry)
+                    self.manifest[file_path] = entry
+                    print(f"   🦆 {rows} rows via DuckDB {sniffed['format']} scan\n")
+                    self.read_stats.add(codec, size, entry["committed_offset"], time.perf_counter() - started)
+                    return True
+                except duckdb.Error as e:
+                    # Nothing was committed; the per-line parser copes with malformed lines
+                    print(f"   ↩️  Native scan failed ({str(e).splitlines()[0]}), parsing line by line")
 
-            # Insert remaining
-            if batch:
-                self.db.insert_batch(batch)
-            print("\n")
-            
+            if codec == "plain" and size - start >= self.mmap_threshold:
+                # Large plain files: newline-aligned mmap ranges, parsed and masked by workers
+                chunks = newline_chunks(file_path, self.chunk_bytes, start=start)
+                tasks = [(file_path, a, b) for a, b in chunks]
+                results = self._map_bounded(tasks) if self.pool else map(prepare_range, tasks)
+                offset = start
+                for range_end, prepared, timings in results:
+                    self.record_prepare(timings)
+                    pending.extend(prepared)
+                    while len(pending) >= self.batch_size:
+                        self.flush(pending[:self.batch_size], filename, entry)
+                        pending = pending[self.batch_size:]
+                    offset = range_end
+            else:
+                stream = LineStream(file_path, codec, self.buffer_size, start=start)
+                timings = [0.0, 0.0, 0]
+                for offset, line in stream:
+                    # 1-2. Parse (Multi-Format) and mask PII
+                    parsed = prepare_line(self.parser, self.pii_masker, line, timings)
+                    if parsed is not None:
+                        pending.append((offset, parsed))
+                    
+                    # 3-4. Mine templates for the whole batch at once, then insert
+                    if len(pending) >= self.batch_size:
+                        self.record_prepare(timings)
+                        timings = [0.0, 0.0, 0]
+                        self.flush(pending, filename, entry)
+                        pending = []
+                self.record_prepare(timings)
+                offset = stream.offset
+
+            # Insert remaining, and mark the file as read up to `offset`
+            self.flush(pending, filename, entry, offset=offset, status="done")
+            print(f"   ✅ {entry['lines']} lines committed\n")
         except FileNotFoundError:
             print(f"❌ File not found: {file_path}")
+            return True
+        except (OSError, EOFError, RuntimeError) as e:
+            # Truncated archive, or a codec that is not installed
+            print(f"❌ Could not read {filename}: {e}")
+            return True
+        except duckdb.Error as e:
+            # Lock conflict, constraint or disk full: the file resumes from its last committed batch
+            print(f"❌ Could not load {filename}: {str(e).splitlines()[0]} "
+                  f"(committed up to byte {entry['committed_offset']})")
+            return False
+        self.read_stats.add(codec, size, offset - start, time.perf_counter() - started)
+        return True
+
+    def record_prepare(self, timings: List[float]):
+        """Adds one batch of prepare_line timings to the parse and mask stages."""
+        if timings[2]:
+            self.profiler.timer("parse").add(timings[0], timings[2])
+            self.profiler.timer("mask").add(timings[1], timings[2])
 
-    def run(self, landing_zone: str = "data/source/landing_zone"):
+    def _map_bounded(self, tasks: List[Tuple[str, int, int]]):
+        """Yields prepare_range results in order, with at most two ranges in flight per worker."""
+        window = 2 * self.read_workers
+        futures = [self.pool.submit(prepare_range, task) for task in tasks[:window]]
+        for i in range(len(tasks)):
+            result = futures[i].result()
+            futures[i] = None # Drop the parsed range once consumed
+            if i + window < len(tasks):
+                futures.append(self.pool.submit(prepare_range, tasks[i + window]))
+            yield result
+
+    def flush(self, pending: List[Tuple[int, dict]], filename: str, entry: Dict[str, Any],
+              offset: Optional[int] = None, status: str = "partial"):
+        """
+        Mines and inserts `(end_offset, parsed)` items. The file's manifest entry
+        advances to the last item's offset (or `offset`) in the same transaction,
+        and `entry` only once that transaction has committed.
+        """
+        staged = {**entry, "committed_offset": offset if offset is not None else pending[-1][0],
+                  "lines": entry["lines"] + len(pending), "status": status}
+        if not pending:
+            self.db.save_manifest(staged)
+            self._advance(entry, staged)
+            return
+
+        # 3. Mine Templates (per service shard, in parallel when workers are enabled)
+        with self.profiler.time("mine", len(pending)):
+            mined = self.miner.mine_batch([(parsed["service_name"], parsed["body"]) for _, parsed in pending])
+
+        started = time.perf_counter()
+        batch = []
+        for (_, parsed), (template_id, template) in zip(pending, mined):
+            # 4. Extract Context
+            context = parsed.get("context", {})
+            context["source_file"] = filename
+            
+            # Extract standard metadata from context if present
+            environment = context.get("environment") or context.get("env")
+            app_id = context.get("app_id")
+            department = context.get("department") or context.get("dept")
+            host = context.get("host")
+            region = context.get("region")
+
+            record = LogRecord(
+                timestamp=parsed["timestamp"],
+                severity=parsed["severity"],
+                service_name=parsed["service_name"],
+                body=template,
+                template_id=template_id,
+                environment=environment,
+                app_id=app_id,
+                department=department,
+                host=host,
+                region=region,
+                context=context
+            )
+            batch.append(self.validator.check(record))
+        self.profiler.timer("validate").add(time.perf_counter() - started, len(batch))
+        with self.profiler.time("insert", len(batch)):
+            self.db.insert_batch(batch, manifest=staged)
+        self._advance(entry, staged)
+
+    def _advance(self, entry: Dict[str, Any], committed: Dict[str, Any]):
+        entry.update(committed)
+        self.manifest[entry["path"]] = entry
+
+    def watch(self, watcher: LandingWatcher):
+        """
+        Continuous mode: loads new, appended and rotated files as they change,
+        through the same checkpoints as a one-shot run, until interrupted.
+        A file that fails keeps its checkpoint and is retried on every pass
+        until it loads; other files are not held up by it.
+        """
+        print(f"👀 Watching {watcher.landing_zone} ({watcher.mode}); Ctrl-C to stop")
+        previous = signal.signal(signal.SIGTERM, stop_watching)
+        failed: Dict[str, None] = {} # Insertion-ordered set, oldest failure first
+        try:
+            while True:
+                changed = watcher.changes()
+                for path in [path for path in failed if path not in changed] + changed:
+                    try:
+                        loaded = self.process_file(path)
+                    except Exception as e:
+                        print(f"❌ Failed to load {os.path.basename(path)}: {e!r}; retrying on the next pass")
+                        loaded = False
+                    if loaded:
+                        failed.pop(path, None)
+                    else:
+                        failed[path] = None
+        except KeyboardInterrupt:
+            print("\n🛑 Watch stopped")
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            watcher.close()
+
+    def run(self, landing_zone: str = "data/source/landing_zone", watch: bool = False, poll_interval: float = 1.0):
         print(f"🚀 Starting Phase 1: Bulk Loader Job (Scanning {landing_zone})")
         
         if not os.path.exists(landing_zone):
             print(f"❌ Landing zone {landing_zone} does not exist.")
             return
 
-        files = [f for f in os.listdir(landing_zone) if f.endswith(".log")]
-        if not files:
-            print(f"⚠️ No .log files found in {landing_zone}.")
+        # Started before the catch-up scan so that nothing written during it is missed
+        watcher = LandingWatcher(landing_zone, poll_interval=poll_interval) if watch else None
+        files = sorted(f for f in os.listdir(landing_zone) if is_log_file(f))
+        if not files and not watch:
+            print(f"⚠️ No log files found in {landing_zone}.")
             return
 
+        # Files already committed are skipped or resumed from their byte offset
+        self.manifest = self.db.get_manifest()
+        if self.sampler and self.sampler.install():
+            print(f"🔥 kill -USR1 {os.getpid()} toggles stack sampling into {self.sampler.directory}")
+        self.profiler.start()
         for filename in files:
             file_path = os.path.join(landing_zone, filename)
             self.process_file(file_path)
+        print(f"🗂️  Files: {self.file_counts['loaded']} loaded, {self.file_counts['resumed']} resumed, "
+              f"{self.file_counts['skipped']} unchanged")
+        if watcher:
+            self.watch(watcher)
+        self.profiler.stop()
+        if self.sampler:
+            self.sampler.stop()
         
         # Save Miner State
+        # Changes are journaled as they happen; this folds them into one snapshot
         print("💾 Saving Template Miner State...")
-        self.miner.save_state()
+        self.miner.close()
+        self.parser.registry.close()
+        if self.pool:
+            self.pool.shutdown()
+
+        print("📈 Sustained read + load throughput per codec:")
+        for line in self.read_stats.report():
+            print(f"   {line}")
+        print("⏱️  Busy time per stage:")
+        for name, stage in self.profiler.totals().items():
+            if stage["items"]:
+                print(f"   {name:<12}{stage['items']:>12,} items {stage['busy_sec']:>10.1f}s"
+                      f" {stage['items'] / max(stage['busy_sec'], 1e-9):>12,.0f}/s")
         
         # Verify
         count = self.db.query("SELECT count(*) FROM logs")[0][0]
@@ -128,7 +410,21 @@ class BulkLoaderJob:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Bulk load logs into DuckDB.")
     parser.add_argument("--landing_zone", type=str, default="data/source/landing_zone", help="Directory containing log files.")
+    parser.add_argument("--mining_workers", type=int, default=0, help="Worker processes for template mining (0 = in-process).")
+    parser.add_argument("--validate", choices=RecordValidator.MODES, default="sample", help="pydantic validation of parsed events.")
+    parser.add_argument("--read_workers", type=int, default=0, help="Worker processes that parse/mask ranges of large plain files.")
+    parser.add_argument("--no_native", action="store_true", help="Parse JSON-lines and CSV files line by line instead of with DuckDB's scanners.")
+    parser.add_argument("--no_discovery", action="store_true", help="Do not send unknown log formats to LLM schema discovery.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and load files as they arrive or grow.")
+    parser.add_argument("--poll_interval", type=float, default=1.0, help="Seconds between checks when inotify is unavailable.")
+    parser.add_argument("--stats_file", type=str, default="data/state/bulk_loader_stats.jsonl", help="Where per-interval stage summaries are appended ('' to disable).")
+    parser.add_argument("--stats_interval", type=float, default=10.0, help="Seconds between stage summaries.")
+    parser.add_argument("--profile_dir", type=str, default=None, help="Enable SIGUSR1-toggled stack sampling, dumping collapsed stacks here.")
     args = parser.parse_args()
     
-    job = BulkLoaderJob()
-    job.run(landing_zone=args.landing_zone)
+    job = BulkLoaderJob(mining_workers=args.mining_workers, validate=args.validate, read_workers=args.read_workers,
+                        native=not args.no_native, discovery=not args.no_discovery,
+                        stats_path=args.stats_file or None, stats_interval=args.stats_interval)
+    if args.profile_dir:
+        job.sampler = StackSampler(args.profile_dir)
+    job.run(landing_zone=args.landing_zone, watch=args.watch, poll_interval=args.poll_interval)
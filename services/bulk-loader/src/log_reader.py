@@ -0,0 +1,209 @@
+import gzip
+import io
+import mmap
+import os
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError: # .zst files are skipped without it
+    zstandard = None
+
+# Codecs are detected by magic number: rotated files are often renamed
+MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+# app.log, app.log.1, app.2025-01-01.log, events.jsonl, export.csv, each optionally compressed
+LOG_NAME = re.compile(r"\.(log|jsonl|ndjson|csv|tsv)(\.\d+)?(\.(gz|zst|zstd))?$|\.(gz|zst|zstd)$")
+
+def is_log_file(name: str) -> bool:
+    return bool(LOG_NAME.search(name))
+
+def detect_codec(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return "plain"
+
+def read_head(path: str, codec: Optional[str] = None, length: int = 4096) -> bytes:
+    """
+    First `length` bytes of the decompressed content. A file rotated and
+    compressed keeps the head it had as plain text, so it can be recognised.
+    """
+    codec = codec or detect_codec(path)
+    if codec == "gzip":
+        with gzip.open(path, "rb") as f:
+            return f.read(length)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is not installed; cannot read {path}")
+        with open(path, "rb") as raw:
+            reader, head = zstandard.ZstdDecompressor().stream_reader(raw), b""
+            while len(head) < length: # Reads may stop at a frame boundary
+                block = reader.read(length - len(head))
+                if not block:
+                    break
+                head += block
+            return head
+    with open(path, "rb") as f:
+        return f.read(length)
+
+def content_length(path: str, codec: Optional[str] = None, buffer_size: int = 1024 * 1024) -> int:
+    """Decompressed size: the offset LineStream reaches at the end of a complete file."""
+    codec = codec or detect_codec(path)
+    if codec == "plain":
+        return os.path.getsize(path)
+    if codec == "gzip":
+        f = gzip.open(path, "rb")
+    elif zstandard is None:
+        raise RuntimeError(f"zstandard is not installed; cannot read {path}")
+    else:
+        f = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    with f:
+        return sum(iter(lambda: len(f.read(buffer_size)), 0))
+
+class LineStream:
+    """
+    Streams `(end_offset, line)` from a plain, gzip or zstd file with large reads.
+
+    Offsets are positions in the decompressed content just past each line,
+    so a load can commit one and later resume with `start`. A last line with
+    no newline is held back when `hold_partial` is set (by default for plain
+    files, which may still be written to).
+
+    Each codec uses the fastest offset-tracking loop measured for it (see
+    scripts/benchmark_readers.py): block reads split in one call for plain
+    and gzip input (decoded once per block when it is ASCII), and buffered
+    binary line iteration for zstd.
+    """
+    def __init__(self, path: str, codec: Optional[str] = None, buffer_size: int = 1024 * 1024,
+                 start: int = 0, hold_partial: Optional[bool] = None):
+        self.path = path
+        self.codec = codec or detect_codec(path)
+        self.buffer_size = buffer_size
+        self.start = start
+        self.offset = start
+        self.hold_partial = self.codec == "plain" if hold_partial is None else hold_partial
+
+    @property
+    def bytes_out(self) -> int:
+        """Decompressed bytes consumed so far."""
+        return self.offset - self.start
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        if self.codec == "gzip":
+            with gzip.open(self.path, "rb") as f:
+                f.seek(self.start) # Decompresses forward; gzip has no random access
+                yield from self._blocks(f)
+            return
+        if self.codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is not installed; cannot read {self.path}")
+            with open(self.path, "rb") as raw:
+                reader = zstandard.ZstdDecompressor().stream_reader(raw, read_size=self.buffer_size)
+                reader.seek(self.start)
+                yield from self._lines(io.BufferedReader(reader, self.buffer_size))
+            return
+        with open(self.path, "rb", buffering=0) as f:
+            f.seek(self.start)
+            yield from self._blocks(f)
+
+    def _lines(self, f) -> Iterator[Tuple[int, str]]:
+        for raw in f:
+            if self.hold_partial and not raw.endswith(b"\n"):
+                return
+            self.offset += len(raw)
+            yield self.offset, raw.decode("utf-8", "replace").rstrip("\r\n")
+
+    def _blocks(self, f) -> Iterator[Tuple[int, str]]:
+        tail = b""
+        while True:
+            block = f.read(self.buffer_size)
+            if not block:
+                break
+            data = tail + block
+            cut = data.rfind(b"\n") + 1
+            tail = data[cut:]
+            if data.isascii():
+                # One decode per block: characters and bytes line up
+                offset = self.offset
+                for line in data[:cut].decode("ascii").split("\n")[:-1]:
+                    offset += len(line) + 1
+                    self.offset = offset
+                    yield offset, line.rstrip("\r")
+                continue
+            for raw in data[:cut].split(b"\n")[:-1]:
+                self.offset += len(raw) + 1
+                yield self.offset, raw.decode("utf-8", "replace").rstrip("\r")
+        if tail and not self.hold_partial:
+            self.offset += len(tail)
+            yield self.offset, tail.decode("utf-8", "replace").rstrip("\r")
+
+def newline_chunks(path: str, chunk_bytes: int = 64 * 1024 * 1024, start: int = 0,
+                   hold_partial: bool = True) -> List[Tuple[int, int]]:
+    """
+    Splits a plain file, from `start`, into byte ranges that end on a newline.
+    Workers get (path, start, end) and map the file themselves, so no line
+    data is copied between processes. With `hold_partial`, an unterminated
+    last line is left out, as LineStream does.
+    """
+    size = os.path.getsize(path)
+    if size <= start:
+        return []
+    chunks = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        while start < size:
+            end = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            if end == -1:
+                if not hold_partial:
+                    chunks.append((start, size))
+                    break
+                end = mm.rfind(b"\n", start, size)
+                if end == -1:
+                    break
+            chunks.append((start, end + 1))
+            start = end + 1
+    return chunks
+
+def read_range(path: str, start: int, end: int, window: int = 1024 * 1024) -> Iterator[Tuple[int, str]]:
+    """
+    Yields `(end_offset, line)` for one newline-aligned range through a
+    read-only mapping, about `window` bytes at a time to bound memory.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = start
+        while pos < end:
+            cut = mm.find(b"\n", min(pos + window, end) - 1, end)
+            cut = end if cut == -1 else cut + 1
+            data = mm[pos:cut]
+            ascii = data.isascii()
+            lines = (data.decode("ascii") if ascii else data).split("\n" if ascii else b"\n")
+            if not lines[-1]:
+                lines.pop()
+            for raw in lines:
+                pos = min(pos + len(raw) + 1, cut)
+                yield pos, (raw if ascii else raw.decode("utf-8", "replace")).rstrip("\r")
+            pos = cut
+
+class CodecStats:
+    """Bytes and wall time per codec, for sustained MB/sec reporting."""
+    def __init__(self):
+        self.totals: Dict[str, Dict[str, float]] = {}
+
+    def add(self, codec: str, bytes_in: int, bytes_out: int, seconds: float):
+        entry = self.totals.setdefault(codec, {"files": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0})
+        entry["files"] += 1
+        entry["bytes_in"] += bytes_in
+        entry["bytes_out"] += bytes_out
+        entry["seconds"] += seconds
+
+    def report(self) -> List[str]:
+        lines = []
+        for codec, t in sorted(self.totals.items()):
+            seconds = max(t["seconds"], 1e-9)
+            lines.append(
+                f"{codec:<6} files={t['files']:<4} in={t['bytes_in'] / 1e6:8.1f} MB  raw={t['bytes_out'] / 1e6:8.1f} MB  "
+                f"{t['bytes_out'] / 1e6 / seconds:7.1f} MB/s raw  {t['bytes_in'] / 1e6 / seconds:7.1f} MB/s on disk"
+            )
+        return lines
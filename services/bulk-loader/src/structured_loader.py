@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+import sys
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from shared.db.duckdb_client import DuckDBConnector
+from shared.utils.pii_masker import PIIMasker
+from shared.utils.sharded_miner import ShardedTemplateMiner
+
+from log_reader import LineStream, content_length
+
+# Same field precedence as LogParser._parse_json
+FIELD_KEYS = {
+    "timestamp": ["timestamp", "time", "date"],
+    "severity": ["severity", "level"],
+    "service_name": ["service", "app"],
+    "body": ["message", "msg"],
+}
+# Metadata columns lifted from context, as the bulk loader does for parsed lines
+CONTEXT_KEYS = {
+    "environment": ["environment", "env"],
+    "app_id": ["app_id"],
+    "department": ["department", "dept"],
+    "host": ["host"],
+    "region": ["region"],
+}
+DELIMITERS = ",;\t|"
+COMPRESSION = {"plain": "uncompressed", "gzip": "gzip", "zstd": "zstd"}
+TZ_SUFFIX = r"(Z|[+-]\d\d:?\d\d)$"
+
+def sniff_format(path: str, codec: str, sample_lines: int = 50) -> Optional[Dict[str, str]]:
+    """
+    Returns {"format": "json"} for JSON-lines files, {"format": "csv", "delimiter": ...}
+    for delimited files whose header names a message column, else None.
+    Plain files must end with a newline (no line still being written).
+    """
+    if codec == "plain":
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                return None
+    sample = []
+    for _, line in LineStream(path, codec, 64 * 1024, hold_partial=False):
+        if line.strip():
+            sample.append(line)
+        if len(sample) >= sample_lines:
+            break
+    if not sample:
+        return None
+
+    if all(line.lstrip().startswith("{") for line in sample):
+        try:
+            if all(isinstance(json.loads(line), dict) for line in sample):
+                return {"format": "json"}
+        except json.JSONDecodeError:
+            return None
+        return None
+
+    try:
+        dialect = csv.Sniffer().sniff("\n".join(sample), delimiters=DELIMITERS)
+    except csv.Error:
+        return None
+    rows = list(csv.reader(sample, dialect))
+    header = rows[0]
+    if not any(key in header for key in FIELD_KEYS["body"]) or any(len(row) != len(header) for row in rows):
+        return None
+    return {"format": "csv", "delimiter": dialect.delimiter}
+
+# Every key the mapping reads, extracted with one JSON parse per row
+EXTRACTED = [key for keys in list(FIELD_KEYS.values()) + list(CONTEXT_KEYS.values()) for key in keys]
+
+def first_of(keys, fallback: str = "NULL") -> str:
+    """SQL for the first non-empty extracted key, as `a or b or c` does in Python."""
+    return "coalesce(" + ", ".join(f"nullif(f[{EXTRACTED.index(key) + 1}], '')" for key in keys) + f", {fallback})"
+
+class StructuredLoader:
+    """
+    Loads JSON-lines and delimited files through DuckDB's own scanners
+    (`read_ndjson_objects`, `read_csv`) instead of decoding lines in Python.
+
+    Field mapping, timestamp normalization and PII masking (the `mask_pii`
+    Arrow UDF) run inside the staging query; only template mining sees the
+    message column in Python.
+    A file is inserted in one transaction together with its manifest entry.
+    """
+    def __init__(self, db: DuckDBConnector, miner: ShardedTemplateMiner, masker: PIIMasker, batch_size: int = 2000):
+        self.db = db
+        self.conn = db.conn
+        self.miner = miner
+        self.masker = masker
+        self.batch_size = batch_size
+        masker.register(self.conn) # mask_pii(): vectorized masking inside the staging query
+
+    def _scan(self, sniffed: Dict[str, str], codec: str) -> str:
+        compression = COMPRESSION[codec]
+        if sniffed["format"] == "json":
+            return f"SELECT json AS obj FROM read_ndjson_objects(?, compression='{compression}')"
+        delimiter = sniffed["delimiter"].replace("'", "''")
+        return (f"SELECT to_json(t) AS obj FROM read_csv(?, header=true, all_varchar=true, "
+                f"delim='{delimiter}', compression='{compression}') t")
+
+    def stage(self, path: str, codec: str, sniffed: Dict[str, str], filename: str) -> int:
+        """Scans the file into `structured_rows` with `logs` columns; returns the row count."""
+        metadata = "".join(f", {first_of(keys)} AS {column}" for column, keys in CONTEXT_KEYS.items())
+        metadata_columns = "".join(f", {column}" for column in CONTEXT_KEYS)
+        paths = ", ".join(f"'$.{key}'" for key in EXTRACTED)
+        self.conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE structured_rows AS
+            SELECT
+                rn,
+                coalesce(
+                    CASE WHEN regexp_matches(ts, '{TZ_SUFFIX}') THEN try_cast(ts AS TIMESTAMPTZ) AT TIME ZONE 'UTC'
+                         ELSE try_cast(ts AS TIMESTAMP) END,
+                    now() AT TIME ZONE 'UTC'
+                ) AS timestamp,
+                severity, service_name, mask_pii(body) AS body{metadata_columns}, context
+            FROM (
+                SELECT
+                    row_number() OVER () AS rn,
+                    {first_of(FIELD_KEYS["timestamp"])} AS ts,
+                    {first_of(FIELD_KEYS["severity"], "'INFO'")} AS severity,
+                    {first_of(FIELD_KEYS["service_name"], "'unknown'")} AS service_name,
+                    {first_of(FIELD_KEYS["body"], "obj::VARCHAR")} AS body
+                    {metadata},
+                    json_merge_patch(obj, json_object('source_file', ?)) AS context
+                FROM (SELECT obj, json_extract_string(obj, [{paths}]) AS f FROM ({self._scan(sniffed, codec)}))
+            )
+        """, [filename, path])
+        return self.conn.execute("SELECT count(*) FROM structured_rows").fetchone()[0]
+
+    def load(self, path: str, codec: str, sniffed: Dict[str, str], entry: Dict[str, Any]) -> int:
+        """Loads a whole file and marks its manifest entry done; returns the rows inserted."""
+        total = self.stage(path, codec, sniffed, os.path.basename(path))
+        self.conn.execute("CREATE OR REPLACE TEMP TABLE structured_mined (rn BIGINT, body VARCHAR, template_id VARCHAR)")
+        try:
+            for lo in range(0, total, self.batch_size):
+                rows = self.conn.execute(
+                    "SELECT service_name, body FROM structured_rows WHERE rn > ? AND rn <= ? ORDER BY rn",
+                    [lo, lo + self.batch_size]
+                ).fetchall()
+                mined = self.miner.mine_batch(rows)
+                frame = pd.DataFrame({
+                    "rn": range(lo + 1, lo + 1 + len(rows)),
+                    "body": [template for _, template in mined],
+                    "template_id": [template_id for template_id, _ in mined],
+                })
+                self.conn.register("structured_batch", frame)
+                try:
+                    self.conn.execute("INSERT INTO structured_mined SELECT * FROM structured_batch")
+                finally:
+                    self.conn.unregister("structured_batch")
+
+            # `entry` only moves once the rows are committed; a failed load leaves it as it was
+            done = {**entry, "committed_offset": content_length(path, codec), "lines": total, "status": "done"}
+            if total:
+                self.db.insert_select(
+                    "SELECT s.* EXCLUDE (rn, body), m.body, m.template_id "
+                    "FROM structured_rows s JOIN structured_mined m USING (rn)",
+                    manifest=done
+                )
+            else:
+                self.db.save_manifest(done)
+            entry.update(done)
+        finally:
+            self.conn.execute("DROP TABLE IF EXISTS structured_rows")
+            self.conn.execute("DROP TABLE IF EXISTS structured_mined")
+        return total
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The hyphenated service dir is not a package; import its modules directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from landing_watcher import INotify, LandingWatcher
+
+@pytest.mark.parametrize("use_inotify", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(INotify is None, reason="inotify_simple is not installed")),
+])
+def test_reports_new_appended_and_renamed_files(tmp_path, use_inotify):
+    (tmp_path / "app.log").write_text("line 1\n")
+    watcher = LandingWatcher(str(tmp_path), poll_interval=0.05, settle=0.01, use_inotify=use_inotify)
+    assert watcher.mode == ("inotify" if use_inotify else "polling")
+    try:
+        with open(tmp_path / "app.log", "a") as f:
+            f.write("line 2\n")
+        (tmp_path / "notes.txt").write_text("ignored\n")
+        assert watcher.changes() == [str(tmp_path / "app.log")]
+
+        os.rename(tmp_path / "app.log", tmp_path / "app.log.1")
+        (tmp_path / "app.log").write_text("line 3\n")
+        os.utime(tmp_path / "app.log.1", (0, 0)) # Rotated file is the older one
+        assert watcher.changes() == [str(tmp_path / "app.log.1"), str(tmp_path / "app.log")]
+        assert watcher.changes() == []
+    finally:
+        watcher.close()
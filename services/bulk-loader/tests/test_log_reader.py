@@ -0,0 +1,61 @@
+import gzip
+import os
+import sys
+
+import pytest
+
+# The hyphenated service dir is not a package; import its modules directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from log_reader import LineStream, detect_codec, is_log_file, newline_chunks, read_range, zstandard
+
+LINES = [f"2025-11-20 10:00:{i % 60:02d} INFO svc-{i % 3}: request {i} done ✓" for i in range(5000)]
+
+@pytest.fixture
+def plain(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_codecs_yield_identical_lines(plain, tmp_path):
+    data = open(plain, "rb").read()
+    gz = str(tmp_path / "app.log.1") # Rotated and compressed, no .gz suffix
+    with gzip.open(gz, "wb") as f:
+        f.write(data)
+    paths = {"plain": plain, "gzip": gz}
+    if zstandard:
+        paths["zstd"] = str(tmp_path / "app.log.2.zst")
+        with open(paths["zstd"], "wb") as f:
+            f.write(zstandard.ZstdCompressor().compress(data))
+
+    for codec, path in paths.items():
+        assert detect_codec(path) == codec
+        stream = LineStream(path, buffer_size=4096) # Small blocks: many lines cross a block boundary
+        assert [line for _, line in stream] == LINES
+        assert stream.bytes_out == len(data)
+
+def test_resume_from_offset_holds_back_partial_line(plain):
+    offsets = [offset for offset, _ in LineStream(plain)]
+    resumed = LineStream(plain, start=offsets[99])
+    assert [line for _, line in resumed] == LINES[100:]
+
+    with open(plain, "a", encoding="utf-8") as f:
+        f.write("2025-11-20 10:01:00 INFO svc-0: still being writ")
+    stream = LineStream(plain, start=offsets[-1])
+    assert list(stream) == [] and stream.offset == offsets[-1]
+    assert newline_chunks(plain, start=offsets[-1]) == []
+
+def test_mmap_ranges_cover_file_on_line_boundaries(plain):
+    chunks = newline_chunks(plain, chunk_bytes=10000)
+    assert len(chunks) > 10
+    assert chunks[0][0] == 0 and chunks[-1][1] == os.path.getsize(plain)
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    ranges = [item for start, end in chunks for item in read_range(plain, start, end, window=777)]
+    assert [line for _, line in ranges] == LINES
+    assert [offset for offset, _ in ranges] == [offset for offset, _ in LineStream(plain)]
+
+def test_log_file_names():
+    for name in ["app.log", "app.log.1", "app.log.3.gz", "app.log.zst", "2025-01-01.log", "dump.gz", "events.jsonl.1", "export.csv.gz"]:
+        assert is_log_file(name)
+    for name in ["notes.txt", "app.logger", "app.log.bak"]:
+        assert not is_log_file(name)
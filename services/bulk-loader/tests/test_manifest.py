@@ -0,0 +1,128 @@
+import gzip
+import os
+import sys
+
+import duckdb
+import pytest
+
+# The hyphenated service dir is not a package; import its modules directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from log_loader import BulkLoaderJob
+
+def lines(start, count):
+    return "".join(f"2025-11-20 10:00:{i % 60:02d} INFO svc-{i % 3}: request {i} done\n" for i in range(start, start + count))
+
+@pytest.fixture
+def landing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # The job keeps its DB and miner state under data/
+    zone = tmp_path / "landing"
+    zone.mkdir()
+    return zone
+
+def load(zone):
+    job = BulkLoaderJob(validate="off")
+    job.run(landing_zone=str(zone))
+    count = job.db.query("SELECT count(*) FROM logs")[0][0]
+    job.db.close()
+    return job.file_counts, count
+
+def test_rerun_skips_resumes_and_reloads(landing):
+    (landing / "a.log").write_text(lines(0, 300))
+    (landing / "b.log").write_text(lines(0, 50))
+    assert load(landing) == ({"loaded": 2, "resumed": 0, "skipped": 0}, 350)
+
+    # Fully ingested: nothing is read again
+    assert load(landing) == ({"loaded": 0, "resumed": 0, "skipped": 2}, 350)
+
+    # Appended: only the growth is loaded; an unterminated line waits for its newline
+    with open(landing / "a.log", "a") as f:
+        f.write(lines(300, 20) + "2025-11-20 10:01:00 INFO svc-0: half")
+    assert load(landing) == ({"loaded": 0, "resumed": 1, "skipped": 1}, 370)
+    with open(landing / "a.log", "a") as f:
+        f.write(" written\n")
+    assert load(landing) == ({"loaded": 0, "resumed": 1, "skipped": 1}, 371)
+
+    # Replaced under the same name (different head): loaded from the start
+    (landing / "b.log").write_text("2025-11-21 09:00:00 WARN svc-9: rotated in\n" + lines(0, 60))
+    assert load(landing) == ({"loaded": 1, "resumed": 0, "skipped": 1}, 432)
+
+def test_rotated_files_are_not_reloaded(landing):
+    (landing / "app.log").write_text(lines(0, 200))
+    assert load(landing) == ({"loaded": 1, "resumed": 0, "skipped": 0}, 200)
+
+    # logrotate: rename with ten more lines, compress, start a new file
+    with open(landing / "app.log", "a") as f:
+        f.write(lines(200, 10))
+    with open(landing / "app.log", "rb") as src, gzip.open(landing / "app.log.1.gz", "wb") as dst:
+        dst.write(src.read())
+    os.remove(landing / "app.log")
+    (landing / "app.log").write_text("2025-11-21 00:00:00 INFO svc-0: new day\n")
+    assert load(landing)[1] == 211
+
+def test_failed_insert_leaves_the_checkpoint_and_moves_on(landing, monkeypatch):
+    (landing / "a.log").write_text(lines(0, 300))
+    (landing / "b.log").write_text(lines(0, 50))
+    job = BulkLoaderJob(validate="off")
+    job.batch_size = 100
+    insert_batch, calls = job.db.insert_batch, []
+    def disk_full_once(batch, **kwargs):
+        calls.append(len(batch))
+        if len(calls) == 2:
+            raise duckdb.IOException("No space left on device")
+        insert_batch(batch, **kwargs)
+    monkeypatch.setattr(job.db, "insert_batch", disk_full_once)
+
+    job.run(landing_zone=str(landing))
+    a, b = (job.db.get_manifest()[str(landing / name)] for name in ("a.log", "b.log"))
+    assert (a["lines"], a["status"]) == (100, "partial")
+    assert job.manifest[a["path"]]["lines"] == 100 # Not the failed batch's
+    assert (b["lines"], b["status"]) == (50, "done")
+    assert job.db.query("SELECT count(*) FROM logs")[0][0] == 150
+    job.db.close()
+
+    assert load(landing) == ({"loaded": 0, "resumed": 1, "skipped": 1}, 350)
+
+class ScriptedWatcher:
+    """Reports the given batches of changed paths, then stops the watch loop."""
+    landing_zone, mode = "landing", "scripted"
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.closed = False
+
+    def changes(self):
+        if not self.batches:
+            raise KeyboardInterrupt
+        return self.batches.pop(0)
+
+    def close(self):
+        self.closed = True
+
+def test_watch_survives_a_failing_sink(landing, monkeypatch):
+    a, b = str(landing / "a.log"), str(landing / "b.log")
+    (landing / "a.log").write_text(lines(0, 30))
+    (landing / "b.log").write_text(lines(0, 20))
+    job = BulkLoaderJob(validate="off")
+    insert_batch, calls = job.db.insert_batch, []
+    def fails_once(batch, **kwargs):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise duckdb.IOException("No space left on device")
+        insert_batch(batch, **kwargs)
+    monkeypatch.setattr(job.db, "insert_batch", fails_once)
+    process_file, raised = job.process_file, []
+    def broken_parser_once(path):
+        if path == b and not raised:
+            raised.append(path)
+            raise ValueError("unexpected parser failure")
+        return process_file(path)
+    monkeypatch.setattr(job, "process_file", broken_parser_once)
+
+    watcher = ScriptedWatcher([a, b], [], [])
+    job.watch(watcher)
+    # Both failures were retried on the next pass, from their checkpoints
+    assert watcher.closed
+    assert job.db.query("SELECT count(*) FROM logs")[0][0] == 50
+    assert {entry["status"] for entry in job.db.get_manifest().values()} == {"done"}
+    job.db.close()
@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import sys
+
+import duckdb
+import pytest
+
+# The hyphenated service dir is not a package; import its modules directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from log_loader import BulkLoaderJob
+from structured_loader import sniff_format
+
+EVENTS = [
+    {"timestamp": "2025-01-01T10:00:00Z", "level": "ERROR", "service": "payment-service",
+     "message": "Card charge failed for jane@example.com", "user_id": "12", "env": "prod"},
+    {"time": "2025-01-01T12:00:01+02:00", "severity": "WARN", "app": "auth", "msg": "Login from 10.0.0.7", "attempt": 3},
+    {"date": "not a date", "message": "", "msg": "Fallback to msg", "region": "eu-west-1", "host": "web-1"},
+    {"timestamp": "2025-01-01 10:00:02", "message": "Cache warmed in 12 ms", "department": "platform"},
+]
+COLUMNS = "strftime(timestamp, '%H:%M:%S'), severity, service_name, body, template_id, environment, department, host, region, context::VARCHAR"
+
+def load(tmp_path, name, native):
+    job = BulkLoaderJob(validate="off", native=native)
+    job.run(landing_zone=str(tmp_path / "landing"))
+    rows = job.db.query(f"SELECT {COLUMNS} FROM logs ORDER BY severity, body")
+    job.db.close()
+    return rows
+
+@pytest.fixture
+def landing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "landing").mkdir()
+    return tmp_path / "landing"
+
+def test_native_scan_matches_line_parser(landing, tmp_path, monkeypatch):
+    with gzip.open(landing / "events.jsonl.1", "wt") as f:
+        f.write("\n".join(json.dumps(event) for event in EVENTS) + "\n\n")
+    native = load(tmp_path, "native", native=True)
+
+    monkeypatch.chdir(tmp_path / "landing")
+    os.makedirs("data", exist_ok=True)
+    parsed = load(tmp_path, "parsed", native=False)
+
+    # "not a date" falls back to load time on both paths; context differs only in JSON spacing
+    assert [row[1:-1] + (json.loads(row[-1]),) for row in native] == [row[1:-1] + (json.loads(row[-1]),) for row in parsed]
+    assert sorted(row[0] for row in native if row[3] != "Fallback to msg") == ["10:00:00", "10:00:01", "10:00:02"]
+    assert any("<EMAIL_REDACTED>" in row[3] for row in native)
+    assert json.loads(native[0][-1])["source_file"] == "events.jsonl.1"
+
+def test_sniffing_and_csv(landing, tmp_path):
+    (landing / "export.csv").write_text(
+        "timestamp;level;service;message;host\n"
+        "2025-01-01 09:00:00;INFO;billing;Invoice 7 sent to 192.168.1.20;web-2\n"
+        "2025-01-01 09:00:01;INFO;billing;Invoice 8 sent;web-2\n"
+    )
+    (landing / "mixed.log").write_text(json.dumps(EVENTS[0]) + "\n2025-01-01 10:00:00 INFO svc: plain line\n")
+    assert sniff_format(str(landing / "export.csv"), "plain") == {"format": "csv", "delimiter": ";"}
+    assert sniff_format(str(landing / "mixed.log"), "plain") is None
+
+    rows = load(tmp_path, "csv", native=True)
+    billing = [row for row in rows if row[2] == "billing"]
+    assert sorted((row[0], row[3], row[7]) for row in billing) == [
+        ("09:00:00", "Invoice 7 sent to <IP_REDACTED>", "web-2"),
+        ("09:00:01", "Invoice 8 sent", "web-2"),
+    ]
+    assert len(rows) == 4 # mixed.log went through the line parser
+
+def test_failed_native_insert_falls_back_with_an_untouched_entry(landing, monkeypatch):
+    (landing / "events.jsonl").write_text("\n".join(json.dumps(event) for event in EVENTS) + "\n")
+    job = BulkLoaderJob(validate="off")
+    def locked(*args, **kwargs):
+        raise duckdb.TransactionException("Conflict on tuple deletion")
+    monkeypatch.setattr(job.db, "insert_select", locked)
+    job.run(landing_zone=str(landing))
+    entry = job.db.get_manifest()[str(landing / "events.jsonl")]
+    # Loaded line by line from the start, counted once
+    assert (entry["lines"], entry["status"]) == (len(EVENTS), "done")
+    assert job.db.query("SELECT count(*) FROM logs")[0][0] == len(EVENTS)
+    job.db.close()
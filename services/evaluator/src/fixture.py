@@ -0,0 +1,58 @@
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from shared.db.duckdb_client import DuckDBConnector
+
+SERVICES = {
+    "auth-service": "security",
+    "payment-service": "payments",
+    "inventory-service": "supply-chain",
+    "search-api": "discovery",
+}
+MESSAGES = {
+    "INFO": ["Request {n} served in {ms} ms", "User {n} logged in", "Cache warmed for shard {n}"],
+    "WARN": ["Slow query on table orders took {ms} ms", "Retrying request {n}"],
+    "ERROR": ["Login failed for user {n}", "Payment declined for order {n}", "Timeout calling upstream after {ms} ms"],
+}
+SEVERITY_WEIGHTS = {"INFO": 80, "WARN": 12, "ERROR": 8}
+
+def fixture_rows(rows: int = 5000, seed: int = 42) -> List[Dict[str, Any]]:
+    """Deterministic logs: the same seed always yields the same rows, with unique timestamps."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    severities = rng.choices(list(SEVERITY_WEIGHTS), weights=list(SEVERITY_WEIGHTS.values()), k=rows)
+    records = []
+    for i, severity in enumerate(severities):
+        service = rng.choice(list(SERVICES))
+        template = rng.randrange(len(MESSAGES[severity]))
+        ms = rng.randint(1, 5000)
+        records.append({
+            "timestamp": start + timedelta(seconds=37 * i),
+            "severity": severity,
+            "service_name": service,
+            "body": MESSAGES[severity][template].format(n=rng.randint(1, 999), ms=ms),
+            "environment": rng.choice(["prod", "prod", "staging"]),
+            "department": SERVICES[service],
+            "host": f"{service}-{rng.randrange(3)}",
+            "region": rng.choice(["eu-west-1", "us-east-1"]),
+            "template_id": f"{severity}-{template}",
+            "context": {"latency_ms": ms, "user_id": str(rng.randint(1, 500))},
+        })
+    return records
+
+def build_fixture(db_path: str, rows: int = 5000, seed: int = 42) -> DuckDBConnector:
+    """
+    Creates the evaluation database: the production schema (rollups included)
+    filled with `fixture_rows`. Predicted and expected SQL run against it.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    db = DuckDBConnector(db_path=db_path)
+    db.insert_batch(fixture_rows(rows, seed))
+    return db
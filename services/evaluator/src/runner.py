@@ -1,31 +1,59 @@
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
+from services.evaluator.src.fixture import build_fixture
 from services.evaluator.src.scorer import EvalScorer
 from services.schema_discovery.src.agent import DiscoveryAgent
 from services.pilot_orchestrator.src.tools.sql_tool import SQLGenerator
+from services.pilot_orchestrator.src.tools.sql_validator import SQLValidator
+from shared.llm.client import LLMClient
 # from services.pilot_orchestrator.src.nodes import retrieve_context # Harder to isolate RAG node without full graph
 
 class EvalRunner:
     """
     Runs evaluations for specific agents.
+
+    SQL items run concurrently on up to `concurrency` threads (the time is
+    spent waiting on the LLM). Predicted and expected SQL are executed
+    against a seeded fixture database and their result sets compared.
+    Each item records its latency and token usage.
     """
     
-    def __init__(self, dataset_dir: str = "services/evaluator/datasets", provider: str = "openai"):
+    def __init__(self, dataset_dir: str = "services/evaluator/datasets", provider: Optional[str] = None,
+                 concurrency: int = 8, fixture_rows: int = 5000):
         self.dataset_dir = dataset_dir
         self.scorer = EvalScorer()
         self.provider = provider
-        # In a real scenario, we'd pass the provider to the agents
-        # self.discovery_agent = DiscoveryAgent(llm_provider=provider)
-        self.discovery_agent = DiscoveryAgent() 
-        self.sql_generator = SQLGenerator()
+        self.concurrency = concurrency
+        self.fixture_rows = fixture_rows
+        self.llm = LLMClient(provider=provider) # Shared by every agent so usage is tracked in one place
+        self.discovery_agent = DiscoveryAgent(llm=self.llm)
+        self._fixture = None
+        self._fixture_dir: Optional[tempfile.TemporaryDirectory] = None
+
+    def fixture(self):
+        """The seeded evaluation database, built on first use."""
+        if self._fixture is None:
+            self._fixture_dir = tempfile.TemporaryDirectory()
+            self._fixture = build_fixture(os.path.join(self._fixture_dir.name, "eval.duckdb"), rows=self.fixture_rows)
+        return self._fixture
+
+    def close(self):
+        if self._fixture is not None:
+            self._fixture.close()
+            self._fixture_dir.cleanup()
+            self._fixture = None
 
     def load_dataset(self, name: str) -> List[Dict[str, Any]]:
         path = os.path.join(self.dataset_dir, f"{name}.json")
@@ -35,49 +63,97 @@ class EvalRunner:
     def evaluate_schema_discovery(self) -> pd.DataFrame:
         print("🧪 Evaluating Schema Discovery Agent...")
         data = self.load_dataset("schema_discovery")
-        agent = DiscoveryAgent(max_retries=1) # Fast fail for eval
+        agent = DiscoveryAgent(max_retries=1, llm=self.llm) # Fast fail for eval
         
         results = []
         for item in tqdm(data):
             logs = item["logs"]
             expected = item["expected_regex"]
+            held_out = item.get("held_out", []) # Lines the agent never sees in its prompt
             
-            predicted = agent.discover_schema(logs)
+            started = time.perf_counter()
+            with self.llm.track_usage() as usage:
+                predicted = agent.discover_schema(logs, held_out or None)
+            latency = time.perf_counter() - started
             score = self.scorer.score_regex(predicted, expected, logs)
+            report = agent.validator.evaluate(predicted, logs + held_out) if predicted else {}
             
             results.append({
                 "id": item["id"],
                 "score": score,
+                "coverage": report.get("coverage", 0.0),
+                "field_rate": report.get("field_rate", 0.0),
+                "lines_per_sec": report.get("lines_per_sec", 0.0),
+                "latency_s": latency,
+                "llm_calls": usage["calls"],
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
                 "predicted": predicted,
                 "expected": expected
             })
             
         return pd.DataFrame(results)
 
-    def evaluate_sql_gen(self) -> pd.DataFrame:
-        print("🧪 Evaluating SQL Generator...")
+    def evaluate_sql_gen(self, max_attempts: int = 3) -> pd.DataFrame:
+        """
+        Mirrors the Pilot's generate -> validate loop so that `attempts`
+        (LLM calls per question) and `valid` can be tracked alongside accuracy.
+        """
+        print(f"🧪 Evaluating SQL Generator ({self.concurrency} concurrent)...")
         data = self.load_dataset("sql_gen")
-        agent = SQLGenerator()
-        
-        results = []
-        for item in tqdm(data):
+        fixture = self.fixture()
+        agent = SQLGenerator(db=fixture, llm=self.llm)
+        validator = SQLValidator()
+        local = threading.local()
+        cursors = []
+
+        def cursor():
+            # DuckDB connections are not shared across threads; cursors are
+            if not hasattr(local, "cursor"):
+                local.cursor = fixture.conn.cursor()
+                cursors.append(local.cursor)
+            return local.cursor
+
+        def run(item: Dict[str, Any]) -> Dict[str, Any]:
             query = item["query"]
             expected = item["expected_sql"]
+            started = time.perf_counter()
             
-            try:
-                predicted = agent.generate_sql(query)
-            except Exception as e:
-                predicted = str(e)
+            predicted, error, attempts = None, None, 0
+            with self.llm.track_usage() as usage:
+                while attempts < max_attempts:
+                    attempts += 1
+                    try:
+                        predicted = agent.generate_sql(query, previous_sql=predicted, previous_error=error)
+                    except Exception as e:
+                        predicted = str(e)
+                    error = validator.validate(predicted, cursor())
+                    if not error:
+                        break
+            latency = time.perf_counter() - started
                 
-            score = self.scorer.score_sql(predicted, expected)
+            # Only SQL the validator accepted is ever executed
+            score = self.scorer.score_sql(predicted, expected, cursor()) if error is None else 0.0
             
-            results.append({
+            return {
                 "id": item["id"],
                 "score": score,
+                "attempts": attempts,
+                "valid": error is None,
+                "latency_s": latency,
+                "llm_calls": usage["calls"],
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
                 "predicted": predicted,
                 "expected": expected
-            })
+            }
             
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = list(tqdm(pool.map(run, data), total=len(data)))
+        finally:
+            for c in cursors:
+                c.close()
         return pd.DataFrame(results)
 
     # RAG evaluation would go here (omitted for brevity as it requires full KB setup)
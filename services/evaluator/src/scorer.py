@@ -1,5 +1,14 @@
-import re
-from typing import Optional
+import os
+import sys
+import threading
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Optional
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+
+from services.schema_discovery.src.validator import RegexValidator
 
 class EvalScorer:
     """
@@ -12,31 +21,58 @@ class EvalScorer:
         Scores a regex based on whether it matches the sample logs.
         Returns 1.0 if it matches all samples, 0.0 otherwise.
         We don't compare regex strings directly because different regexes can match the same text.
+        A regex that backtracks past the validator's time budget scores 0.0.
         """
         if not predicted_regex:
             return 0.0
-            
-        try:
-            pattern = re.compile(predicted_regex)
-            matches = [bool(pattern.match(log)) for log in sample_logs]
-            return 1.0 if all(matches) else 0.0
-        except re.error:
-            return 0.0
+        return 1.0 if RegexValidator.evaluate(predicted_regex, sample_logs)["valid"] else 0.0
 
     @staticmethod
-    def score_sql(predicted_sql: str, expected_sql: str) -> float:
+    def score_sql(predicted_sql: str, expected_sql: str, conn: Optional[Any] = None, timeout: float = 10.0) -> float:
         """
-        Scores SQL based on exact match or normalized match.
-        Ideally, we would execute both against a DB, but for now we do string comparison.
+        Scores SQL by executing both statements against `conn` (the seeded
+        evaluation fixture) and comparing the result sets as multisets: row
+        order and column names are ignored, floats are compared rounded.
+        Without `conn`, falls back to whitespace-normalized string equality.
+        Only pass SQL that SQLValidator accepted; the predicted SQL is executed.
         """
         if not predicted_sql:
             return 0.0
             
-        # Simple normalization
-        def normalize(s):
-            return " ".join(s.lower().split())
-            
-        return 1.0 if normalize(predicted_sql) == normalize(expected_sql) else 0.0
+        if conn is None:
+            # Simple normalization
+            def normalize(s):
+                return " ".join(s.lower().split())
+            return 1.0 if normalize(predicted_sql) == normalize(expected_sql) else 0.0
+
+        expected = EvalScorer.result_set(conn, expected_sql, timeout)
+        try:
+            predicted = EvalScorer.result_set(conn, predicted_sql, timeout)
+        except Exception:
+            return 0.0
+        return 1.0 if predicted == expected else 0.0
+
+    @staticmethod
+    def result_set(conn: Any, sql: str, timeout: float = 10.0) -> Counter:
+        """Rows of `sql` as an order-insensitive multiset; interrupted after `timeout` seconds."""
+        cursor = conn.cursor()
+        timer = threading.Timer(timeout, cursor.interrupt)
+        timer.start()
+        try:
+            rows = cursor.execute(sql).fetchall()
+        finally:
+            timer.cancel()
+            cursor.close()
+
+        def normalize(value):
+            if isinstance(value, (float, Decimal)):
+                return round(float(value), 6)
+            if isinstance(value, list): # LIST columns, e.g. from array_agg
+                return tuple(normalize(item) for item in value)
+            if isinstance(value, dict): # STRUCT and MAP columns
+                return tuple(sorted((key, normalize(item)) for key, item in value.items()))
+            return value
+        return Counter(tuple(normalize(value) for value in row) for row in rows)
 
     @staticmethod
     def score_rag(predicted_answer: str, expected_answer: str) -> float:
@@ -0,0 +1,62 @@
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.evaluator.src.runner import EvalRunner
+
+ITEMS = [
+    ("How many errors in auth-service?",
+     "SELECT count(*) FROM logs WHERE service_name = 'auth-service' AND severity = 'ERROR'",
+     "select COUNT(1) from logs where severity='ERROR' and service_name='auth-service'"),
+    ("Errors per service",
+     "SELECT service_name, count(*) FROM logs WHERE severity = 'ERROR' GROUP BY 1 ORDER BY 1",
+     "SELECT service_name AS svc, count(*) AS n FROM logs WHERE severity = 'ERROR' GROUP BY service_name ORDER BY n"),
+    ("Average latency in ms",
+     "SELECT avg((context->>'latency_ms')::INT) FROM logs",
+     "SELECT avg(CAST(json_extract_string(context, '$.latency_ms') AS DOUBLE)) FROM logs"),
+    ("List the last 5 logs",
+     "SELECT * FROM logs ORDER BY timestamp DESC LIMIT 5",
+     "SELECT * FROM logs ORDER BY timestamp ASC LIMIT 5"),
+    ("Drop everything", "SELECT 1", "DROP TABLE logs"),
+] * 2
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sql_gen.json").write_text(json.dumps([
+        {"id": f"sql_{i}", "query": query, "expected_sql": expected} for i, (query, expected, _) in enumerate(ITEMS)
+    ]))
+    runner = EvalRunner(dataset_dir=str(tmp_path), provider="local", concurrency=10, fixture_rows=2000)
+
+    def completion(model, messages, temperature):
+        time.sleep(0.3) # LLM round trip
+        prompt = messages[0]["content"]
+        answer = next(predicted for query, _, predicted in ITEMS if query in prompt)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+                               usage=SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(answer) // 4))
+    runner.llm.client = MagicMock()
+    runner.llm.client.chat.completions.create.side_effect = completion
+    yield runner
+    runner.close()
+
+def test_sql_eval_executes_against_fixture_concurrently(runner):
+    started = time.perf_counter()
+    results = runner.evaluate_sql_gen(max_attempts=1)
+    # 10 items x 0.3 s of LLM time, overlapped
+    assert time.perf_counter() - started < 2.0
+
+    # Equivalent SQL scores 1.0 whatever its text; a different result set or rejected SQL scores 0.0
+    assert results["score"].tolist() == [1.0, 1.0, 1.0, 0.0, 0.0] * 2
+    assert results["valid"].tolist() == [True, True, True, True, False] * 2
+    assert (results["latency_s"] >= 0.3).all()
+    assert (results["llm_calls"] == 1).all() and (results["prompt_tokens"] > 0).all()
+    # The rejected DROP never ran
+    assert runner.fixture().query("SELECT count(*) FROM logs")[0][0] == 2000
+
+def test_fixture_is_deterministic(runner):
+    first = runner.fixture().query("SELECT sum(hash(body, severity, timestamp)) FROM logs")[0][0]
+    runner.close()
+    assert runner.fixture().query("SELECT sum(hash(body, severity, timestamp)) FROM logs")[0][0] == first
@@ -6,7 +6,16 @@ const typingIndicator = document.getElementById('typing');
 // Auto-focus input
 userInput.focus();
 
+// One conversation per browser; clearing the chat starts a new one
+function newSessionId() {
+    const id = crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    localStorage.setItem('logpilot-session', id);
+    return id;
+}
+let sessionId = localStorage.getItem('logpilot-session') || newSessionId();
+
 function clearChat() {
+    sessionId = newSessionId();
     messagesContainer.innerHTML = '';
     addMessage('ai', `
         <p>Chat cleared. How can I help you now?</p>
@@ -60,7 +69,7 @@ async function handleSubmit(e) {
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ query: query })
+            body: JSON.stringify({ query: query, session_id: sessionId })
         });
 
         const data = await response.json();
@@ -139,7 +148,7 @@ async function checkHealth() {
 // Load History
 async function loadHistory() {
     try {
-        const response = await fetch('http://localhost:8000/history');
+        const response = await fetch(`http://localhost:8000/history?session_id=${encodeURIComponent(sessionId)}&limit=50`);
         const history = await response.json();
 
         // 1. Populate Chat Window
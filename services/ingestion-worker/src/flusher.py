@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+class AdaptiveBatcher:
+    """
+    Decides when a sink batch is ready: at `target_rows`, at `max_bytes`,
+    or when the oldest buffered item reaches `max_age` seconds, whichever
+    comes first.
+
+    `target_rows` follows the sink: each flush reports its latency and the
+    target moves toward the row count that would take `target_latency`
+    seconds. Sinks with a high fixed cost per call (DuckDB transactions,
+    embedding requests) get larger batches; a slowing sink gets smaller ones.
+    """
+    def __init__(self, min_rows: int = 100, max_rows: int = 20000,
+                 max_bytes: int = 8 * 1024 * 1024, max_age: float = 1.0,
+                 target_latency: float = 0.25, size_fn: Optional[Callable[[Any], int]] = None,
+                 smoothing: float = 0.3):
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.target_latency = target_latency
+        self.size_fn = size_fn or (lambda item: 0)
+        self.smoothing = smoothing
+        self.target_rows = min_rows
+
+        self.items: List[Any] = []
+        self.bytes = 0
+        self.first_at: Optional[float] = None
+
+    def add(self, item: Any):
+        if not self.items:
+            self.first_at = time.monotonic()
+        self.items.append(item)
+        self.bytes += self.size_fn(item)
+
+    def ready(self) -> bool:
+        if not self.items:
+            return False
+        return (
+            len(self.items) >= self.target_rows
+            or self.bytes >= self.max_bytes
+            or time.monotonic() - self.first_at >= self.max_age
+        )
+
+    def time_left(self) -> float:
+        """Seconds until the buffered batch is due on age alone."""
+        if not self.items:
+            return self.max_age
+        return max(0.0, self.max_age - (time.monotonic() - self.first_at))
+
+    def take(self) -> List[Any]:
+        batch = self.items
+        self.items, self.bytes, self.first_at = [], 0, None
+        return batch
+
+    def observe(self, rows: int, latency: float):
+        """Feeds back one flush so the next batches aim at `target_latency`."""
+        if rows <= 0:
+            return
+        ideal = self.target_latency * rows / max(latency, 1e-6)
+        blended = (1 - self.smoothing) * self.target_rows + self.smoothing * ideal
+        self.target_rows = int(min(self.max_rows, max(self.min_rows, blended)))
+
+class SinkWorker:
+    """
+    Runs one sink on its own thread with its own queue and batcher.
+
+    With `block=False`, `offer` never waits: when the queue is full the items
+    are dropped and counted, so a slow sink cannot throttle its producer.
+
+    Dropped items (queue full or failed flush) are passed to `on_drop`.
+    Whenever the worker is idle, and once more when stopping, `backfill` may
+    return items to write again, e.g. dropped events read back from the WAL.
+    """
+    _END = object()
+
+    def __init__(self, name: str, sink: Callable[[List[Any]], None], batcher: AdaptiveBatcher,
+                 queue_size: int = 100, block: bool = False,
+                 on_drop: Optional[Callable[[List[Any]], None]] = None,
+                 backfill: Optional[Callable[[], List[Any]]] = None):
+        self.name = name
+        self.sink = sink
+        self.batcher = batcher
+        self.block = block
+        self.on_drop = on_drop
+        self.backfill = backfill
+        self.inbox: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.backfilled = 0
+        self.errors = 0
+        self.flushes = 0
+        self.sink_sec = 0.0
+        self._thread = threading.Thread(target=self._loop, name=f"sink-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def offer(self, items: List[Any]) -> bool:
+        """Queues a chunk of items for the sink. Returns False if it was dropped."""
+        if not items:
+            return True
+        if self.block:
+            self.inbox.put(items)
+            return True
+        try:
+            self.inbox.put_nowait(items)
+            return True
+        except queue.Full:
+            self._drop(items)
+            return False
+
+    def _drop(self, items: List[Any]):
+        self.dropped += len(items)
+        if self.on_drop:
+            self.on_drop(items)
+
+    def _loop(self):
+        while True:
+            try:
+                chunk = self.inbox.get(timeout=self.batcher.time_left())
+            except queue.Empty:
+                chunk = None
+
+            done = chunk is self._END
+            if chunk is not None and not done:
+                for item in chunk:
+                    self.batcher.add(item)
+            if done or self.batcher.ready():
+                self._flush()
+            if done or (chunk is None and not self.batcher.items):
+                self._backfill()
+            if done:
+                return
+
+    def _backfill(self):
+        """Writes backfill items until none are left, new items arrive or a write fails."""
+        if self.backfill is None:
+            return
+        while self.inbox.empty():
+            try:
+                items = self.backfill()
+            except Exception as e:
+                print(f"❌ [{self.name}] Error reading items to backfill: {e}")
+                return
+            if not items:
+                return
+            print(f"♻️  [{self.name}] Backfilling {len(items)} dropped items")
+            if not self._flush(items):
+                return
+            self.backfilled += len(items)
+
+    def _flush(self, batch: Optional[List[Any]] = None) -> bool:
+        batch = batch if batch is not None else self.batcher.take()
+        if not batch:
+            return True
+        ok = True
+        started = time.perf_counter()
+        try:
+            self.sink(batch)
+            self.written += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            ok = False
+            self.errors += 1
+            self._drop(batch)
+            print(f"❌ [{self.name}] Error flushing batch of {len(batch)}: {e}")
+        latency = time.perf_counter() - started
+        self.sink_sec += latency
+        self.batcher.observe(len(batch), latency)
+        return ok
+
+    def stop(self, timeout: Optional[float] = None):
+        """Flushes what is queued and stops the worker."""
+        if self._thread.is_alive():
+            self.inbox.put(self._END)
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "backfilled": self.backfilled,
+            "errors": self.errors,
+            "flushes": self.flushes,
+            "sink_sec": round(self.sink_sec, 3),
+            "target_rows": self.batcher.target_rows,
+            "queued": self.inbox.qsize(),
+        }
@@ -1,22 +1,36 @@
 import sys
 import os
-import time
-import random
-from datetime import datetime
-from typing import Dict, Any, List
+import argparse
+from typing import Dict, Any, List, Optional
 
 # Add project root to python path to allow importing shared modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+# Sibling modules (the hyphenated service dir is not an importable package)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from shared.log_schema import LogEvent
+from shared.log_schema import LogRecord, RecordValidator
 from shared.db.duckdb_client import DuckDBConnector
+from shared.db.retention import RetentionManager
 from shared.utils.pii_masker import PIIMasker
+from shared.utils.stage_profiler import StackSampler, StageProfiler
 from services.knowledge_base.src.store import KnowledgeStore
 
-class MockKafkaConsumer:
-    """Simulates a Kafka Consumer yielding raw log lines."""
+from shared.utils.sharded_miner import ShardedTemplateMiner
+from shared.utils.log_parser import LogParser
+from shared.utils.parser_registry import ParserRegistry
+from services.schema_discovery.src.agent import lazy_discovery
+from shared.utils.context_extractor import extract_kv
+
+from sources import LogSource, OffsetStore, FileTailSource, SyslogSource, QueueSource
+from pipeline import IngestionPipeline
+from flusher import AdaptiveBatcher, SinkWorker
+from wal import AckTracker, SegmentLog
+
+class MockKafkaConsumer(QueueSource):
+    """Simulates a Kafka topic pre-loaded with raw log lines."""
     def __init__(self):
-        self.logs = [
+        super().__init__(name="queue:mock-kafka", follow=False)
+        self.publish_many([
             "2025-11-20 10:00:01 INFO payment-service: Payment processed for user_id=101 amount=50.00",
             "2025-11-20 10:00:02 ERROR auth-service: Login failed for user=admin ip=192.168.1.5 reason=bad_password",
             "2025-11-20 10:00:03 WARN db-service: Slow query detected on table=users duration=500ms",
@@ -25,120 +39,257 @@ class MockKafkaConsumer:
             # PII Examples
             "2025-11-20 10:00:06 INFO email-service: Sending email to john.doe@example.com",
             "2025-11-20 10:00:07 INFO billing-service: Charging card 4111-1111-1111-1111 for $99.99"
-        ]
-
-    def __iter__(self):
-        for log in self.logs:
-            time.sleep(0.2) # Simulate network latency
-            yield log
-
-from shared.utils.template_miner import LogTemplateMiner
-
-
-
-from shared.utils.log_parser import LogParser
+        ])
 
 class LogIngestor:
-    def __init__(self):
-        self.consumer = MockKafkaConsumer()
-        self.miner = LogTemplateMiner(persistence_file="data/state/drain3_state.bin")
-        self.kb = KnowledgeStore() # ChromaDB (might download models)
-        self.db = DuckDBConnector() # Acquire DB lock ONLY after heavy init
+    def __init__(self, source: Optional[LogSource] = None, db_path: str = "data/target/logs.duckdb",
+                 enable_kb: bool = True, miner_state: str = "data/state/drain3_shards",
+                 wal_dir: Optional[str] = "data/state/wal", fsync: str = "batch",
+                 validate: str = "sample", parser_registry: Optional[str] = "data/state/parser_registry.json",
+                 discovery: bool = True, stats_path: Optional[str] = "data/state/ingestion_stats.jsonl",
+                 stats_interval: float = 10.0):
+        self.consumer = source or MockKafkaConsumer()
+        self.miner = ShardedTemplateMiner(state_dir=miner_state) # One Drain tree per service
+        self.kb = KnowledgeStore() if enable_kb else None # ChromaDB (might download models)
+        self.db = DuckDBConnector(db_path=db_path) # Acquire DB lock ONLY after heavy init
+        self.retention = RetentionManager(self.db) # Runs on its own cursor next to the writer
         self.pii_masker = PIIMasker()
-        self.parser = LogParser()
-        self.batch_size = 5
-        self.batch_buffer = []
-        self.log_event_buffer = [] # Buffer for LogEvent objects (needed for KB)
+        # Learned parsers for formats the built-in patterns miss; unknown shapes go to discovery once
+        self.parser = LogParser(ParserRegistry(
+            parser_registry, discover=lazy_discovery() if discovery else None
+        ) if parser_registry else None)
+        self.validator = RecordValidator(mode=validate) # pydantic only on a sample of records
+        self.queue_size = 1000
+        # Flush when any limit is hit; rows adapt toward the target sink latency
+        self.flush_policy = {
+            "duckdb": {"min_rows": 500, "max_rows": 20000, "max_bytes": 8 * 1024 * 1024,
+                       "max_age": 1.0, "target_latency": 0.25},
+            "kb": {"min_rows": 32, "max_rows": 2000, "max_bytes": 2 * 1024 * 1024,
+                   "max_age": 5.0, "target_latency": 2.0},
+        }
+        self.kb_queue_size = 50 # Batches; beyond this, KB writes are dropped, never waited on
+        self.pipeline: Optional[IngestionPipeline] = None
+        self.kb_worker: Optional[SinkWorker] = None
+        # Parsed events are journaled until both sinks confirm them
+        self.wal = SegmentLog(
+            wal_dir, sinks=("duckdb", "kb") if self.kb else ("duckdb",), fsync=fsync
+        ) if wal_dir else None
+        # KB batches can be dropped or fail; only its contiguous watermark is acked
+        self.kb_acks = AckTracker(self.wal, "kb") if self.wal and self.kb else None
+        # Per-stage timings, summarized every `stats_interval` seconds (progress report + stats file)
+        self.profiler = StageProfiler(stats_path, interval=stats_interval)
+        self.sampler: Optional[StackSampler] = None # On-demand stack sampling, see run()
 
-    def parse_log(self, raw_log: str) -> LogEvent:
-        """
-        Core Ingestion Pipeline:
-        1. Parse: Normalize raw string -> Structured Dict (Timestamp, Severity, Service).
-        2. Mask: Redact PII (Emails, IPs) from the body.
-        3. Mine: Convert variable body -> Constant Template (Drain3).
-        4. Context: Extract dynamic key-value pairs.
-        """
-        
+    def parse_stage(self, raw_log: str) -> Dict[str, Any]:
         # Step 1: Robust Parsing
         # Uses the Strategy Pattern (JSON -> Regex -> Fallback) to handle any format.
         # Ensures 'timestamp' is always UTC.
-        parsed = self.parser.parse(raw_log)
-        
+        return self.parser.parse(raw_log)
+
+    def mask_stage(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
         # Step 2: PII Masking
         # We mask BEFORE mining templates to ensure sensitive data never enters the system.
         # e.g. "User 1.2.3.4 failed" -> "User <IP> failed"
-        safe_body = self.pii_masker.mask_text(parsed["body"])
-        
+        parsed["body"] = self.pii_masker.mask_text(parsed["body"])
+        return parsed
+
+    def mine_stage(self, parsed: Dict[str, Any]) -> LogRecord:
+        safe_body = parsed["body"]
+
         # Step 3: Template Mining (Drain3)
         # Clusters similar logs to reduce noise.
         # e.g. "User <IP> failed" -> "User <*> failed"
-        template = self.miner.mine_template(safe_body)
-        
+        template_id, template = self.miner.mine_template_with_id(safe_body, parsed["service_name"])
+
         # Step 4: Context Extraction
         # We preserve the original dynamic values in a JSON column.
         # If the log was JSON, we use that. Otherwise, we try to extract k=v pairs.
-        context = parsed.get("context", {})
-        if not context:
-             # Simple heuristic for standard logs: look for k=v patterns
-            for part in safe_body.split(" "):
-                if "=" in part:
-                    try:
-                        k, v = part.split("=", 1)
-                        context[k] = v
-                    except ValueError:
-                        pass
-
-        return LogEvent(
+        context = parsed.get("context") or extract_kv(safe_body)
+
+        return LogRecord(
             timestamp=parsed["timestamp"],
             severity=parsed["severity"],
             service_name=parsed["service_name"],
             body=template, 
+            template_id=template_id,
             context=context
         )
 
-    def flush_batch(self):
-        if not self.batch_buffer:
+    def validate_stage(self, record: LogRecord) -> LogRecord:
+        # Step 5: Validation (pydantic, on a sample of records)
+        return self.validator.check(record)
+
+    def parse_log(self, raw_log: str) -> LogRecord:
+        """
+        Core Ingestion Pipeline:
+        1. Parse: Normalize raw string -> Structured Dict (Timestamp, Severity, Service).
+        2. Mask: Redact PII (Emails, IPs) from the body.
+        3. Mine: Convert variable body -> Constant Template (Drain3).
+        4. Context: Extract dynamic key-value pairs.
+        5. Validate: Check a sample of records against the LogEvent schema.
+
+        In streaming mode each step runs as its own pipeline stage (see build_pipeline).
+        """
+        return self.validate_stage(self.mine_stage(self.mask_stage(self.parse_stage(raw_log))))
+
+    @staticmethod
+    def event_size(event: LogRecord) -> int:
+        """Rough in-memory size of an event, for byte-based flushing."""
+        return 64 + len(event.body) + sum(len(str(k)) + len(str(v)) for k, v in event.context.items())
+
+    @staticmethod
+    def encode_event(event: LogRecord) -> bytes:
+        return event.to_json()
+
+    def _batch_size(self, item: Any) -> int:
+        return self.event_size(item[1] if self.wal else item)
+
+    @property
+    def wal_watermark(self) -> str:
+        # Keyed by log id: a wiped WAL restarts at seq 1 and must not be compared to the old one
+        return f"wal:{self.wal.log_id}"
+
+    def write_batch(self, batch: List[Any]):
+        """
+        Primary sink: DuckDB (structured). Raising leaves the batch unacknowledged.
+        With the WAL on, items are (seq, event) and the WAL watermark commits with the rows.
+        """
+        print(f"💾 Flushing batch of {len(batch)} logs to DuckDB...")
+        if self.wal is None:
+            self.db.insert_batch(batch)
             return
-        
-        print(f"💾 Flushing batch of {len(self.batch_buffer)} logs to DuckDB & ChromaDB...")
+        last_seq = batch[-1][0]
+        self.db.insert_batch([event for _, event in batch], watermark=(self.wal_watermark, last_seq))
+        self.wal.ack("duckdb", last_seq)
+
+    def dead_letter_batch(self, batch: List[Any], error: Exception):
+        """
+        Sets aside a journaled batch DuckDB keeps rejecting, then acks past it so
+        the WAL truncates and a restart does not replay it. It is not offered to
+        the KB either; the dead-letter file is the copy to reprocess.
+        """
+        path = self.wal.dead_letter("duckdb", [(seq, self.encode_event(event)) for seq, event in batch], repr(error))
+        self.wal.ack("duckdb", batch[-1][0])
+        if self.kb_acks:
+            self.kb_acks.applied_seqs(seq for seq, _ in batch)
+        print(f"☠️  {len(batch)} logs DuckDB rejected were moved to {path}")
+
+    def write_kb(self, batch: List[Any]):
+        """Secondary sink: ChromaDB (unstructured), fed after DuckDB has the rows."""
+        if self.wal is None:
+            self.kb.add_logs(batch)
+            return
+        # Ids derived from the WAL position make a replay overwrite, not duplicate
+        self.kb.add_logs([event for _, event in batch],
+                         doc_ids=[f"{self.wal.log_id}-{seq}" for seq, _ in batch])
+        self.kb_acks.applied_seqs(seq for seq, _ in batch)
+
+    def kb_dropped(self, batch: List[Any]):
+        if self.kb_acks:
+            self.kb_acks.dropped_seqs(seq for seq, _ in batch)
+
+    def kb_backfill(self) -> List[Any]:
+        """Journaled events the KB dropped, read back from the WAL for another attempt."""
+        if self.kb_acks is None:
+            return []
+        limit = self.flush_policy["kb"]["max_rows"]
+        return [(seq, LogRecord.from_json(payload)) for seq, payload in self.kb_acks.missing(limit)]
+
+    def recover(self, chunk: int = 5000):
+        """
+        Replays journaled events that a sink had not confirmed when the worker stopped.
+        DuckDB resumes after its committed watermark, so rows are never applied twice.
+        """
+        if self.wal is None:
+            return
+        # Dead-lettered batches are acked in the WAL without moving the DuckDB watermark
+        applied = max(self.db.get_watermark(self.wal_watermark), self.wal.acks.get("duckdb", 0))
+        replayed = self._replay(self.wal.pending("duckdb", after=applied), self.write_batch, chunk)
+        if applied:
+            self.wal.ack("duckdb", applied)
+        if self.kb:
+            replayed += self._replay(self.wal.pending("kb"), self.write_kb, chunk)
+        if replayed:
+            print(f"♻️  Recovered {replayed} journaled events from {self.wal.directory}")
+
+        # The journal may be ahead of the source's own offset file
+        if self.wal.source == self.consumer.name and self.wal.last_offset is not None:
+            self.consumer.commit(self.wal.last_offset)
+        self.wal.set_source(self.consumer.name)
+
+    def _replay(self, records, write, chunk: int) -> int:
+        batch, count = [], 0
+        for seq, payload in records:
+            batch.append((seq, LogRecord.from_json(payload)))
+            if len(batch) >= chunk:
+                write(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            write(batch)
+            count += len(batch)
+        return count
+
+    def build_pipeline(self, source: Optional[LogSource] = None) -> IngestionPipeline:
+        taps = []
+        if self.kb:
+            # The embedding model is far slower than DuckDB; it runs on its own
+            # worker and queue so it can never stall parsing or structured writes.
+            self.kb_worker = SinkWorker(
+                "kb", self.write_kb,
+                AdaptiveBatcher(size_fn=self._batch_size, **self.flush_policy["kb"]),
+                queue_size=self.kb_queue_size, block=False,
+                on_drop=self.kb_dropped, backfill=self.kb_backfill,
+            )
+            taps.append(self.kb_worker)
+
+        return IngestionPipeline(
+            source or self.consumer,
+            stages=[
+                ("parse", self.parse_stage),
+                ("mask", self.mask_stage),
+                ("mine", self.mine_stage),
+                ("validate", self.validate_stage),
+            ],
+            sink=self.write_batch,
+            queue_size=self.queue_size,
+            batcher=AdaptiveBatcher(size_fn=self._batch_size, **self.flush_policy["duckdb"]),
+            taps=taps,
+            journal=self.wal,
+            encode=self.encode_event,
+            profiler=self.profiler,
+            dead_letter=self.dead_letter_batch if self.wal else None,
+        )
+
+    def run_pipeline(self, pipeline: IngestionPipeline) -> Dict[str, Any]:
+        """Runs the pipeline to completion, then drains the secondary sinks."""
+        for tap in pipeline.taps:
+            tap.start()
         try:
-            # 1. Write to DuckDB (Structured)
-            self.db.insert_batch(self.batch_buffer)
-            
-            # 2. Write to ChromaDB (Unstructured)
-            self.kb.add_logs(self.log_event_buffer)
-            
-            # Clear buffers
-            self.batch_buffer = []
-            self.log_event_buffer = []
-        except Exception as e:
-            print(f"❌ Error flushing batch: {e}")
+            return pipeline.run()
+        finally:
+            for tap in pipeline.taps:
+                tap.stop()
+            if self.kb_worker and self.kb_worker.dropped:
+                print(f"⚠️ Knowledge Base fell behind: {self.kb_worker.dropped} logs dropped, "
+                      f"{self.kb_worker.backfilled} backfilled"
+                      + (" (the rest is replayed from the WAL on restart)" if self.kb_acks else ""))
 
     def run(self):
         print("🚀 Starting Ingestion Worker (Real-Time Mode)...")
+        print(f"📥 Source: {self.consumer.name}")
         print("🔒 PII Masking Enabled")
         print("🗄️  DuckDB Persistence Enabled")
-        print("🧠 ChromaDB Persistence Enabled")
+        print("🧠 ChromaDB Persistence " + ("Enabled" if self.kb else "Disabled"))
+        self.recover()
+        self.retention.start()
+        if self.sampler and self.sampler.install():
+            print(f"🔥 kill -USR1 {os.getpid()} toggles stack sampling into {self.sampler.directory}")
+        self.pipeline = self.build_pipeline()
         
         try:
-            for raw_log in self.consumer:
-                try:
-                    event = self.parse_log(raw_log)
-                    
-                    # Add to buffer
-                    self.batch_buffer.append(event.model_dump())
-                    self.log_event_buffer.append(event)
-                    
-                    print(f"✅ Processed: {event.timestamp} [{event.service_name}] {event.body}")
-                    
-                    if len(self.batch_buffer) >= self.batch_size:
-                        self.flush_batch()
-                        
-                except Exception as e:
-                    print(f"⚠️ Failed to process log: {raw_log} -> {e}")
-            
-            # Flush remaining
-            self.flush_batch()
+            stats = self.run_pipeline(self.pipeline)
+            print(f"📊 Pipeline stats: {stats}")
             
             # Verification Query
             print("\n🔎 Verifying Data in DuckDB:")
@@ -150,16 +301,55 @@ class LogIngestor:
             for row in samples:
                 print(f"   - Body: {row[0]}")
                 print(f"   - Context: {row[1]}")
-            
-            # Close connection to release lock
-            self.db.close()
 
         except KeyboardInterrupt:
+            # The pipeline drains and commits what it already read before returning
             print("\n🛑 Stopping worker...")
-            self.flush_batch()
+        finally:
+            # Close connection to release lock
+            self.retention.stop()
+            if self.sampler:
+                self.sampler.stop()
+            self.consumer.close()
+            if self.wal:
+                self.wal.close()
+            self.miner.close()
+            if self.parser.registry:
+                self.parser.registry.close()
             self.db.close()
 
+def build_source(args: argparse.Namespace) -> LogSource:
+    offsets = OffsetStore(args.offsets_dir)
+    if args.source == "file":
+        return FileTailSource(args.path, offsets=offsets, follow=not args.no_follow)
+    if args.source in ("syslog-udp", "syslog-tcp"):
+        return SyslogSource(host=args.host, port=args.port, protocol=args.source.split("-")[1])
+    return MockKafkaConsumer()
+
 if __name__ == "__main__":
-    ingestor = LogIngestor()
+    parser = argparse.ArgumentParser(description="Streaming log ingestion worker.")
+    parser.add_argument("--source", choices=["mock", "file", "syslog-udp", "syslog-tcp"], default="mock", help="Where to read raw log lines from.")
+    parser.add_argument("--path", type=str, help="Log file to tail (--source file).")
+    parser.add_argument("--no_follow", action="store_true", help="Stop at end of file instead of tailing.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Syslog listen address.")
+    parser.add_argument("--port", type=int, default=5140, help="Syslog listen port.")
+    parser.add_argument("--offsets_dir", type=str, default="data/state/offsets", help="Where committed source offsets are kept.")
+    parser.add_argument("--no_kb", action="store_true", help="Skip ChromaDB writes.")
+    parser.add_argument("--wal_dir", type=str, default="data/state/wal", help="Write-ahead log for unconfirmed events.")
+    parser.add_argument("--fsync", choices=SegmentLog.POLICIES, default="batch", help="When the WAL is synced to disk.")
+    parser.add_argument("--validate", choices=RecordValidator.MODES, default="sample", help="pydantic validation of parsed events.")
+    parser.add_argument("--no_discovery", action="store_true", help="Do not send unknown log formats to LLM schema discovery.")
+    parser.add_argument("--stats_file", type=str, default="data/state/ingestion_stats.jsonl", help="Where per-interval stage summaries are appended ('' to disable).")
+    parser.add_argument("--stats_interval", type=float, default=10.0, help="Seconds between stage summaries.")
+    parser.add_argument("--profile_dir", type=str, default=None, help="Enable SIGUSR1-toggled stack sampling, dumping collapsed stacks here.")
+    args = parser.parse_args()
+    if args.source == "file" and not args.path:
+        parser.error("--path is required with --source file")
+
+    ingestor = LogIngestor(source=build_source(args), enable_kb=not args.no_kb,
+                           wal_dir=args.wal_dir, fsync=args.fsync, validate=args.validate, discovery=not args.no_discovery,
+                           stats_path=args.stats_file or None, stats_interval=args.stats_interval)
+    if args.profile_dir:
+        ingestor.sampler = StackSampler(args.profile_dir)
     ingestor.run()
 
@@ -0,0 +1,282 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flusher import AdaptiveBatcher, SinkWorker
+
+# Marks the end of the stream as it travels down the stages
+_END = object()
+
+class Stage:
+    """
+    One pipeline step on its own thread, reading from a bounded inbox.
+    `fn` maps a payload to the next payload; returning None drops the item.
+    With a `timer` (StageProfiler), each item's busy time is also recorded there.
+    """
+    def __init__(self, name: str, fn: Callable[[Any], Any], inbox: queue.Queue, outbox: queue.Queue,
+                 timer: Optional[Any] = None):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_sec = 0.0
+        self.timer = timer
+        self.thread = threading.Thread(target=self._loop, name=f"stage-{name}", daemon=True)
+
+    def _loop(self):
+        while True:
+            item = self.inbox.get()
+            if item is _END:
+                self.outbox.put(_END)
+                return
+            offset, payload = item
+            started = time.perf_counter()
+            try:
+                result = self.fn(payload)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ [{self.name}] Failed to process log: {payload} -> {e}")
+                result = None
+            elapsed = time.perf_counter() - started
+            self.busy_sec += elapsed
+            if self.timer is not None:
+                self.timer.add(elapsed)
+            if result is None:
+                self.dropped += 1
+                # Still forward the offset so the sink can commit past dropped lines
+                self.outbox.put((offset, None))
+                continue
+            self.processed += 1
+            self.outbox.put((offset, result)) # Blocks when the next stage falls behind
+
+class IngestionPipeline:
+    """
+    Bounded-queue pipeline: source -> stage_1 -> ... -> stage_n -> sink.
+
+    Each stage runs on its own thread, so parsing, masking and mining overlap
+    instead of running strictly one line at a time. Every queue is bounded:
+    when the sink (DuckDB/ChromaDB) falls behind, the queues fill up and the
+    reader blocks, which pushes back on the source instead of growing memory.
+
+    The sink thread is the primary (DuckDB) writer: its inbox is the last
+    queue, and an AdaptiveBatcher decides when to flush (rows, bytes or age).
+    After a batch is written, the source offset of its last line is committed,
+    so a restart replays at most the batches that were in flight (at-least-once
+    delivery). A batch the sink keeps rejecting is retried `sink_retries` times,
+    then handed to `dead_letter` (or dropped and counted without one).
+
+    Written batches are then offered to `taps`, secondary SinkWorkers (the
+    vector store) with their own queues. Taps never block this thread.
+
+    With a `journal` (write-ahead SegmentLog), each event is appended as it
+    reaches the sink thread, and batch items become (seq, payload). Offsets
+    are committed once the journal is synced, ahead of the sink write. Retries
+    are bounded here too: a batch the sink always rejects (a poison batch)
+    would otherwise stall the sink thread, fill the queues and block every
+    source. `dead_letter` should set such a batch aside and ack past it, so
+    the journal can truncate; a dropped batch stays journaled and is replayed
+    on restart.
+
+    With a `profiler` (StageProfiler), every stage and the sink ("insert")
+    also feed its per-interval summaries.
+    """
+
+    def __init__(self, source: Any, stages: List[Tuple[str, Callable[[Any], Any]]],
+                 sink: Callable[[List[Any]], None], queue_size: int = 1000,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 sink_retries: int = 3, retry_backoff: float = 0.5,
+                 batcher: Optional[AdaptiveBatcher] = None, taps: Optional[List[SinkWorker]] = None,
+                 journal: Optional[Any] = None, encode: Optional[Callable[[Any], bytes]] = None,
+                 profiler: Optional[Any] = None,
+                 dead_letter: Optional[Callable[[List[Any], Exception], None]] = None):
+        self.source = source
+        self.journal = journal
+        self.encode = encode
+        self.sink = sink
+        self.sink_retries = sink_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter = dead_letter
+        # Without a batcher, flush at a fixed `batch_size` / `flush_interval`
+        self.batcher = batcher or AdaptiveBatcher(
+            min_rows=batch_size, max_rows=batch_size, max_age=flush_interval
+        )
+        self.taps = taps or []
+        self.profiler = profiler
+
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+        self.stages = [
+            Stage(name, fn, self.queues[i], self.queues[i + 1], profiler.timer(name) if profiler else None)
+            for i, (name, fn) in enumerate(stages)
+        ]
+        self.max_depth = [0] * len(self.queues)
+        self._sink_timer = profiler.timer("insert") if profiler else None
+
+        self.read = 0
+        self.written = 0
+        self.batches = 0
+        self.sink_errors = 0
+        self.sink_dropped = 0
+        self.sink_dead_lettered = 0
+        self.sink_sec = 0.0
+        self.blocked_sec = 0.0 # Time the reader spent waiting on a full queue (backpressure)
+        self.committed_offset: Optional[int] = None
+        self.elapsed_sec = 0.0
+        self._sink_thread = threading.Thread(target=self._sink_loop, name="stage-sink", daemon=True)
+
+    def _sink_loop(self):
+        inbox = self.queues[-1]
+        last_offset = None
+        while True:
+            try:
+                item = inbox.get(timeout=self.batcher.time_left())
+            except queue.Empty:
+                item = None
+
+            done = item is _END
+            if item is not None and not done:
+                offset, payload = item
+                last_offset = offset
+                if payload is not None:
+                    if self.journal is not None:
+                        payload = (self.journal.append(self.encode(payload), offset), payload)
+                    self.batcher.add(payload)
+
+            if done or self.batcher.ready():
+                self._flush(self.batcher.take(), last_offset)
+                last_offset = None
+            if done:
+                return
+
+    def _flush(self, batch: List[Any], last_offset: Optional[int]):
+        if self.journal is not None:
+            # Durable in the journal: the source can move on before the sinks have it
+            self.journal.sync()
+            self._commit(last_offset)
+            if batch:
+                self._write(batch)
+        elif not batch or self._write(batch):
+            self._commit(last_offset)
+
+    def _write(self, batch: List[Any]) -> bool:
+        """Writes `batch`, retrying; False if it was dropped (neither written nor dead-lettered)."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self.sink(batch)
+                latency = time.perf_counter() - started
+                self.sink_sec += latency
+                if self._sink_timer is not None:
+                    self._sink_timer.add(latency, len(batch))
+                break
+            except Exception as e:
+                self.sink_sec += time.perf_counter() - started
+                self.sink_errors += 1
+                attempt += 1
+                print(f"❌ Error flushing batch (attempt {attempt}): {e}")
+                if attempt > self.sink_retries:
+                    return self._give_up(batch, e, attempt)
+                time.sleep(min(self.retry_backoff * attempt, 30.0))
+
+        self.batcher.observe(len(batch), latency)
+        self.written += len(batch)
+        self.batches += 1
+        for tap in self.taps:
+            tap.offer(batch)
+        return True
+
+    def _give_up(self, batch: List[Any], error: Exception, attempts: int) -> bool:
+        if self.dead_letter is not None:
+            try:
+                self.dead_letter(batch, error)
+                self.sink_dead_lettered += len(batch)
+                print(f"☠️  Dead-lettered batch of {len(batch)} logs after {attempts} attempts")
+                return True
+            except Exception as e:
+                print(f"❌ Could not dead-letter batch: {e}")
+        # Leave the offset uncommitted (or the journal unacked) so a restart replays it
+        self.sink_dropped += len(batch)
+        print(f"❌ Dropping batch of {len(batch)} logs after {attempts} attempts")
+        return False
+
+    def _commit(self, last_offset: Optional[int]):
+        if last_offset is not None:
+            self.source.commit(last_offset)
+            self.committed_offset = last_offset
+
+    def _put(self, item: Any):
+        head = self.queues[0]
+        if head.full():
+            started = time.perf_counter()
+            head.put(item)
+            self.blocked_sec += time.perf_counter() - started
+        else:
+            head.put(item)
+
+    def _track_depth(self):
+        for i, q in enumerate(self.queues):
+            depth = q.qsize()
+            if depth > self.max_depth[i]:
+                self.max_depth[i] = depth
+
+    def run(self) -> Dict[str, Any]:
+        """Consumes the source until it ends (or `stop()` is called) and drains the stages."""
+        started = time.perf_counter()
+        for stage in self.stages:
+            stage.thread.start()
+        self._sink_thread.start()
+        if self.profiler:
+            self.profiler.start()
+
+        try:
+            for item in self.source:
+                self._put(item)
+                self.read += 1
+                if self.read % 1000 == 0:
+                    self._track_depth()
+        finally:
+            self._put(_END)
+            for stage in self.stages:
+                stage.thread.join()
+            self._sink_thread.join()
+            self.elapsed_sec = time.perf_counter() - started
+            if self.profiler:
+                self.profiler.stop()
+        return self.stats()
+
+    def stop(self):
+        """Stops reading; lines already in the pipeline are still written."""
+        self.source.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = self.elapsed_sec or 1e-9
+        return {
+            "read": self.read,
+            "written": self.written,
+            "batches": self.batches,
+            "sink_errors": self.sink_errors,
+            "sink_dropped": self.sink_dropped,
+            "sink_dead_lettered": self.sink_dead_lettered,
+            "committed_offset": self.committed_offset,
+            "source_dropped": getattr(self.source, "dropped", 0),
+            "elapsed_sec": round(self.elapsed_sec, 3),
+            "events_per_sec": round(self.written / elapsed, 1),
+            "backpressure_sec": round(self.blocked_sec, 3),
+            "sink_sec": round(self.sink_sec, 3),
+            "batch_target_rows": self.batcher.target_rows,
+            "taps": {tap.name: tap.stats() for tap in self.taps},
+            "stages": {
+                s.name: {
+                    "processed": s.processed,
+                    "dropped": s.dropped,
+                    "errors": s.errors,
+                    "busy_sec": round(s.busy_sec, 3),
+                }
+                for s in self.stages
+            },
+            "max_queue_depth": self.max_depth,
+        }
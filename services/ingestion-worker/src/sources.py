@@ -0,0 +1,282 @@
+import json
+import os
+import queue
+import socketserver
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+class OffsetStore:
+    """
+    Persists the last committed offset per source so a restarted worker
+    resumes where it left off. One small JSON file per source, replaced atomically.
+    """
+    def __init__(self, state_dir: str = "data/state/offsets"):
+        self.state_dir = state_dir
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+        return os.path.join(self.state_dir, f"{safe}.json")
+
+    def load(self, name: str) -> Optional[dict]:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def save(self, name: str, state: dict):
+        path = self._path(name)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+class LogSource:
+    """
+    Base class for ingestion sources.
+    Iterating yields (offset, raw_line); offsets increase monotonically.
+    `commit(offset)` acknowledges everything up to and including `offset`.
+    """
+    name = "source"
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        raise NotImplementedError
+
+    def commit(self, offset: int):
+        """Records progress. Sources that cannot replay may ignore this."""
+        pass
+
+    def stop(self):
+        """Asks a following source to finish after the current read."""
+        pass
+
+    def close(self):
+        pass
+
+class FileTailSource(LogSource):
+    """
+    Tails a log file like `tail -F`. The offset is the byte position after
+    each line, so a restart seeks straight to the first unacknowledged line.
+    A file that shrinks (truncated/rotated in place) is re-read from the start.
+    A file renamed away (rotated by rename, then recreated) is read to its end
+    through the open handle before the new file at `path` is opened, so lines
+    written just before the rotation are not lost.
+    """
+    def __init__(self, path: str, offsets: Optional[OffsetStore] = None,
+                 follow: bool = True, poll_interval: float = 0.5):
+        self.path = path
+        self.name = f"file:{os.path.abspath(path)}"
+        self.offsets = offsets
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def _start_offset(self) -> int:
+        if not self.offsets:
+            return 0
+        state = self.offsets.load(self.name) or {}
+        return state.get("offset", 0)
+
+    def _replaced(self, f) -> Optional[bool]:
+        """True if `path` is now another file than `f`, None while nothing is at `path`."""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        opened = os.fstat(f.fileno())
+        return (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev)
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        offset = self._start_offset()
+        while not os.path.exists(self.path):
+            if not self.follow or self._stopped.wait(self.poll_interval):
+                return
+
+        f = open(self.path, "rb")
+        try:
+            if offset > os.path.getsize(self.path):
+                offset = 0
+            f.seek(offset)
+            pending = b""
+            draining = False
+            while not self._stopped.is_set():
+                chunk = f.readline()
+                if chunk:
+                    pending += chunk
+                    if not pending.endswith(b"\n"):
+                        continue # Partial line; wait for the writer to finish it
+                    offset += len(pending)
+                    line = pending.decode("utf-8", errors="replace").rstrip("\r\n")
+                    pending = b""
+                    if line:
+                        yield offset, line
+                    continue
+
+                if not self.follow:
+                    break
+                replaced = self._replaced(f)
+                if replaced and not draining:
+                    draining = True # Read once more: the writer may have appended up to the rename
+                    continue
+                if replaced:
+                    # The old handle is drained; a line its writer never finished is complete now
+                    if pending:
+                        offset += len(pending)
+                        line = pending.decode("utf-8", errors="replace").rstrip("\r\n")
+                        if line:
+                            yield offset, line
+                    print(f"🔄 {self.path} was rotated, reading the new file from start")
+                    f.close()
+                    f = open(self.path, "rb")
+                    offset, pending, draining = 0, b"", False
+                    continue
+                if replaced is False and os.path.getsize(self.path) < offset:
+                    print(f"🔄 {self.path} was truncated, re-reading from start")
+                    f.seek(0)
+                    offset, pending = 0, b""
+                    continue
+                self._stopped.wait(self.poll_interval)
+        finally:
+            f.close()
+
+    def commit(self, offset: int):
+        if self.offsets:
+            self.offsets.save(self.name, {"offset": offset, "path": self.path})
+
+    def stop(self):
+        self._stopped.set()
+
+class SyslogSource(LogSource):
+    """
+    Local syslog listener (UDP datagrams or newline-framed TCP).
+    Syslog has no replay, so offsets are just a receive sequence number.
+    Over TCP a full buffer blocks the sender; UDP has no backpressure, so a
+    datagram that finds the buffer full is dropped and counted in `dropped`
+    rather than stalling the server's handler threads.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 5140,
+                 protocol: str = "udp", max_pending: int = 10000):
+        if protocol not in ("udp", "tcp"):
+            raise ValueError(f"Unsupported syslog protocol: {protocol}")
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.name = f"syslog:{protocol}:{host}:{port}"
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_pending)
+        self._server = None
+        self._thread = None
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def _drop(self):
+        with self._dropped_lock:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                print(f"⚠️ Syslog buffer full: {self.dropped} UDP lines dropped so far")
+
+    def _start_server(self):
+        lines = self._lines
+        source = self
+
+        class UDPHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                for line in self.request[0].decode("utf-8", errors="replace").splitlines():
+                    if line.strip():
+                        try:
+                            lines.put_nowait(line)
+                        except queue.Full:
+                            source._drop()
+
+        class TCPHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                    if line.strip():
+                        lines.put(line) # Blocks when full -> TCP backpressure to the sender
+
+        if self.protocol == "udp":
+            self._server = socketserver.ThreadingUDPServer((self.host, self.port), UDPHandler)
+        else:
+            self._server = socketserver.ThreadingTCPServer((self.host, self.port), TCPHandler)
+        self._server.daemon_threads = True
+        # Port 0 picks a free port; expose the real one
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name=self.name, daemon=True)
+        self._thread.start()
+        print(f"📡 Listening for syslog on {self.protocol}://{self.host}:{self.port}")
+
+    def start(self):
+        if self._server is None:
+            self._start_server()
+        return self
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        self.start()
+        seq = 0
+        while True:
+            line = self._lines.get()
+            if line is None:
+                return
+            seq += 1
+            yield seq, line
+
+    def stop(self):
+        self._lines.put(None)
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class QueueSource(LogSource):
+    """
+    In-process stand-in for a Kafka topic partition: an append-only log that
+    producers `publish` to, consumed from the group's committed offset.
+    """
+    def __init__(self, name: str = "queue:logs", offsets: Optional[OffsetStore] = None,
+                 follow: bool = True):
+        self.name = name
+        self.offsets = offsets
+        self.follow = follow
+        self._log: List[str] = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def publish(self, line: str):
+        with self._cond:
+            self._log.append(line)
+            self._cond.notify_all()
+
+    def publish_many(self, lines: List[str]):
+        with self._cond:
+            self._log.extend(lines)
+            self._cond.notify_all()
+
+    def end_of_stream(self):
+        """Lets a following consumer finish once it has drained the log."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        state = (self.offsets.load(self.name) if self.offsets else None) or {}
+        position = state.get("offset", 0) # Next offset to read
+        while True:
+            with self._cond:
+                while position >= len(self._log):
+                    if self._closed or not self.follow:
+                        return
+                    self._cond.wait()
+                batch = self._log[position:]
+            for line in batch:
+                position += 1
+                yield position, line
+
+    def commit(self, offset: int):
+        if self.offsets:
+            self.offsets.save(self.name, {"offset": offset})
+
+    def stop(self):
+        self.end_of_stream()
@@ -0,0 +1,306 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+class SegmentLog:
+    """
+    Local write-ahead log for parsed events that are not yet in every sink.
+
+    Records go into mmap-backed segment files (preallocated, zero-filled).
+    Each record is `length | crc32 | seq | source offset | payload`, and the
+    header is written after the payload. A scan stops at the first zero or
+    torn record, so a crash mid-write loses at most that record.
+
+    Durability (`fsync`):
+      - "always":   msync after every append (slowest)
+      - "batch":    msync when `sync()` is called, i.e. before the source offset is acknowledged
+      - "interval": msync from `sync()` at most every `fsync_interval` seconds
+      - "none":     leave it to the OS (survives a process crash, not a power loss)
+
+    Each sink acks the highest sequence number below which it has stored
+    every record (see AckTracker for sinks that may skip some). A sealed
+    segment is deleted once every registered sink has acked past its last
+    record.
+    """
+
+    HEADER = struct.Struct("<IIQq") # payload length, crc32, seq, source offset
+    POLICIES = ("always", "batch", "interval", "none")
+
+    def __init__(self, directory: str = "data/state/wal", sinks: Tuple[str, ...] = ("duckdb",),
+                 segment_bytes: int = 64 * 1024 * 1024, fsync: str = "batch",
+                 fsync_interval: float = 1.0):
+        if fsync not in self.POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync} (expected one of {self.POLICIES})")
+        self.directory = directory
+        self.sinks = tuple(sinks)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._meta_path = os.path.join(self.directory, "meta.json")
+        meta = self._load_meta()
+        # Stable id of this log, so ids derived from `seq` never collide across a wiped WAL
+        self.log_id = meta.get("log_id") or uuid.uuid4().hex[:12]
+        self.acks: Dict[str, int] = {s: meta.get("acks", {}).get(s, 0) for s in self.sinks}
+        # Source whose offsets the records carry; offsets are meaningless for any other
+        self.source: Optional[str] = meta.get("source")
+
+        # Sealed segments: path -> last seq. The newest segment stays open for appends.
+        self._sealed: Dict[str, int] = {}
+        self._mm: Optional[mmap.mmap] = None
+        self._file = None
+        self._path: Optional[str] = None
+        self._pos = 0
+        self._dirty_from: Optional[int] = None
+        self._last_sync = time.monotonic()
+        self.last_seq = meta.get("last_seq", 0)
+        self.last_offset: Optional[int] = None
+
+        segments = self._segments()
+        for path in segments[:-1]:
+            end, last_seq, last_offset = self._scan(path)
+            self._sealed[path] = last_seq
+            self._advance(last_seq, last_offset)
+        if segments:
+            self._open(segments[-1])
+            self._pos, last_seq, last_offset = self._scan(segments[-1])
+            self._advance(last_seq, last_offset)
+        else:
+            self._open(self._segment_path(self.last_seq + 1))
+        self._save_meta()
+
+    # Segment files
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{first_seq:020d}.wal")
+
+    def _segments(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith(".wal")
+        )
+
+    def _open(self, path: str):
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+        if os.path.getsize(path) < self.segment_bytes:
+            self._file.truncate(self.segment_bytes)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._path = path
+        self._pos = 0
+        self._dirty_from = None
+
+    def _close_active(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def _records(self, buf) -> Iterator[Tuple[int, int, int, bytes]]:
+        """Yields (end position, seq, source offset, payload) for every intact record."""
+        pos, size = 0, len(buf)
+        while pos + self.HEADER.size <= size:
+            length, crc, seq, offset = self.HEADER.unpack_from(buf, pos)
+            end = pos + self.HEADER.size + length
+            if seq == 0 or end > size:
+                return
+            payload = bytes(buf[pos + self.HEADER.size:end])
+            if zlib.crc32(payload) != crc:
+                return # Torn write: everything after it is unreliable
+            yield end, seq, offset, payload
+            pos = end
+
+    def _scan(self, path: str) -> Tuple[int, int, Optional[int]]:
+        end, last_seq, last_offset = 0, 0, None
+        with open(path, "rb") as f:
+            if os.path.getsize(path) == 0:
+                return end, last_seq, last_offset
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for end, last_seq, last_offset, _ in self._records(mm):
+                    pass
+        return end, last_seq, last_offset
+
+    def _advance(self, seq: int, offset: Optional[int]):
+        if seq > self.last_seq:
+            self.last_seq = seq
+        if offset is not None and offset >= 0:
+            self.last_offset = offset
+
+    # Writing
+
+    def append(self, payload: bytes, offset: Optional[int] = None) -> int:
+        """Appends one record and returns its sequence number."""
+        need = self.HEADER.size + len(payload)
+        if need > self.segment_bytes:
+            raise ValueError(f"Record of {need} bytes exceeds the segment size ({self.segment_bytes})")
+        with self._lock:
+            if self._pos + need > self.segment_bytes:
+                self._rotate()
+            seq = self.last_seq + 1
+            start = self._pos
+            body = start + self.HEADER.size
+            self._mm[body:body + len(payload)] = payload
+            self.HEADER.pack_into(self._mm, start, len(payload), zlib.crc32(payload), seq,
+                                  -1 if offset is None else offset)
+            self._pos = body + len(payload)
+            if self._dirty_from is None:
+                self._dirty_from = start
+            self._advance(seq, offset)
+            if self.fsync == "always":
+                self._flush()
+            return seq
+
+    def _rotate(self):
+        self._flush()
+        self._sealed[self._path] = self.last_seq
+        self._close_active()
+        self._open(self._segment_path(self.last_seq + 1))
+        self._save_meta()
+
+    def _flush(self):
+        if self._dirty_from is None:
+            return
+        # msync needs a page-aligned start
+        start = self._dirty_from - self._dirty_from % mmap.PAGESIZE
+        self._mm.flush(start, self._pos - start)
+        self._dirty_from = None
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Makes appended records durable according to the fsync policy."""
+        with self._lock:
+            if self.fsync == "batch":
+                self._flush()
+            elif self.fsync == "interval" and time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._flush()
+
+    # Acknowledgement and truncation
+
+    def ack(self, sink: str, seq: int):
+        """Records that `sink` has stored everything up to `seq`; drops fully acked segments."""
+        with self._lock:
+            if seq <= self.acks.get(sink, 0):
+                return
+            self.acks[sink] = seq
+            low = min(self.acks.get(s, 0) for s in self.sinks)
+            for path, last_seq in list(self._sealed.items()):
+                if last_seq <= low:
+                    os.remove(path)
+                    del self._sealed[path]
+            self._save_meta()
+
+    def pending(self, sink: str, after: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+        """Yields (seq, payload) for records `sink` has not acked (or after `after`)."""
+        after = self.acks.get(sink, 0) if after is None else after
+        for path in self._segments():
+            if path in self._sealed and self._sealed[path] <= after:
+                continue
+            with open(path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for _, seq, _, payload in self._records(mm):
+                        if seq > after:
+                            yield seq, payload
+
+    def dead_letter(self, sink: str, records: List[Tuple[int, bytes]], error: str) -> str:
+        """
+        Appends records `sink` keeps rejecting to `dead_letter/<sink>.jsonl`
+        (fsynced, one JSON line per record) and returns its path. The caller
+        acks past them once they are set aside.
+        """
+        path = os.path.join(self.directory, "dead_letter", f"{sink}.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for seq, payload in records:
+                f.write(json.dumps({"log_id": self.log_id, "seq": seq, "error": error,
+                                    "payload": payload.decode("utf-8", "replace")}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return path
+
+    def _load_meta(self) -> dict:
+        if not os.path.exists(self._meta_path):
+            return {}
+        with open(self._meta_path, "r") as f:
+            return json.load(f)
+
+    def _save_meta(self):
+        tmp = f"{self._meta_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"log_id": self.log_id, "acks": self.acks, "last_seq": self.last_seq,
+                       "source": self.source}, f)
+        os.replace(tmp, self._meta_path)
+
+    def set_source(self, name: str):
+        with self._lock:
+            self.source = name
+            self._save_meta()
+
+    def segment_count(self) -> int:
+        return len(self._sealed) + 1
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._close_active()
+            self._save_meta()
+
+
+class AckTracker:
+    """
+    Acks a sink's contiguous low-watermark in a SegmentLog.
+
+    A sink that may drop or fail a batch (the KB worker) can store later
+    seqs before earlier ones; acking the highest seq of each batch would let
+    the log truncate seqs the sink never stored. Seqs stored past a gap are
+    held until the gap is filled, and `missing()` reads the gap back from the
+    log so it can be replayed.
+    """
+
+    def __init__(self, wal: SegmentLog, sink: str):
+        self.wal = wal
+        self.sink = sink
+        self.acked = wal.acks.get(sink, 0)
+        self.applied: Set[int] = set() # Stored seqs above the watermark
+        self.dropped_upto = 0 # Highest seq known not to have reached the sink
+        self._lock = threading.Lock()
+
+    def applied_seqs(self, seqs: Iterable[int]):
+        """Records stored seqs and acks up to the first one still missing."""
+        with self._lock:
+            self.applied.update(seq for seq in seqs if seq > self.acked)
+            low = self.acked
+            while low + 1 in self.applied:
+                low += 1
+                self.applied.discard(low)
+            if low == self.acked:
+                return
+            self.acked = low
+        self.wal.ack(self.sink, low)
+
+    def dropped_seqs(self, seqs: Iterable[int]):
+        """Records seqs that will not reach the sink unless replayed."""
+        with self._lock:
+            self.dropped_upto = max(self.dropped_upto, max(seqs, default=0))
+
+    def missing(self, limit: int) -> List[Tuple[int, bytes]]:
+        """Up to `limit` journaled (seq, payload) below a stored or dropped seq that the sink lacks."""
+        with self._lock:
+            acked, applied = self.acked, set(self.applied)
+            upto = max([self.dropped_upto, *applied], default=0)
+        records = []
+        if upto <= acked:
+            return records
+        for seq, payload in self.wal.pending(self.sink, after=acked):
+            if seq > upto or len(records) >= limit:
+                break
+            if seq not in applied:
+                records.append((seq, payload))
+        return records
@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+
+# The hyphenated service dir is not a package; import its modules directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from flusher import AdaptiveBatcher, SinkWorker
+from pipeline import IngestionPipeline
+from sources import QueueSource
+
+def test_batcher_flushes_on_rows_bytes_or_age():
+    by_rows = AdaptiveBatcher(min_rows=3, max_rows=3, max_age=60)
+    for i in range(3):
+        assert not by_rows.ready()
+        by_rows.add(i)
+    assert by_rows.ready()
+
+    by_bytes = AdaptiveBatcher(min_rows=100, max_bytes=10, max_age=60, size_fn=len)
+    by_bytes.add("12345")
+    assert not by_bytes.ready()
+    by_bytes.add("67890")
+    assert by_bytes.ready()
+
+    by_age = AdaptiveBatcher(min_rows=100, max_age=0.05)
+    by_age.add("x")
+    assert not by_age.ready()
+    time.sleep(0.06)
+    assert by_age.ready()
+    assert by_age.take() == ["x"] and not by_age.ready()
+
+def test_batcher_grows_batches_for_fixed_cost_sinks():
+    batcher = AdaptiveBatcher(min_rows=10, max_rows=10000, target_latency=0.2)
+    # 50ms per call + 10us per row: bigger batches amortize the fixed cost
+    for _ in range(30):
+        rows = batcher.target_rows
+        batcher.observe(rows, 0.05 + rows * 1e-5)
+    assert batcher.target_rows > 10000 * 0.9
+
+    # The sink slows down 10x: batches shrink to stay near the target latency
+    for _ in range(30):
+        rows = batcher.target_rows
+        batcher.observe(rows, 0.05 + rows * 1e-4)
+    assert 1000 < batcher.target_rows < 2000
+
+def test_slow_tap_never_throttles_primary_sink():
+    release = threading.Event()
+    embedded = []
+    def stuck_kb(batch):
+        release.wait(5)
+        embedded.extend(batch)
+
+    kb = SinkWorker("kb", stuck_kb, AdaptiveBatcher(min_rows=10, max_rows=10, max_age=0.01),
+                    queue_size=2, block=False).start()
+    source = QueueSource(follow=False)
+    source.publish_many([str(i) for i in range(1000)])
+    stored = []
+    pipeline = IngestionPipeline(source, stages=[], sink=stored.extend,
+                                 batch_size=10, flush_interval=0.01, taps=[kb])
+
+    started = time.time()
+    stats = pipeline.run()
+    assert time.time() - started < 3
+    assert stored == [str(i) for i in range(1000)]
+    assert stats["taps"]["kb"]["dropped"] > 0
+
+    release.set()
+    kb.stop(5)
+    assert len(embedded) + kb.dropped == 1000
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# The hyphenated service dir is not a package; import its modules directly
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from wal import AckTracker, SegmentLog
+from flusher import AdaptiveBatcher, SinkWorker
+from shared.log_schema import LogRecord
+
+def test_records_survive_a_crash(tmp_path):
+    wal = SegmentLog(str(tmp_path), segment_bytes=4096)
+    for i in range(5):
+        assert wal.append(f"event {i}".encode(), offset=100 + i) == i + 1
+    # No close(): a new instance must see everything the dead process wrote
+    reopened = SegmentLog(str(tmp_path), segment_bytes=4096)
+    assert [p for _, p in reopened.pending("duckdb")] == [f"event {i}".encode() for i in range(5)]
+    assert reopened.last_offset == 104
+    assert reopened.append(b"event 5") == 6
+
+def test_torn_record_is_discarded(tmp_path):
+    wal = SegmentLog(str(tmp_path), segment_bytes=4096)
+    wal.append(b"complete")
+    wal.append(b"torn")
+    wal.close()
+
+    path = os.path.join(str(tmp_path), sorted(n for n in os.listdir(str(tmp_path)) if n.endswith(".wal"))[0])
+    with open(path, "r+b") as f:
+        f.seek(SegmentLog.HEADER.size * 2 + len(b"complete")) # First payload byte of the second record
+        f.write(b"X")
+
+    reopened = SegmentLog(str(tmp_path), segment_bytes=4096)
+    assert [seq for seq, _ in reopened.pending("duckdb")] == [1]
+    # The next append takes the torn slot, but never reuses a sequence number
+    assert reopened.append(b"again") == 3
+    assert [seq for seq, _ in reopened.pending("duckdb")] == [1, 3]
+
+def test_segments_truncated_once_every_sink_acks(tmp_path):
+    wal = SegmentLog(str(tmp_path), sinks=("duckdb", "kb"), segment_bytes=256)
+    seqs = [wal.append(b"x" * 40) for _ in range(20)]
+    segments = wal.segment_count()
+    assert segments > 3
+
+    wal.ack("duckdb", seqs[-1])
+    assert wal.segment_count() == segments # KB has not confirmed anything yet
+    wal.ack("kb", seqs[9])
+    assert 1 < wal.segment_count() < segments
+    wal.ack("kb", seqs[-1])
+    assert wal.segment_count() == 1 # Only the active segment remains
+    assert list(wal.pending("kb")) == []
+
+def test_ack_tracker_holds_the_watermark_at_a_gap(tmp_path):
+    wal = SegmentLog(str(tmp_path), sinks=("duckdb", "kb"), segment_bytes=256)
+    seqs = [wal.append(f"event {i}".encode()) for i in range(30)]
+    acks = AckTracker(wal, "kb")
+    acks.applied_seqs(seqs[:5])
+    acks.applied_seqs(seqs[10:20]) # seqs[5:10] were dropped
+    assert wal.acks["kb"] == seqs[4]
+    assert [seq for seq, _ in acks.missing(limit=100)] == seqs[5:10]
+
+    acks.applied_seqs(seqs[5:10])
+    assert wal.acks["kb"] == seqs[19]
+    assert acks.missing(limit=100) == [] # seqs[20:] may still be queued
+    acks.dropped_seqs(seqs[20:25])
+    assert [seq for seq, _ in acks.missing(limit=3)] == seqs[20:23]
+
+def test_failed_kb_batch_is_backfilled_not_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import main
+
+    class FlakyStore:
+        def __init__(self):
+            self.docs, self.calls = {}, 0
+        def add_logs(self, records, doc_ids=None):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("embedding service unavailable")
+            self.docs.update(zip(doc_ids, records))
+
+    monkeypatch.setattr(main, "KnowledgeStore", FlakyStore)
+    ingestor = main.LogIngestor(db_path=str(tmp_path / "logs.duckdb"), miner_state=str(tmp_path / "drain3"),
+                                wal_dir=str(tmp_path / "wal"), parser_registry=None)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    entries = []
+    for i in range(20):
+        event = LogRecord(timestamp=start + timedelta(seconds=i), severity="INFO",
+                          service_name="svc", body=f"event {i}", context={"i": i})
+        entries.append((ingestor.wal.append(ingestor.encode_event(event)), event))
+    ingestor.write_batch(entries)
+
+    kb = SinkWorker("kb", ingestor.write_kb, AdaptiveBatcher(min_rows=10, max_rows=10, max_age=60),
+                    on_drop=ingestor.kb_dropped, backfill=ingestor.kb_backfill)
+    kb.offer(entries[:10]) # Fails
+    kb.offer(entries[10:])
+    kb.start().stop(10)
+
+    assert kb.errors == 1 and kb.backfilled == 10
+    assert sorted(ingestor.kb.docs) == sorted(f"{ingestor.wal.log_id}-{seq}" for seq, _ in entries)
+    assert ingestor.wal.acks == {"duckdb": entries[-1][0], "kb": entries[-1][0]}
+    assert list(ingestor.wal.pending("kb")) == []
+    ingestor.wal.close()
+    ingestor.db.close()
+
+def test_replay_into_duckdb_is_idempotent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from main import LogIngestor
+
+    def ingestor():
+        return LogIngestor(db_path=str(tmp_path / "logs.duckdb"), enable_kb=False,
+                           miner_state=str(tmp_path / "drain3"), wal_dir=str(tmp_path / "wal"))
+
+    first = ingestor()
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    entries = []
+    for i in range(10):
+        event = LogRecord(timestamp=start + timedelta(seconds=i), severity="INFO",
+                          service_name="svc", body=f"event {i}", context={"i": i})
+        entries.append((first.wal.append(first.encode_event(event)), event))
+    first.write_batch(entries[:4])
+    # Crash: the rest never reached DuckDB, and nothing is closed
+    first.db.close()
+
+    second = ingestor()
+    second.recover()
+    second.recover() # A second replay must not apply anything twice
+    assert second.db.query("SELECT count(*), count(DISTINCT body) FROM logs")[0] == (10, 10)
+    assert second.db.get_watermark(second.wal_watermark) == entries[-1][0]
+    second.wal.close()
+    second.db.close()
+
+def test_poison_batch_is_dead_lettered_and_acked(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from main import LogIngestor
+    from pipeline import IngestionPipeline
+    from sources import QueueSource
+
+    def ingestor():
+        return LogIngestor(db_path=str(tmp_path / "logs.duckdb"), enable_kb=False,
+                           miner_state=str(tmp_path / "drain3"), wal_dir=str(tmp_path / "wal"))
+
+    def rejects(batch):
+        raise ValueError("row does not fit the schema")
+
+    first = ingestor()
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    source = QueueSource(follow=False)
+    source.publish_many([f"event {i}" for i in range(10)])
+    stats = IngestionPipeline(
+        source,
+        stages=[("record", lambda line: LogRecord(timestamp=start, severity="INFO", service_name="svc", body=line))],
+        sink=rejects, batch_size=4, sink_retries=2, retry_backoff=0, queue_size=2,
+        journal=first.wal, encode=first.encode_event, dead_letter=first.dead_letter_batch,
+    ).run()
+
+    # Every batch gives up after the bounded retries instead of stalling the sink thread
+    assert stats["sink_errors"] == 3 * 3
+    assert stats["sink_dead_lettered"] == 10 and stats["sink_dropped"] == 0
+    dead = [json.loads(line) for line in (tmp_path / "wal" / "dead_letter" / "duckdb.jsonl").read_text().splitlines()]
+    assert [LogRecord.from_json(d["payload"]).body for d in dead] == [f"event {i}" for i in range(10)]
+    assert first.wal.acks["duckdb"] == first.wal.last_seq
+    first.wal.close()
+    first.db.close()
+
+    # Nothing is replayed into DuckDB on restart
+    second = ingestor()
+    second.recover()
+    assert second.db.query("SELECT count(*) FROM logs")[0] == (0,)
+    second.wal.close()
+    second.db.close()
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from llama_index.core import Document
 from shared.log_schema import LogEvent
 
@@ -8,11 +8,12 @@ class LogConverter:
     """
     
     @staticmethod
-    def to_document(log: LogEvent) -> Document:
+    def to_document(log: LogEvent, doc_id: Optional[str] = None) -> Document:
         """
         Converts a single LogEvent to a Document.
         The text content combines the timestamp, service, severity, and body.
         Metadata includes the structured fields for filtering.
+        A fixed `doc_id` makes re-inserting the same log idempotent.
         """
         # Construct a rich text representation for the embedding model
         text_content = (
@@ -31,13 +32,18 @@ class LogConverter:
             **log.context  # Flatten context into metadata for easier filtering
         }
         
-        return Document(
+        doc = Document(
             text=text_content,
             metadata=metadata,
             excluded_llm_metadata_keys=["timestamp"], # Don't distract LLM with raw timestamp string if not needed
             excluded_embed_metadata_keys=["timestamp"] 
         )
+        if doc_id:
+            doc.id_ = doc_id
+        return doc
 
     @staticmethod
-    def to_documents(logs: List[LogEvent]) -> List[Document]:
-        return [LogConverter.to_document(log) for log in logs]
+    def to_documents(logs: List[LogEvent], doc_ids: Optional[List[str]] = None) -> List[Document]:
+        if doc_ids is None:
+            return [LogConverter.to_document(log) for log in logs]
+        return [LogConverter.to_document(log, doc_id) for log, doc_id in zip(logs, doc_ids)]
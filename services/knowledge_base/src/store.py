@@ -1,6 +1,6 @@
 import os
 import chromadb
-from typing import List
+from typing import List, Optional
 from llama_index.core import VectorStoreIndex, StorageContext
 from llama_index.core.vector_stores import MetadataFilters, MetadataFilter
 from llama_index.vector_stores.chroma import ChromaVectorStore
@@ -14,13 +14,16 @@ except ImportError:
     from converter import LogConverter
 
 from shared.log_schema import LogEvent
+from shared.utils.telemetry import tracer
 
 class KnowledgeStore:
     """
     Manages the Knowledge Base using LlamaIndex and ChromaDB.
+    `embed_model` replaces the local HuggingFace model (e.g. a MockEmbedding in benchmarks).
     """
-    def __init__(self, persist_dir: str = "data/target/vector_store"):
+    def __init__(self, persist_dir: str = "data/target/vector_store", embed_model=None):
         self.persist_dir = persist_dir
+        self.embed_model = embed_model
         self._init_store()
 
     def _init_store(self):
@@ -42,7 +45,7 @@ class KnowledgeStore:
         # 3. Setup Embedding Model
         # Use Local HuggingFace Model (BAAI/bge-small-en-v1.5)
         # This runs locally and does not require an API key.
-        Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5") 
+        Settings.embed_model = self.embed_model or HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
         
         # 4. Load Index (or create empty)
         # In LlamaIndex, we usually create index from documents. 
@@ -52,15 +55,21 @@ class KnowledgeStore:
             storage_context=self.storage_context
         )
 
-    def add_logs(self, logs: List[LogEvent]):
+    def add_logs(self, logs: List[LogEvent], doc_ids: Optional[List[str]] = None):
         """
         Converts logs to documents and adds them to the index.
+        With `doc_ids`, each log is stored as a single node under that id, so
+        replaying the same logs (e.g. from the ingestion WAL) does not duplicate them.
         """
-        documents = LogConverter.to_documents(logs)
+        documents = LogConverter.to_documents(logs, doc_ids)
         # Insert into index
         # Note: This updates the underlying ChromaDB automatically
-        for doc in documents:
-            self.index.insert(doc)
+        if doc_ids is not None:
+            # Log lines are short: skip chunking so node ids stay the given ids
+            self.index.insert_nodes(documents)
+        else:
+            for doc in documents:
+                self.index.insert(doc)
         print(f"✅ Added {len(logs)} logs to Knowledge Base.")
 
     def query(self, query_str: str, filters: dict = None) -> str:
@@ -77,6 +86,7 @@ class KnowledgeStore:
             ]
             query_filters = MetadataFilters(filters=metadata_filters)
 
-        query_engine = self.index.as_query_engine(filters=query_filters)
-        response = query_engine.query(query_str)
-        return str(response)
+        with tracer.span("kb.query"):
+            query_engine = self.index.as_query_engine(filters=query_filters)
+            response = query_engine.query(query_str)
+            return str(response)
@@ -7,19 +7,14 @@ from mcp.server.fastmcp import FastMCP
 
 # Ensure we can import shared modules
 sys.path.append("/app")
-from shared.db.duckdb_client import DuckDBConnector
+from shared.db.reader_pool import get_reader_pool
 
 # Initialize FastMCP
 mcp = FastMCP("LogPilot")
 
-# Initialize DB Client (Read-Only)
-db_client = None
-
 def get_db():
-    global db_client
-    if not db_client:
-        db_client = DuckDBConnector(read_only=True)
-    return db_client
+    """Read-only reader pool; every tool call runs on its own cursor."""
+    return get_reader_pool()
 
 @mcp.tool()
 def query_logs(sql_query: str) -> str:
@@ -28,7 +23,7 @@ def query_logs(sql_query: str) -> str:
     """
     try:
         db = get_db()
-        result = db.conn.execute(sql_query).fetchall()
+        result = db.query(sql_query)
         return str(result)
     except Exception as e:
         return f"Error executing SQL: {e}"
@@ -56,7 +51,7 @@ def get_recent_logs() -> str:
     """
     try:
         db = get_db()
-        result = db.conn.execute("SELECT * FROM logs ORDER BY timestamp DESC LIMIT 50").fetchall()
+        result = db.query("SELECT * FROM logs ORDER BY timestamp DESC LIMIT 50")
         return str(result)
     except Exception as e:
         return f"Error fetching recent logs: {e}"
@@ -68,7 +63,7 @@ def get_schema() -> str:
     """
     try:
         db = get_db()
-        result = db.conn.execute("DESCRIBE logs").fetchall()
+        result = db.query("DESCRIBE logs")
         return str(result)
     except Exception as e:
         return f"Error fetching schema: {e}"
@@ -1,17 +1,42 @@
 import sys
 import os
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
 from services.pilot_orchestrator.src.graph import pilot_graph
+from shared.db.chat_history import ChatHistoryStore
+from shared.utils.telemetry import metrics, tracer
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-app = FastAPI(title="LogPilot Orchestrator API", version="1.0.0")
+HISTORY_TURNS = 10 # Turns of context given to the graph, to avoid context overflow
+
+_history: Optional[ChatHistoryStore] = None
+_history_lock = threading.Lock()
+
+def get_history_store() -> ChatHistoryStore:
+    """Opened on first use, so importing the API does not lock history.duckdb."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = ChatHistoryStore()
+        return _history
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Queued turns are written before the process exits
+    if _history is not None:
+        _history.close()
+
+app = FastAPI(title="LogPilot Orchestrator API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,12 +48,14 @@ app.add_middleware(
 
 class QueryRequest(BaseModel):
     query: str
+    session_id: str = Field("default", min_length=1, max_length=128)
 
 class QueryResponse(BaseModel):
     answer: str
     sql: Optional[str] = None
     context: Optional[str] = None
     intent: str
+    session_id: str
 
 @app.get("/health")
 def health_check():
@@ -43,51 +70,53 @@ def run_query(request: QueryRequest):
     Executes the Pilot Agent for a given query.
     """
     try:
-        # Fetch History for Context
-        from services.pilot_orchestrator.src.nodes import sql_tool
-        history_rows = sql_tool.db.get_history("default")
-        # Format: [{"role": "user", "content": "..."}, ...]
-        # Limit to last 10 messages to avoid context overflow
-        messages = [{"role": row[0], "content": row[1]} for row in history_rows[-10:]]
+        # Fetch the session's last turns for context (usually from memory)
+        history = get_history_store()
+        messages = [{"role": turn["role"], "content": turn["content"]}
+                    for turn in history.recent(request.session_id, HISTORY_TURNS)]
 
         # Initialize state with history
         initial_state = {"query": request.query, "messages": messages}
         
         # Run the graph
         # invoke returns the final state
-        final_state = pilot_graph.invoke(initial_state)
+        with tracer.span("api.query"):
+            final_state = pilot_graph.invoke(initial_state)
         
         answer = final_state.get("final_answer", "No answer generated.")
         
-        # Save to History (Session ID = default for demo)
-        try:
-            from services.pilot_orchestrator.src.nodes import sql_tool
-            # Save User Query
-            sql_tool.db.save_message("default", "user", request.query)
-            # Save AI Answer
-            sql_tool.db.save_message("default", "ai", answer)
-        except Exception as e:
-            print(f"⚠️ Failed to save history: {e}")
+        # Save to History (queued; written in batches off the request path)
+        history.append(request.session_id, "user", request.query)
+        history.append(request.session_id, "ai", answer)
         
         return QueryResponse(
             answer=answer,
             sql=final_state.get("sql_query"),
             context=final_state.get("rag_context"),
-            intent=final_state.get("intent", "unknown")
+            intent=final_state.get("intent", "unknown"),
+            session_id=request.session_id
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus scrape endpoint: span latency histograms (nodes, LLM, DuckDB, KB),
+    LLM token counts and cache hit rates. Empty when LOGPILOT_TELEMETRY=0.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/history")
-def get_chat_history():
+def get_chat_history(session_id: str = Query("default", min_length=1, max_length=128),
+                     limit: int = Query(50, ge=1, le=1000)):
     """
-    Retrieves chat history for the default session.
+    Retrieves the last `limit` messages of a session, oldest first.
     """
     try:
-        from services.pilot_orchestrator.src.nodes import sql_tool
-        history = sql_tool.db.get_history("default")
-        # Format: [(role, content, timestamp), ...]
-        return [{"role": row[0], "content": row[1], "timestamp": str(row[2])} for row in history]
+        history = get_history_store().recent(session_id, limit)
+        return [{"role": turn["role"], "content": turn["content"], "timestamp": str(turn["timestamp"])}
+                for turn in history]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -3,6 +3,7 @@ from services.pilot_orchestrator.src.state import AgentState
 from services.pilot_orchestrator.src.nodes import (
     classify_intent,
     generate_sql,
+    validate_sql,
     execute_sql,
     retrieve_context,
     synthesize_answer,
@@ -32,6 +33,15 @@ def should_retry_sql(state: AgentState):
         return "generate_sql" # Retry
     return "synthesize_answer" # Proceed (with error message) or Success
 
+def route_validated_sql(state: AgentState):
+    """
+    Conditional edge logic after validation.
+    Rejected SQL goes back to the generator without touching DuckDB.
+    """
+    if state.get("sql_error"):
+        return should_retry_sql(state)
+    return "execute_sql"
+
 # Define the Graph
 workflow = StateGraph(AgentState)
 
@@ -39,6 +49,7 @@ workflow = StateGraph(AgentState)
 workflow.add_node("rewrite_query", rewrite_query)
 workflow.add_node("classify_intent", classify_intent)
 workflow.add_node("generate_sql", generate_sql)
+workflow.add_node("validate_sql", validate_sql)
 workflow.add_node("execute_sql", execute_sql)
 workflow.add_node("retrieve_context", retrieve_context)
 workflow.add_node("synthesize_answer", synthesize_answer)
@@ -62,7 +73,16 @@ workflow.add_conditional_edges(
 )
 
 # 2. SQL Path
-workflow.add_edge("generate_sql", "execute_sql")
+workflow.add_edge("generate_sql", "validate_sql")
+workflow.add_conditional_edges(
+    "validate_sql",
+    route_validated_sql,
+    {
+        "generate_sql": "generate_sql", # Rejected before execution
+        "execute_sql": "execute_sql",
+        "synthesize_answer": "synthesize_answer"
+    }
+)
 workflow.add_conditional_edges(
     "execute_sql",
     should_retry_sql,
@@ -9,16 +9,27 @@ from services.pilot_orchestrator.src.state import AgentState
 from shared.llm.client import LLMClient
 from shared.llm.prompt_factory import PromptFactory
 from services.pilot_orchestrator.src.tools.sql_tool import SQLGenerator
+from services.pilot_orchestrator.src.tools.sql_validator import SQLValidator
+from services.pilot_orchestrator.src.tools.rollup_router import RollupRouter
 from services.knowledge_base.src.store import KnowledgeStore
-from shared.db.duckdb_client import DuckDBConnector
+from shared.db.reader_pool import get_reader_pool
+from shared.utils.telemetry import metrics, traced
 
 # Initialize Shared Components
 llm_client = LLMClient()
 prompt_factory = PromptFactory()
 sql_tool = SQLGenerator()
+sql_validator = SQLValidator()
+rollup_router = RollupRouter()
 # Lazy load KnowledgeStore to avoid init issues during testing if not needed
 _kb_store = None
-_db_client = None
+_context_columns = None # Promoted ctx_* columns the validator's cache was built against
+
+# Read from the validator's own counters at scrape time
+metrics.callback("logpilot_cache_requests_total", "Cache lookups by outcome.", "counter", ("cache", "result"),
+                 lambda: {("sql_validator", "hit"): sql_validator.hits, ("sql_validator", "miss"): sql_validator.misses})
+metrics.callback("logpilot_cache_hit_ratio", "Share of cache lookups that hit.", "gauge", ("cache",),
+                 lambda: {("sql_validator",): sql_validator.hits / max(1, sql_validator.hits + sql_validator.misses)})
 
 def get_kb_store():
     global _kb_store
@@ -27,11 +38,10 @@ def get_kb_store():
     return _kb_store
 
 def get_db_client():
-    global _db_client
-    if _db_client is None:
-        _db_client = DuckDBConnector(read_only=True)
-    return _db_client
+    """The shared reader pool; each query takes its own cursor, so requests run SQL in parallel."""
+    return get_reader_pool()
 
+@traced("node.rewrite_query")
 def rewrite_query(state: AgentState) -> AgentState:
     """
     Rewrites the user query to be self-contained using chat history.
@@ -75,6 +85,7 @@ def rewrite_query(state: AgentState) -> AgentState:
 
     return state
 
+@traced("node.classify_intent")
 def classify_intent(state: AgentState) -> AgentState:
     """
     Determines if the user query requires SQL (data) or RAG (knowledge) using LLM.
@@ -103,6 +114,7 @@ def classify_intent(state: AgentState) -> AgentState:
     print(f"🤔 Intent Classified: {state['intent']}")
     return state
 
+@traced("node.generate_sql")
 def generate_sql(state: AgentState) -> AgentState:
     """
     Generates SQL from natural language using the SQLGenerator tool.
@@ -112,8 +124,13 @@ def generate_sql(state: AgentState) -> AgentState:
     
     # We no longer need to pass chat_history to generate_sql 
     # because the query is already rewritten!
+    # On a retry, feed the rejected SQL and its error back to the LLM.
     try:
-        sql = sql_tool.generate_sql(query)
+        sql = sql_tool.generate_sql(
+            query,
+            previous_sql=state.get("sql_query"),
+            previous_error=state.get("sql_error")
+        )
         state["sql_query"] = sql
         state["sql_error"] = None # Clear previous errors
     except Exception as e:
@@ -121,6 +138,38 @@ def generate_sql(state: AgentState) -> AgentState:
     
     return state
 
+@traced("node.validate_sql")
+def validate_sql(state: AgentState) -> AgentState:
+    """
+    Checks the generated SQL (read-only, single statement, binds against the
+    live schema) before it reaches DuckDB. Rejections count as a retry.
+    Accepted aggregates are routed to the rollup tables when eligible.
+    """
+    global _context_columns
+    sql = state.get("sql_query")
+    try:
+        db = get_db_client()
+        # A newly promoted context column changes what binds; drop cached outcomes
+        columns = db.get_context_columns()
+        if columns != _context_columns:
+            sql_validator.clear()
+            _context_columns = columns
+        with db.cursor() as cursor:
+            error = sql_validator.validate(sql, cursor)
+    except Exception as e:
+        error = f"Validation failed: {e}"
+
+    if error:
+        print(f"🚫 SQL Rejected: {error.splitlines()[0]}")
+        state["sql_error"] = error
+        state["retry_count"] = state.get("retry_count", 0) + 1
+        state["routed_sql"] = None
+    else:
+        state["sql_error"] = None
+        state["routed_sql"] = rollup_router.route(sql)
+    return state
+
+@traced("node.execute_sql")
 def execute_sql(state: AgentState) -> AgentState:
     """
     Executes the generated SQL against DuckDB.
@@ -132,8 +181,18 @@ def execute_sql(state: AgentState) -> AgentState:
 
     try:
         db = get_db_client()
-        print(f"⚡ Executing SQL: {sql}")
-        result = db.query(sql)
+        routed = state.get("routed_sql")
+        if routed:
+            try:
+                print(f"📦 Executing SQL on rollup: {routed}")
+                result = db.query(routed)
+            except Exception as e:
+                # Rollups missing or stale on this DB: fall back to the raw table
+                print(f"⚠️ Rollup query failed ({e}), falling back to logs")
+                result = db.query(sql)
+        else:
+            print(f"⚡ Executing SQL: {sql}")
+            result = db.query(sql)
         state["sql_result"] = str(result)
     except Exception as e:
         state["sql_error"] = str(e)
@@ -141,6 +200,7 @@ def execute_sql(state: AgentState) -> AgentState:
     
     return state
 
+@traced("node.retrieve_context")
 def retrieve_context(state: AgentState) -> AgentState:
     """
     Queries the Knowledge Base for context.
@@ -156,6 +216,7 @@ def retrieve_context(state: AgentState) -> AgentState:
     
     return state
 
+@traced("node.synthesize_answer")
 def synthesize_answer(state: AgentState) -> AgentState:
     """
     Generates the final answer using the LLM.
@@ -9,6 +9,7 @@ class AgentState(TypedDict):
     
     # SQL Path
     sql_query: Optional[str]
+    routed_sql: Optional[str] # Rollup-backed rewrite of sql_query, if eligible
     sql_result: Optional[str]
     sql_error: Optional[str]
     
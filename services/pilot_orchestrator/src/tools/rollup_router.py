@@ -0,0 +1,183 @@
+import re
+from typing import List, Optional
+
+from shared.db.duckdb_client import ROLLUP_VIEW_SQL
+
+class RollupRouter:
+    """
+    Rewrites simple aggregate queries over `logs` to the pre-aggregated
+    rollup tables maintained at ingestion time.
+
+    Only COUNT(*) queries that filter/group on columns present in a rollup are
+    eligible. Time filters are applied to bucket starts, so the only ones
+    routed are `timestamp >= start` / `timestamp < end` with starts and ends
+    on bucket boundaries: aligned literals or current_date, shifted by whole
+    intervals of the bucket unit or coarser. Any other use of `timestamp`
+    in the filter stays on the raw table. NULL keys are read back as NULL, so IS NULL
+    filters and NULL groups match the raw table. Anything the router does not
+    fully understand is left untouched.
+    """
+
+    ROLLUPS = [
+        # (table, columns, bucket units the rollup can answer exactly)
+        ("logs_rollup_minute", {"service_name", "severity"},
+         {"minute", "hour", "day", "week", "month", "quarter", "year"}),
+        ("logs_rollup_template_hour", {"service_name", "severity", "template_id"},
+         {"hour", "day", "week", "month", "quarter", "year"}),
+    ]
+
+    # Columns of `logs` that no rollup carries. The template rollup keeps only
+    # each template's latest body, while raw rows keep the text mined at the time.
+    RAW_ONLY_COLUMNS = {"trace_id", "environment", "app_id", "department", "host", "region", "context", "body"}
+    # Promoted context columns (ctx_<key>) are raw-only too
+    RAW_ONLY_PREFIX = "ctx_"
+
+    # Constructs that change row multiplicity or need raw values
+    UNSUPPORTED = re.compile(
+        r"\b(join|union|intersect|except|having|distinct|over|qualify|select\b.*\bselect|filter)\b",
+        re.IGNORECASE | re.DOTALL
+    )
+
+    # The only time filters routed: `timestamp >= <bound>` / `timestamp < <bound>`, where
+    # a bound is a literal timestamp or date, or current_date, shifted by whole intervals
+    TIME_FILTER = re.compile(
+        r"timestamp\s*(?:>=|<)\s*(?P<bound>"
+        r"(?:(?:timestamp|date)\s*'[^']*'|'[^']*'(?:\s*::\s*(?:timestamp|date))?"
+        r"|cast\s*\(\s*'[^']*'\s+as\s+(?:timestamp|date)\s*\)|current_date)"
+        r"(?:\s*[+-]\s*interval\s*(?:'\s*\d+\s+\w+\s*'|\d+\s+\w+|'\d+'\s+\w+))*)"
+        r"(?=\s*(?:\)|$|\band\b|\bor\b))",
+        re.IGNORECASE
+    )
+    BOUND_LITERAL = re.compile(r"^(?:\w+\s*\(?\s*)?'(?P<value>[^']*)'")
+    INTERVAL_UNIT = re.compile(r"interval\s*'?\s*\d+'?\s+(?P<unit>[a-z]+)", re.IGNORECASE)
+    DATE_LITERAL = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T](?P<time>.*))?")
+    # Per rollup: interval units that keep a bucket start aligned, and the literal times of day on one
+    ALIGNMENT = {
+        "logs_rollup_minute": ({"minute", "hour", "day", "week", "month", "quarter", "year"},
+                               re.compile(r"\d{1,2}:\d{2}(:00(\.0*)?)?")),
+        "logs_rollup_template_hour": ({"hour", "day", "week", "month", "quarter", "year"},
+                                      re.compile(r"\d{1,2}(:00(:00(\.0*)?)?)?")),
+    }
+
+    SHAPE = re.compile(
+        r"^SELECT\s+(?P<select>.+?)\s+FROM\s+logs"
+        r"(?:\s+WHERE\s+(?P<where>.+?))?"
+        r"(?:\s+GROUP\s+BY\s+(?P<group>.+?))?"
+        r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+        r"(?:\s+LIMIT\s+(?P<limit>\d+))?\s*;?\s*$",
+        re.IGNORECASE | re.DOTALL
+    )
+
+    COUNT_STAR = re.compile(r"\bcount\s*\(\s*(?:\*|1)\s*\)", re.IGNORECASE)
+    DATE_TRUNC = re.compile(r"\bdate_trunc\s*\(\s*'(?P<unit>\w+)'\s*,\s*timestamp\s*\)", re.IGNORECASE)
+    QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+    # `timestamp` as a column reference, not a type name (CAST(.. AS TIMESTAMP), ::timestamp, TIMESTAMP '...')
+    TIMESTAMP_COLUMN = re.compile(
+        QUOTED.pattern + r"|(?<![Aa][Ss] )(?<!::)\btimestamp\b(?!\s*')", re.IGNORECASE
+    )
+
+    def route(self, sql: Optional[str]) -> Optional[str]:
+        """Returns the rollup-backed equivalent of `sql`, or None if not eligible."""
+        if not sql:
+            return None
+
+        match = self.SHAPE.match(sql.strip())
+        if not match:
+            return None
+
+        clauses = {k: v or "" for k, v in match.groupdict().items()}
+        unquoted = self._unquoted(sql)
+        if self.UNSUPPORTED.search(unquoted) or not self.COUNT_STAR.search(clauses["select"]):
+            return None
+
+        identifiers = {t.lower() for t in re.findall(r"[A-Za-z_]\w*", unquoted)}
+        if identifiers & self.RAW_ONLY_COLUMNS or any(t.startswith(self.RAW_ONLY_PREFIX) for t in identifiers):
+            return None
+
+        # Projection/grouping may only use count(*), rollup columns and coarse date_trunc(timestamp)
+        shape_sql = " ".join([clauses["select"], clauses["group"], clauses["order"]])
+        units = {m.group("unit").lower() for m in self.DATE_TRUNC.finditer(shape_sql)}
+        stripped = self._unquoted(self.DATE_TRUNC.sub("", self.COUNT_STAR.sub("", shape_sql)))
+        if re.search(r"\w+\s*\(", stripped) or re.search(r"\btimestamp\b|\*", stripped, re.IGNORECASE):
+            return None
+
+        for table, columns, allowed_units in self.ROLLUPS:
+            used = identifiers & {"service_name", "severity", "template_id"}
+            if not used <= columns or not units <= allowed_units:
+                continue
+            if not self._aligned(clauses["where"], table):
+                continue
+            return self._rewrite(clauses, table)
+        return None
+
+    def _aligned(self, where: str, table: str) -> bool:
+        """
+        True if every `timestamp` in the filter is a whole `timestamp >= <bound>`
+        or `timestamp < <bound>` comparison whose bound is a bucket start of `table`.
+        """
+        units, aligned_time = self.ALIGNMENT[table]
+        for ref in self.TIMESTAMP_COLUMN.finditer(where):
+            if ref.group(1):
+                continue # Quoted text
+            # Only as an operand of AND/OR/NOT (or grouped in parentheses), never inside an expression
+            before = where[:ref.start()].rstrip()
+            while before.endswith("("):
+                before = before[:-1].rstrip()
+            if before and not re.search(r"(^|\W)(and|or|not)$", before, re.IGNORECASE):
+                return False
+            match = self.TIME_FILTER.match(where, ref.start())
+            if not match:
+                return False
+            bound = match.group("bound")
+            literal = self.BOUND_LITERAL.match(bound)
+            if literal:
+                date = self.DATE_LITERAL.fullmatch(literal.group("value").strip())
+                if not date or (date.group("time") and not aligned_time.fullmatch(date.group("time"))):
+                    return False
+            if any(unit.lower().rstrip("s") not in units for unit in self.INTERVAL_UNIT.findall(bound)):
+                return False
+        return True
+
+    def _rewrite(self, clauses: dict, table: str) -> str:
+        total = "CAST(coalesce(sum(event_count), 0) AS BIGINT)"
+        items = []
+        for item in self._split_items(clauses["select"]):
+            if self.COUNT_STAR.fullmatch(item.strip()):
+                items.append(f'{total} AS "count_star()"')
+            else:
+                items.append(self.COUNT_STAR.sub(total, item.strip()))
+
+        view = " ".join(ROLLUP_VIEW_SQL[table].split())
+        parts = [f"SELECT {', '.join(items)} FROM ({view}) AS {table}"]
+        if clauses["where"]:
+            parts.append(f"WHERE {clauses['where']}")
+        if clauses["group"]:
+            parts.append(f"GROUP BY {clauses['group']}")
+        if clauses["order"]:
+            parts.append(f"ORDER BY {self.COUNT_STAR.sub(total, clauses['order'])}")
+        if clauses["limit"]:
+            parts.append(f"LIMIT {clauses['limit']}")
+        return self._rename_timestamp(" ".join(parts))
+
+    def _rename_timestamp(self, sql: str) -> str:
+        return self.TIMESTAMP_COLUMN.sub(lambda m: m.group(1) or "bucket", sql)
+
+    def _unquoted(self, sql: str) -> str:
+        return self.QUOTED.sub("''", sql)
+
+    @staticmethod
+    def _split_items(select: str) -> List[str]:
+        """Splits a select list on top-level commas."""
+        items, depth, current = [], 0, ""
+        for ch in select:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            if ch == "," and depth == 0:
+                items.append(current)
+                current = ""
+            else:
+                current += ch
+        items.append(current)
+        return items
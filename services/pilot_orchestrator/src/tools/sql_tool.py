@@ -1,5 +1,5 @@
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import sys
 import os
 
@@ -7,6 +7,8 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
 from shared.db.duckdb_client import DuckDBConnector
+from shared.db.reader_pool import ReaderPool, get_reader_pool
+from shared.db.context_columns import rewrite_context_refs
 from shared.llm.client import LLMClient
 from shared.llm.prompt_factory import PromptFactory
 
@@ -16,25 +18,42 @@ class SQLGenerator:
     For the prototype, this uses regex/heuristic matching.
     In production, this would use an LLM.
     """
-    def __init__(self):
-        self.db = DuckDBConnector(read_only=True)
-        self.llm = LLMClient()
+    def __init__(self, db: Optional[Union[DuckDBConnector, ReaderPool]] = None, llm: Optional[LLMClient] = None):
+        self._db = db
+        self.llm = llm or LLMClient()
         self.prompts = PromptFactory()
 
-    def generate_sql(self, query: str, chat_history: str = "") -> Optional[str]:
-        """Generates SQL from a natural language query using LLM."""
+    @property
+    def db(self) -> Union[DuckDBConnector, ReaderPool]:
+        # The shared reader pool, opened on first use rather than at import
+        if self._db is None:
+            self._db = get_reader_pool()
+        return self._db
+
+    def generate_sql(self, query: str, chat_history: str = "",
+                     previous_sql: Optional[str] = None, previous_error: Optional[str] = None) -> Optional[str]:
+        """
+        Generates SQL from a natural language query using LLM.
+        If a previous attempt was rejected, its SQL and error are fed back so the
+        retry can fix the specific problem instead of guessing again.
+        """
         try:
+            context_columns = self.db.get_context_columns()
             prompt = self.prompts.create_prompt(
                 "pilot_orchestrator", 
                 "sql_generator", 
                 query=query,
-                chat_history=chat_history
+                chat_history=chat_history,
+                previous_sql=previous_sql,
+                previous_error=previous_error,
+                context_columns=context_columns
             )
             sql = self.llm.generate(prompt, model_type="fast")
             
             # Clean up markdown if present
             sql = sql.replace("```sql", "").replace("```", "").strip()
-            return sql
+            # Promoted keys are read from their typed column, not parsed out of JSON
+            return rewrite_context_refs(sql, context_columns)
         except Exception as e:
             print(f"❌ SQL Generation Failed: {e}")
             return None
@@ -0,0 +1,113 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import duckdb
+
+class SQLValidator:
+    """
+    Pre-execution checks for LLM-generated SQL.
+
+    A statement is accepted only if it is a single read-only SELECT and
+    DuckDB can bind it (via EXPLAIN) against the live catalog. Outcomes are
+    kept in an LRU plan cache keyed on the normalized SQL, so a statement the
+    LLM produces twice is never planned twice.
+    """
+
+    # Quoted literals/identifiers are kept verbatim during normalization.
+    _QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+    def __init__(self, max_entries: int = 256, table: str = "logs"):
+        self.max_entries = max_entries
+        self.table = table
+        self._cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._plans = {}
+        self._columns: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def normalize(cls, sql: str) -> str:
+        """Collapses whitespace outside quotes and drops trailing semicolons."""
+        parts = cls._QUOTED.split(sql.strip())
+        for i in range(0, len(parts), 2):
+            parts[i] = re.sub(r"\s+", " ", parts[i])
+        return "".join(parts).strip().rstrip(";").strip()
+
+    def validate(self, sql: Optional[str], conn: Any) -> Optional[str]:
+        """
+        Returns None if the SQL is safe to execute, otherwise an error message
+        precise enough to feed back to the generator.
+        """
+        if not sql or not sql.strip():
+            return "No SQL generated"
+
+        key = self.normalize(sql)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        error = self._check(key, conn)
+
+        with self._lock:
+            self._cache[key] = error
+            if len(self._cache) > self.max_entries:
+                evicted, _ = self._cache.popitem(last=False)
+                self._plans.pop(evicted, None)
+        return error
+
+    def get_plan(self, sql: str) -> Optional[str]:
+        """Returns the cached physical plan for a previously validated statement."""
+        return self._plans.get(self.normalize(sql))
+
+    def clear(self):
+        """Drops cached outcomes, e.g. after the `logs` schema has changed."""
+        with self._lock:
+            self._cache.clear()
+            self._plans.clear()
+            self._columns = None
+
+    def _check(self, sql: str, conn: Any) -> Optional[str]:
+        # 1. Statement shape: exactly one read-only SELECT
+        try:
+            statements = duckdb.extract_statements(sql)
+        except duckdb.Error as e:
+            return f"Syntax error: {e}"
+
+        if len(statements) != 1:
+            return f"Expected exactly one SQL statement, got {len(statements)}."
+        if statements[0].type != duckdb.StatementType.SELECT:
+            return f"Only read-only SELECT queries are allowed (got {statements[0].type.name})."
+
+        # 2. Bind against the live catalog without running the query
+        try:
+            rows = conn.execute(f"EXPLAIN {sql}").fetchall()
+        except Exception as e:
+            message = str(e).strip()
+            columns = self._get_columns(conn)
+            if columns:
+                message += f"\nAvailable columns in `{self.table}`: {', '.join(columns)}"
+            return message
+
+        try:
+            self._plans[sql] = "\n".join(str(row[-1]) for row in rows)
+        except TypeError:
+            pass # Plan text is informational only
+        return None
+
+    def _get_columns(self, conn: Any) -> List[str]:
+        if self._columns is None:
+            try:
+                rows = conn.execute(
+                    "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+                    [self.table]
+                ).fetchall()
+                self._columns = [row[0] for row in rows]
+            except Exception:
+                return []
+        return self._columns
@@ -1,7 +1,16 @@
 import pytest
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
+from services.pilot_orchestrator.src import api
 from services.pilot_orchestrator.src.api import app
+from shared.db.chat_history import ChatHistoryStore
+
+@pytest.fixture(autouse=True)
+def history(tmp_path, monkeypatch):
+    store = ChatHistoryStore(str(tmp_path / "history.duckdb"))
+    monkeypatch.setattr(api, "_history", store)
+    yield store
+    store.close()
 
 # Mock the graph invocation
 @patch("services.pilot_orchestrator.src.api.pilot_graph")
@@ -24,6 +33,34 @@ def test_api_query_success(mock_graph):
     assert data["sql"] == "SELECT count(*) FROM logs"
     assert data["intent"] == "sql"
 
+@patch("services.pilot_orchestrator.src.api.pilot_graph")
+def test_api_metrics(mock_graph):
+    client = TestClient(app)
+    mock_graph.invoke.return_value = {"final_answer": "ok", "intent": "rag"}
+    client.post("/query", json={"query": "why?"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'logpilot_span_duration_seconds_count{span="api.query"}' in response.text
+    assert 'logpilot_cache_requests_total{cache="sql_validator",result="hit"}' in response.text
+
+@patch("services.pilot_orchestrator.src.api.pilot_graph")
+def test_api_history_is_per_session(mock_graph, history):
+    client = TestClient(app)
+    mock_graph.invoke.return_value = {"final_answer": "42 errors.", "intent": "sql"}
+    client.post("/query", json={"query": "count errors", "session_id": "alice"})
+    response = client.post("/query", json={"query": "and warnings?", "session_id": "alice"})
+    assert response.json()["session_id"] == "alice"
+    # The follow-up saw alice's first turn as context
+    assert mock_graph.invoke.call_args[0][0]["messages"] == [
+        {"role": "user", "content": "count errors"}, {"role": "ai", "content": "42 errors."}]
+
+    turns = client.get("/history", params={"session_id": "alice", "limit": 3}).json()
+    assert [turn["content"] for turn in turns] == ["42 errors.", "and warnings?", "42 errors."]
+    assert client.get("/history", params={"session_id": "bob"}).json() == []
+    assert client.get("/history", params={"limit": 0}).status_code == 422
+
 def test_api_health():
     client = TestClient(app)
     response = client.get("/health")
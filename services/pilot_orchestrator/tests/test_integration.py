@@ -2,17 +2,13 @@ import pytest
 from unittest.mock import MagicMock, patch
 from services.pilot_orchestrator.src.nodes import execute_sql, retrieve_context, get_db_client, get_kb_store
 
-@patch("services.pilot_orchestrator.src.nodes.DuckDBConnector")
-def test_execute_sql_success(mock_db_connector_cls):
+@patch("services.pilot_orchestrator.src.nodes.get_reader_pool")
+def test_execute_sql_success(mock_get_reader_pool):
     # Setup Mock
     mock_db_instance = MagicMock()
-    mock_db_connector_cls.return_value = mock_db_instance
+    mock_get_reader_pool.return_value = mock_db_instance
     mock_db_instance.query.return_value = [(10,)] # Mock result: count=10
     
-    # Reset singleton if it was already initialized
-    import services.pilot_orchestrator.src.nodes as nodes
-    nodes._db_client = None
-    
     # Input State
     state = {"sql_query": "SELECT COUNT(*) FROM logs", "retry_count": 0}
     
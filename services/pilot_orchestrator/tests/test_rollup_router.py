@@ -0,0 +1,119 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from shared.db.duckdb_client import DuckDBConnector
+from services.pilot_orchestrator.src.tools.rollup_router import RollupRouter
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = DuckDBConnector(db_path=str(tmp_path / "logs.duckdb"))
+    start = datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+    batch = []
+    for i in range(300):
+        batch.append({
+            "timestamp": start + timedelta(seconds=37 * i),
+            "severity": ["INFO", "WARN", "ERROR"][i % 3],
+            "service_name": ["auth-service", "payment-service"][i % 2],
+            "body": f"Template {i % 4} <*>",
+            "template_id": str(i % 4),
+            "context": {"i": i},
+        })
+    # Rows mined before template ids existed, some without a service
+    for i in range(20):
+        batch.append({
+            "timestamp": start + timedelta(seconds=113 * i),
+            "severity": "INFO",
+            "service_name": None if i % 2 else "auth-service",
+            "body": "Legacy line",
+            "context": {"i": i},
+        })
+    # Several batches so rollup rows are merged, not just inserted
+    for i in range(0, len(batch), 70):
+        db.insert_batch(batch[i:i + 70])
+    yield db
+    db.close()
+
+ELIGIBLE = [
+    "SELECT count(*) FROM logs WHERE service_name='auth-service' AND severity='ERROR'",
+    "SELECT service_name, count(*) AS errors FROM logs WHERE severity = 'ERROR' GROUP BY service_name ORDER BY errors DESC, service_name",
+    "SELECT severity, count(*) FROM logs WHERE timestamp >= TIMESTAMP '2025-01-01 11:00:00' GROUP BY 1 ORDER BY 1",
+    "SELECT date_trunc('hour', timestamp) AS h, count(*) FROM logs GROUP BY 1 ORDER BY 1",
+    "SELECT count(*) FROM logs WHERE template_id IS NULL",
+    "SELECT template_id, count(*) FROM logs WHERE template_id IS NOT NULL GROUP BY 1 ORDER BY 1",
+    "SELECT service_name, count(*) FROM logs GROUP BY service_name ORDER BY service_name NULLS FIRST",
+    "SELECT count(*) FROM logs WHERE service_name <> 'auth-service'",
+    "SELECT count(*) FROM logs WHERE timestamp >= TIMESTAMP '2025-01-01 10:30:00' AND timestamp < TIMESTAMP '2025-01-01 11:15:00'",
+    "SELECT count(*) FROM logs WHERE severity = 'ERROR' AND (timestamp >= DATE '2025-01-01' + INTERVAL 10 HOUR OR timestamp < '2024-12-31')",
+    "SELECT count(*) FROM logs WHERE timestamp >= current_date - INTERVAL '30 days'",
+]
+
+@pytest.mark.parametrize("sql", ELIGIBLE)
+def test_routed_queries_match_raw(db, sql):
+    routed = RollupRouter().route(sql)
+    assert routed is not None
+    assert "FROM logs_rollup_" in routed
+    assert db.query(routed) == db.query(sql)
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM logs ORDER BY timestamp DESC LIMIT 5",
+    "SELECT count(*) FROM logs WHERE context->>'i' = '1'",
+    "SELECT count(DISTINCT service_name) FROM logs",
+    "SELECT timestamp, count(*) FROM logs GROUP BY 1",
+    "SELECT max(timestamp) FROM logs",
+    "SELECT body, count(*) FROM logs WHERE timestamp >= now() - INTERVAL 30 MINUTE GROUP BY body",
+    "SELECT body, count(*) FROM logs WHERE severity='ERROR' GROUP BY body ORDER BY count(*) DESC, body LIMIT 3",
+    "SELECT count(*) FROM logs WHERE body LIKE 'Template 1%'",
+    "SELECT count(*) FROM logs WHERE timestamp >= now() - INTERVAL 15 MINUTE",
+    "SELECT count(*) FROM logs WHERE timestamp >= TIMESTAMP '2025-01-01 10:30:20'",
+    "SELECT count(*) FROM logs WHERE timestamp > TIMESTAMP '2025-01-01 10:30:00'",
+    "SELECT count(*) FROM logs WHERE timestamp BETWEEN TIMESTAMP '2025-01-01 10:00:00' AND TIMESTAMP '2025-01-01 11:00:00'",
+    "SELECT count(*) FROM logs WHERE timestamp::time > '10:00:30'",
+    "SELECT count(*) FROM logs WHERE epoch(timestamp) >= 1735725630",
+    "SELECT count(*) FROM logs WHERE strftime(timestamp, '%S') = '30'",
+    "SELECT count(*) FROM logs WHERE timestamp >= TIMESTAMP '2025-01-01 10:30:00' + INTERVAL '90 s'",
+    "SELECT count(*) FROM logs WHERE timestamp >= TIMESTAMP '2025-01-01 10:30:00' + INTERVAL 30 SECOND",
+    "SELECT count(*) FROM logs WHERE timestamp + INTERVAL 1 HOUR >= TIMESTAMP '2025-01-01 11:00:00'",
+    "SELECT count(*) FROM logs WHERE TIMESTAMP '2025-01-01 10:30:00' <= timestamp",
+    "SELECT count(*) FROM logs WHERE timestamp >= current_timestamp - INTERVAL 1 HOUR",
+    "SELECT count(*) FROM logs l JOIN logs r ON l.trace_id = r.trace_id",
+])
+def test_ineligible_queries_untouched(sql):
+    assert RollupRouter().route(sql) is None
+
+def test_ineligible_queries_would_differ_on_rollup(db):
+    # The template's text changes after re-mining; raw rows keep what was mined then
+    later = datetime(2025, 1, 1, 15, 0, tzinfo=timezone.utc)
+    db.insert_batch([{"timestamp": later, "severity": "ERROR", "service_name": "auth-service",
+                      "body": "Template 1 <*> <*>", "template_id": "1", "context": {}}])
+    sql = "SELECT body, count(*) FROM logs WHERE template_id = '1' GROUP BY body ORDER BY body"
+    assert db.query(sql) == [("Template 1 <*>", 75), ("Template 1 <*> <*>", 1)]
+    assert RollupRouter().route(sql) is None
+
+    sql = "SELECT count(*) FROM logs WHERE timestamp >= TIMESTAMP '2025-01-01 10:30:20'"
+    assert RollupRouter().route(sql.replace("10:30:20", "10:30:00")) is not None
+    assert RollupRouter().route(sql) is None
+
+def test_rebuild_matches_incremental(db):
+    before = db.query("SELECT * FROM logs_rollup_template_hour ORDER BY ALL")
+    db.rebuild_rollups()
+    assert db.query("SELECT * FROM logs_rollup_template_hour ORDER BY ALL") == before
+    assert db.query("SELECT sum(event_count) FROM logs_rollup_minute")[0][0] == 320
+
+def test_older_rollup_format_is_migrated_in_place(db, tmp_path):
+    # Format 1 stored NULL keys as ''
+    for table, column in [("logs_rollup_minute", "service_name"), ("logs_rollup_template_hour", "service_name"),
+                          ("logs_rollup_template_hour", "template_id")]:
+        db.conn.execute(f"UPDATE {table} SET {column} = '' WHERE {column} = chr(0)")
+    db.conn.execute("UPDATE ingest_watermarks SET seq = 1 WHERE name = 'rollup_format'")
+    sql = "SELECT service_name, template_id, count(*) FROM logs GROUP BY ALL ORDER BY ALL"
+    expected = db.query(sql)
+    # Retention already expired the first hour's raw rows; their rollups must survive
+    db.conn.execute("DELETE FROM logs WHERE timestamp < TIMESTAMP '2025-01-01 11:00:00'")
+    db.close()
+
+    reopened = DuckDBConnector(db_path=str(tmp_path / "logs.duckdb"))
+    try:
+        assert reopened.query(RollupRouter().route(sql)) == expected
+        assert reopened.get_watermark("rollup_format") == 2
+    finally:
+        reopened.close()
@@ -0,0 +1,62 @@
+import pytest
+import duckdb
+from unittest.mock import MagicMock
+from shared.db.duckdb_client import LOGS_TABLE_DDL
+from services.pilot_orchestrator.src.tools.sql_validator import SQLValidator
+from services.pilot_orchestrator.src.graph import route_validated_sql
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute(LOGS_TABLE_DDL)
+    yield conn
+    conn.close()
+
+def test_valid_select(conn):
+    validator = SQLValidator()
+    assert validator.validate("SELECT count(*) FROM logs WHERE severity = 'ERROR'", conn) is None
+    assert validator.get_plan("SELECT count(*) FROM logs WHERE severity = 'ERROR'")
+
+def test_unknown_column_lists_schema(conn):
+    validator = SQLValidator()
+    error = validator.validate("SELECT level FROM logs", conn)
+    assert error is not None
+    assert '"level"' in error
+    assert "Available columns in `logs`" in error
+    assert "severity" in error
+
+def test_rejects_writes_and_multiple_statements(conn):
+    validator = SQLValidator()
+    assert "read-only" in validator.validate("DELETE FROM logs", conn)
+    assert "read-only" in validator.validate("DROP TABLE logs", conn)
+    assert "exactly one" in validator.validate("SELECT 1; DELETE FROM logs", conn)
+    assert validator.validate("", conn) == "No SQL generated"
+    # Nothing was executed
+    assert conn.execute("SELECT count(*) FROM information_schema.tables WHERE table_name = 'logs'").fetchone()[0] == 1
+
+def test_cache_keyed_on_normalized_sql():
+    validator = SQLValidator()
+    mock_conn = MagicMock()
+    mock_conn.execute.return_value.fetchall.return_value = [("physical_plan", "SEQ_SCAN")]
+
+    assert validator.validate("SELECT *  FROM logs\n WHERE service_name = 'a  b';", mock_conn) is None
+    assert validator.validate("SELECT * FROM logs WHERE service_name = 'a  b'", mock_conn) is None
+    # Different literal is a different statement
+    assert validator.validate("SELECT * FROM logs WHERE service_name = 'a b'", mock_conn) is None
+
+    assert mock_conn.execute.call_count == 2
+    assert validator.hits == 1
+    assert validator.misses == 2
+
+def test_cache_eviction():
+    validator = SQLValidator(max_entries=2)
+    mock_conn = MagicMock()
+    for i in range(3):
+        validator.validate(f"SELECT {i}", mock_conn)
+    validator.validate("SELECT 0", mock_conn)
+    assert mock_conn.execute.call_count == 4
+
+def test_route_validated_sql():
+    assert route_validated_sql({"sql_error": None}) == "execute_sql"
+    assert route_validated_sql({"sql_error": "bad", "retry_count": 1}) == "generate_sql"
+    assert route_validated_sql({"sql_error": "bad", "retry_count": 3}) == "synthesize_answer"
@@ -1,4 +1,7 @@
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from shared.utils.log_fingerprint import diverse_sample, group_by_fingerprint
+
 from .generator import RegexGenerator
 from .validator import RegexValidator
 
@@ -8,28 +11,96 @@ class DiscoveryAgent:
     1. Generate Regex (LLM)
     2. Validate Regex (Python re)
     3. Retry if invalid (max retries)
+
+    `discover_groups` does this once per line shape for a whole backlog;
+    results are cached by fingerprint in `cache`. The rest of each group
+    (up to `held_out_lines`) is held out to rank candidates.
     """
-    def __init__(self, max_retries: int = 3):
-        self.generator = RegexGenerator()
+    def __init__(self, max_retries: int = 3, sample_size: int = 5, candidates: int = 1,
+                 min_coverage: float = 0.95, held_out_lines: int = 2000, llm=None):
+        self.generator = RegexGenerator(llm)
         self.validator = RegexValidator()
         self.max_retries = max_retries
+        self.sample_size = sample_size
+        self.candidates = candidates
+        self.min_coverage = min_coverage
+        self.held_out_lines = held_out_lines
+        self.cache: Dict[str, Optional[str]] = {} # fingerprint -> regex (None: discovery failed)
+        self.llm_calls = 0
 
-    def discover_schema(self, log_samples: List[str]) -> Optional[str]:
+    def discover_schema(self, log_samples: List[str], held_out: Optional[List[str]] = None) -> Optional[str]:
         """
         Attempts to discover a valid regex schema for the provided log samples.
+        With `held_out` lines, candidates that validate on the samples are also
+        scored on them, and the best of up to `candidates` wins: coverage first,
+        then field rate, then lines/sec.
         """
         print(f"🔍 Starting Schema Discovery for {len(log_samples)} samples...")
+        attempts = self.max_retries + self.candidates - 1
+        best, found, tried = None, 0, set()
         
-        for attempt in range(1, self.max_retries + 1):
-            print(f"  Attempt {attempt}/{self.max_retries}: Generating Regex...")
+        for attempt in range(1, attempts + 1):
+            print(f"  Attempt {attempt}/{attempts}: Generating Regex...")
             regex = self.generator.generate_regex(log_samples)
+            self.llm_calls += 1
             print(f"  Generated: {regex}")
+            if regex in tried:
+                continue
+            tried.add(regex)
             
-            if self.validator.validate(regex, log_samples):
-                print("✅ Schema Validated!")
-                return regex
-            else:
+            if not self.validator.validate(regex, log_samples):
                 print("❌ Validation Failed. Retrying...")
+                continue
+            print("✅ Schema Validated!")
+            if not held_out:
+                return regex
+
+            report = self.validator.evaluate(regex, held_out)
+            print(f"  Held-out: {report['coverage']:.1%} of {len(held_out)} lines, "
+                  f"{report['field_rate']:.0%} fields, {report['lines_per_sec']:,.0f} lines/s")
+            if report["error"] or report["coverage"] < self.min_coverage:
+                print(f"❌ Rejected on held-out lines: {report['error'] or 'coverage too low'}")
+                continue
+            rank = (round(report["coverage"], 3), round(report["field_rate"], 2), report["lines_per_sec"])
+            if best is None or rank > best[0]:
+                best = (rank, regex)
+            found += 1
+            if found >= self.candidates:
+                break
         
+        if best:
+            return best[1]
         print("⚠️ Failed to discover a valid schema after max retries.")
         return None
+
+    def discover_groups(self, lines: Iterable[str]) -> Dict[str, Tuple[Optional[str], List[str]]]:
+        """
+        Groups lines by fingerprint and runs discovery on a small diverse sample
+        of each group not yet in the cache. Returns (regex, sample) per newly
+        discovered fingerprint; the number of LLM calls depends on the number
+        of distinct shapes, not on the number of lines.
+        """
+        groups = group_by_fingerprint(lines)
+        todo = {fp: group for fp, group in groups.items() if fp not in self.cache}
+        print(f"🧬 {sum(len(g) for g in groups.values())} distinct lines in {len(groups)} shapes, "
+              f"{len(groups) - len(todo)} already known")
+        discovered = {}
+        for fp, group in todo.items():
+            sample = diverse_sample(group, self.sample_size)
+            held_out = [line for line in group if line not in sample][:self.held_out_lines]
+            self.cache[fp] = self.discover_schema(sample, held_out)
+            discovered[fp] = (self.cache[fp], sample)
+        return discovered
+
+def lazy_discovery() -> Callable[[List[str]], Optional[str]]:
+    """
+    `discover_schema` for callers that rarely need it (the parser registry):
+    the agent and its LLM client are only built on the first call.
+    """
+    agent: List[DiscoveryAgent] = []
+
+    def discover(log_samples: List[str], held_out: Optional[List[str]] = None) -> Optional[str]:
+        if not agent:
+            agent.append(DiscoveryAgent())
+        return agent[0].discover_schema(log_samples, held_out)
+    return discover
@@ -1,6 +1,6 @@
 import sys
 import os
-from typing import List
+from typing import List, Optional
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
@@ -11,8 +11,8 @@ class RegexGenerator:
     """
     Uses an LLM to generate a Python regex pattern for a given set of log samples.
     """
-    def __init__(self):
-        self.llm = LLMClient()
+    def __init__(self, llm: Optional[LLMClient] = None):
+        self.llm = llm or LLMClient()
 
     def generate_regex(self, samples: List[str]) -> str:
         """
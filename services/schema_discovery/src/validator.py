@@ -1,31 +1,232 @@
+import atexit
 import re
-from typing import List
+import threading
+import time
+import multiprocessing as mp
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import re._parser as sre_parse # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Fields LogParser maps from a learned pattern; the field rate counts these
+SCHEMA_FIELDS = ("timestamp", "severity", "service", "message")
+
+@lru_cache(maxsize=512)
+def compile_pattern(regex: str) -> Optional[re.Pattern]:
+    """Compiled once per distinct regex; None if it does not compile."""
+    try:
+        return re.compile(regex)
+    except (re.error, TypeError):
+        return None
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+
+def _nested_repeat(node: Any, inside: bool = False) -> bool:
+    """True if a repeated group contains another repeat or an alternation."""
+    if isinstance(node, (list, tuple)):
+        return any(_nested_repeat(item, inside) for item in node)
+    if not isinstance(node, sre_parse.SubPattern):
+        return False
+    for op, av in node:
+        if op in _REPEATS and av[1] > 1:
+            if inside or _nested_repeat(av[2], True):
+                return True
+        elif op is sre_parse.BRANCH and inside:
+            return True
+        elif _nested_repeat(av, inside):
+            return True
+    return False
+
+@lru_cache(maxsize=512)
+def may_backtrack_exponentially(regex: str) -> bool:
+    """Nested quantifiers such as `(\\w+\\s?)+`, the shape behind catastrophic backtracking."""
+    try:
+        return _nested_repeat(sre_parse.parse(regex))
+    except Exception:
+        return True
+
+def _match_lines(regex: str, lines: List[str], probes: int, budget: float, progress=None) -> Dict[str, Any]:
+    """
+    Matches every line, then `probes` near misses, timing each match in CPU
+    seconds of this thread so a loaded machine does not slow the clock.
+    Stops at the first line over `budget`. In the worker process, publishes
+    (line index, start time) in `progress` so the parent can kill a match
+    that never finishes.
+    """
+    pattern = compile_pattern(regex)
+    wanted = [field for field in SCHEMA_FIELDS if field in pattern.groupindex]
+    matched = fields = 0
+    report = {"matched": 0, "fields": 0, "seconds": 0.0, "slow": None}
+    # Near misses (a line plus a byte the pattern cannot accept) are where backtracking explodes
+    for i, line in enumerate(lines + [line + "\x00" for line in lines[:probes]]):
+        if progress is not None:
+            progress[1] = time.monotonic()
+            progress[0] = i
+        started = time.thread_time()
+        match = pattern.match(line)
+        spent = time.thread_time() - started
+        if spent > budget:
+            report["slow"] = (i, spent)
+            return report
+        if match and i < len(lines):
+            matched += 1
+            fields += sum(1 for field in wanted if match.group(field))
+    if progress is not None:
+        progress[0] = -1
+
+    # Every line is known to finish in time, so measure throughput without the bookkeeping
+    started = time.thread_time()
+    for line in lines:
+        pattern.match(line)
+    report.update(matched=matched, fields=fields, seconds=time.thread_time() - started)
+    return report
+
+def _serve(conn, progress):
+    """Worker process loop: one `_match_lines` job per request until the pipe closes."""
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        conn.send(_match_lines(*job, progress))
+
+class _MatchWorker:
+    """
+    Long-lived matcher process, started with `spawn`: forking a process
+    whose other threads hold locks (pipeline, DuckDB, discovery) can
+    deadlock the child. Killed and replaced when a match runs away.
+    """
+
+    def __init__(self):
+        ctx = mp.get_context("spawn")
+        self.progress = ctx.RawArray("d", [-1.0, 0.0])
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_serve, args=(child, self.progress), name="regex-matcher", daemon=True)
+        self.process.start()
+        child.close()
+
+    def close(self):
+        self.conn.close()
+        self.process.kill()
+        self.process.join()
 
 class RegexValidator:
     """
     Validates that a regex pattern correctly matches a set of log samples.
+    Candidates are compiled once (`compile_pattern`) and every match is timed
+    in CPU seconds against a per-line budget, so catastrophic backtracking
+    is reported instead of hanging the caller.
+
+    Small sample sets of short lines, matched by a pattern without nested
+    quantifiers, are checked in-process (the line cap bounds any
+    backtracking). Everything else runs in a long-lived worker process,
+    which is killed if a line is still matching after `WATCHDOG_FACTOR`
+    times its budget (at least `WATCHDOG_MIN` seconds) of wall-clock time.
     """
-    
+
+    INLINE_LINES = 32
+    INLINE_LINE_CHARS = 256
+    WATCHDOG_FACTOR = 20
+    WATCHDOG_MIN = 1.0
+
+    _worker: Optional[_MatchWorker] = None
+    _lock = threading.Lock() # One job at a time per worker
+
+    @classmethod
+    def inline(cls, regex: str, lines: List[str]) -> bool:
+        """True if `regex` can be matched against `lines` in-process."""
+        return (len(lines) <= cls.INLINE_LINES
+                and all(len(line) <= cls.INLINE_LINE_CHARS for line in lines)
+                and not may_backtrack_exponentially(regex))
+
+    @classmethod
+    def _isolated(cls, regex: str, lines: List[str], probes: int, budget: float) -> Dict[str, Any]:
+        """Runs `_match_lines` in the worker process, replacing the worker if a line runs away."""
+        limit = max(cls.WATCHDOG_MIN, budget * cls.WATCHDOG_FACTOR)
+        with cls._lock:
+            if cls._worker is None or not cls._worker.process.is_alive():
+                cls._worker = _MatchWorker()
+            worker = cls._worker
+            worker.progress[0] = -1
+            try:
+                worker.conn.send((regex, lines, probes, budget))
+                while True:
+                    if worker.conn.poll(min(limit / 10, 0.05)):
+                        return worker.conn.recv()
+                    line = int(worker.progress[0])
+                    if line >= 0 and time.monotonic() - worker.progress[1] > limit:
+                        cls._reset()
+                        return {"slow": (line, None), "limit": limit}
+                    if not worker.process.is_alive() and not worker.conn.poll():
+                        cls._reset()
+                        return {"crashed": True}
+            except (EOFError, OSError):
+                cls._reset()
+                return {"crashed": True}
+            except BaseException:
+                cls._reset() # An unanswered job would be read as the next job's answer
+                raise
+
+    @classmethod
+    def _reset(cls):
+        if cls._worker is not None:
+            cls._worker.close()
+            cls._worker = None
+
     @staticmethod
-    def validate(regex: str, samples: List[str]) -> bool:
+    def evaluate(regex: str, lines: List[str], time_budget: float = 0.05, probes: int = 20) -> Dict[str, Any]:
         """
-        Returns True if the regex matches ALL samples.
+        Matches `regex` against `lines`. Reports coverage (share of lines
+        matched), field_rate (share of SCHEMA_FIELDS captured non-empty over
+        all lines), lines_per_sec (per CPU second), and `error` for a syntax
+        error, a missing named group or a line that took over `time_budget`
+        CPU seconds.
         """
-        try:
-            pattern = re.compile(regex)
-        except re.error:
-            print(f"❌ Invalid Regex Syntax: {regex}")
-            return False
-            
-        for sample in samples:
-            match = pattern.match(sample)
-            if not match:
-                print(f"❌ Regex failed to match sample: {sample}")
-                return False
-            
-            # Enforce named groups to prevent ".*" cheating
-            if not match.groupdict():
-                print(f"⚠️ Regex matched but captured no named groups (too broad): {sample}")
-                return False
-                
-        return True
+        report = {"regex": regex, "lines": len(lines), "valid": False, "coverage": 0.0,
+                  "field_rate": 0.0, "lines_per_sec": 0.0, "error": None}
+        pattern = compile_pattern(regex)
+        if pattern is None:
+            report["error"] = "invalid syntax"
+            return report
+        if not pattern.groupindex:
+            report["error"] = "no named groups (too broad)"
+            return report
+
+        if RegexValidator.inline(regex, lines):
+            result = _match_lines(regex, lines, probes, time_budget)
+        else:
+            result = RegexValidator._isolated(regex, lines, probes, time_budget)
+        if result.get("crashed"):
+            report["error"] = "matcher crashed"
+            return report
+        if result["slow"]:
+            line, spent = result["slow"]
+            kind = "line" if line < len(lines) else "near-miss probe"
+            took = f"took {spent:.3f}s CPU" if spent is not None else f"still running after {result['limit']:.1f}s"
+            report["error"] = (f"{kind} {line % max(len(lines), 1)} {took}, "
+                               f"over the {time_budget}s budget (catastrophic backtracking)")
+            return report
+
+        wanted = sum(1 for field in SCHEMA_FIELDS if field in pattern.groupindex)
+        report["coverage"] = result["matched"] / len(lines) if lines else 0.0
+        report["field_rate"] = result["fields"] / (len(SCHEMA_FIELDS) * len(lines)) if lines and wanted else 0.0
+        report["lines_per_sec"] = len(lines) / result["seconds"] if result["seconds"] else 0.0
+        report["valid"] = report["coverage"] == 1.0
+        return report
+
+    @staticmethod
+    def validate(regex: str, samples: List[str], time_budget: float = 0.05) -> bool:
+        """
+        Returns True if the regex matches ALL samples, with named groups, within the time budget.
+        """
+        report = RegexValidator.evaluate(regex, samples, time_budget)
+        if report["error"]:
+            print(f"❌ Regex rejected ({report['error']}): {regex}")
+        elif not report["valid"]:
+            print(f"❌ Regex matched {report['coverage']:.0%} of {len(samples)} samples: {regex}")
+        return report["valid"]
+
+atexit.register(RegexValidator._reset)
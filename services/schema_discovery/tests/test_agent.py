@@ -60,3 +60,40 @@ def test_discover_schema_failure(mock_validator_cls, mock_generator_cls):
     # Verify
     assert result is None
     assert mock_generator.generate_regex.call_count == 2
+
+@patch("services.schema_discovery.src.agent.RegexGenerator")
+@patch("services.schema_discovery.src.agent.RegexValidator")
+def test_discover_groups_calls_llm_once_per_shape(mock_validator_cls, mock_generator_cls):
+    mock_generator = mock_generator_cls.return_value
+    mock_validator_cls.return_value.validate.return_value = True
+    mock_validator_cls.return_value.evaluate.return_value = {
+        "coverage": 1.0, "field_rate": 0.25, "lines_per_sec": 1e6, "error": None
+    }
+    mock_generator.generate_regex.side_effect = lambda samples: f"(?P<message>.{{{len(samples)}}})"
+
+    lines = [f"[2025/11/20 10:00:{i % 60:02d}] <INFO> (api) request {i}" for i in range(500)]
+    lines += [f"{i} | worker-{i % 4} | job done" for i in range(500)]
+    agent = DiscoveryAgent(sample_size=4)
+    discovered = agent.discover_groups(lines)
+
+    # One prompt per shape, each with a small sample
+    assert len(discovered) == 2 and agent.llm_calls == 2
+    assert all(len(call.args[0]) == 4 for call in mock_generator.generate_regex.call_args_list)
+
+    # Cached by fingerprint: the same backlog again costs nothing
+    assert agent.discover_groups(lines + ["[2025/11/20 11:00:00] <WARN> (db) slow"]) == {}
+    assert agent.llm_calls == 2
+
+@patch("services.schema_discovery.src.agent.RegexGenerator")
+def test_held_out_lines_pick_the_best_candidate(mock_generator_cls):
+    samples = [f"2025-01-01 10:00:0{i} INFO api request {i}" for i in range(3)]
+    held_out = [f"2025-01-01 10:00:{i % 60:02d} {'WARN' if i % 7 else 'INFO'} api-v2 request {i}" for i in range(2000)]
+    mock_generator_cls.return_value.generate_regex.side_effect = [
+        r"(?P<timestamp>\S+ \S+) (?P<severity>INFO) (?P<message>.*)",                      # fails held-out
+        r"(?P<timestamp>\S+ \S+) (?P<severity>\w+) (?P<message>.*)",                       # no service
+        r"(?P<timestamp>\S+ \S+) (?P<severity>\w+) (?P<service>[\w-]+) (?P<message>.*)",  # best
+    ]
+
+    agent = DiscoveryAgent(max_retries=1, candidates=3)
+    assert agent.discover_schema(samples, held_out) == r"(?P<timestamp>\S+ \S+) (?P<severity>\w+) (?P<service>[\w-]+) (?P<message>.*)"
+    assert agent.llm_calls == 3
@@ -0,0 +1,56 @@
+import time
+
+from services.schema_discovery.src.validator import RegexValidator, compile_pattern, may_backtrack_exponentially
+
+LINES = [f"2023-10-27 10:00:{i % 60:02d} ERROR auth-service Login failed for user={i}" for i in range(5000)]
+FULL = r"(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (?P<severity>\w+) (?P<service>[\w-]+) (?P<message>.*)"
+
+def test_compiled_once():
+    assert compile_pattern(FULL) is compile_pattern(FULL)
+    assert compile_pattern("(") is None
+
+def test_report_on_held_out_lines():
+    report = RegexValidator.evaluate(FULL, LINES)
+    assert report["valid"] and report["error"] is None
+    assert (report["coverage"], report["field_rate"]) == (1.0, 1.0)
+    assert report["lines_per_sec"] > 0
+
+    partial = RegexValidator.evaluate(r"(?P<timestamp>\S+ \S+) (?P<severity>ERROR) (?P<message>.*)", LINES + ["x"] * 5000)
+    assert not partial["valid"]
+    assert (partial["coverage"], partial["field_rate"]) == (0.5, 0.5 * 3 / 4)
+
+    assert RegexValidator.evaluate("(", LINES)["error"] == "invalid syntax"
+    assert not RegexValidator.validate(r".*", LINES[:2])
+
+def test_catastrophic_backtracking_is_cut_off():
+    lines = ["INFO " + "abc def ghi jkl " * 3 + "done"] * 100
+    started = time.monotonic()
+    # Matches every line, but a near miss backtracks exponentially
+    report = RegexValidator.evaluate(r"(?P<severity>\w+) (?P<message>(\w+\s?)+)$", lines, time_budget=0.05)
+    assert time.monotonic() - started < 5
+    assert not report["valid"] and "catastrophic backtracking" in report["error"]
+
+def test_small_samples_are_matched_in_process(monkeypatch):
+    def no_worker(*args):
+        raise AssertionError("small sample sets must not start a matcher process")
+    monkeypatch.setattr(RegexValidator, "_isolated", no_worker)
+    assert RegexValidator.validate(FULL, LINES[:5])
+    assert not RegexValidator.validate(FULL, LINES[:4] + ["not a log line"])
+
+def test_nested_quantifiers_and_long_lines_use_the_worker():
+    assert may_backtrack_exponentially(r"(?P<message>(\w+\s?)+)$")
+    assert may_backtrack_exponentially(r"(?P<message>(a|ab)*)c")
+    assert not may_backtrack_exponentially(FULL)
+    assert not RegexValidator.inline(FULL, LINES[:5] + ["x" * (RegexValidator.INLINE_LINE_CHARS + 1)])
+
+    # The worker outlives a job and is only replaced after a runaway line
+    RegexValidator.evaluate(FULL, LINES)
+    pid = RegexValidator._worker.process.pid
+    assert RegexValidator.evaluate(FULL, LINES)["valid"]
+    assert RegexValidator._worker.process.pid == pid
+
+def test_catastrophic_backtracking_in_small_samples_is_cut_off():
+    started = time.monotonic()
+    report = RegexValidator.evaluate(r"(?P<severity>\w+) (?P<message>(\w+\s?)+)$", ["INFO " + "abc def " * 6 + "done"] * 5)
+    assert time.monotonic() - started < 5
+    assert "catastrophic backtracking" in report["error"]
@@ -0,0 +1,169 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import duckdb
+
+HISTORY_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS chat_history (
+        id UUID DEFAULT uuid(),
+        timestamp TIMESTAMP DEFAULT current_timestamp,
+        session_id VARCHAR,
+        role VARCHAR,
+        content VARCHAR
+    );
+"""
+
+class ChatHistoryStore:
+    """
+    Chat turns per session, in their own DuckDB file (apart from the logs DB lock).
+
+    - Reads return only the last `limit` turns of a session (indexed on
+      session_id, newest first with LIMIT), never the whole conversation.
+    - The last `ring_size` turns of the `max_sessions` most recent sessions
+      are kept in memory, so a follow-up question reads no rows at all.
+    - `append` only queues the turn: a background thread inserts queued turns
+      every `flush_interval` seconds (or `batch_size` turns) in one
+      transaction. Queued turns are visible to reads right away; `close`
+      writes what is still queued.
+
+    Turns carry a `seq` so that two turns with the same timestamp keep their order.
+    """
+
+    def __init__(self, db_path: str = "data/target/history.duckdb", ring_size: int = 50,
+                 max_sessions: int = 1024, flush_interval: float = 0.5, batch_size: int = 256):
+        self.db_path = db_path
+        self.ring_size = ring_size
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = duckdb.connect(db_path)
+        self.conn.execute(HISTORY_TABLE_DDL)
+        # Older history files predate seq (numbered here in timestamp order) and the session index
+        self.conn.execute("ALTER TABLE chat_history ADD COLUMN IF NOT EXISTS seq BIGINT")
+        self.conn.execute("""
+            UPDATE chat_history SET seq = numbered.n
+            FROM (SELECT id, row_number() OVER (ORDER BY timestamp) AS n FROM chat_history) numbered
+            WHERE chat_history.id = numbered.id AND chat_history.seq IS NULL
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chat_history_session_idx ON chat_history (session_id)")
+        # DuckDB cannot replay an index creation from its WAL; persist the DDL before any crash
+        self.conn.execute("CHECKPOINT")
+        self._seq = self.conn.execute("SELECT coalesce(max(seq), 0) FROM chat_history").fetchone()[0]
+
+        self._rings: "OrderedDict[str, deque]" = OrderedDict()
+        self._pending: List[Dict[str, Any]] = []
+        self._inflight: List[Dict[str, Any]] = [] # Taken by the writer, not committed yet
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+        self.write_errors = 0
+        self._writer = threading.Thread(target=self._write_loop, name="chat-history-writer", daemon=True)
+        self._writer.start()
+
+    def append(self, session_id: str, role: str, content: str):
+        """Queues one turn; it is readable at once and written within `flush_interval`."""
+        with self._lock:
+            self._seq += 1
+            turn = {"seq": self._seq, "timestamp": datetime.now(timezone.utc).replace(tzinfo=None),
+                    "session_id": session_id, "role": role, "content": content}
+            self._pending.append(turn)
+            ring = self._rings.get(session_id)
+            if ring is not None:
+                ring.append(turn)
+                self._rings.move_to_end(session_id)
+            if len(self._pending) >= self.batch_size:
+                self._wake.notify()
+
+    def recent(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """The last `limit` turns of a session, oldest first."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            ring = self._rings.get(session_id)
+            if ring is not None and limit <= self.ring_size:
+                self.hits += 1
+                self._rings.move_to_end(session_id)
+                return [dict(turn) for turn in list(ring)[-limit:]]
+            self.misses += 1
+            # Snapshot before reading the table: a turn committed in between is
+            # then found twice (and deduplicated by seq), never missed
+            queued = self._queued(session_id)
+
+        turns = {turn["seq"]: turn for turn in self._read(session_id, max(limit, self.ring_size))}
+        turns.update((turn["seq"], turn) for turn in queued)
+        with self._lock:
+            # Turns appended during the read are not in any ring yet
+            turns.update((turn["seq"], turn) for turn in self._queued(session_id))
+            ordered = sorted(turns.values(), key=lambda turn: (turn["timestamp"], turn["seq"]))
+            if session_id not in self._rings:
+                self._rings[session_id] = deque(ordered[-self.ring_size:], maxlen=self.ring_size)
+                while len(self._rings) > self.max_sessions:
+                    self._rings.popitem(last=False)
+        return [dict(turn) for turn in ordered[-limit:]]
+
+    def _queued(self, session_id: str) -> List[Dict[str, Any]]:
+        return [turn for turn in self._inflight + self._pending if turn["session_id"] == session_id]
+
+    def _read(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        cursor = self.conn.cursor() # Readers run on request threads, next to the writer
+        try:
+            rows = cursor.execute(
+                "SELECT seq, timestamp, role, content FROM chat_history "
+                "WHERE session_id = ? ORDER BY timestamp DESC, seq DESC LIMIT ?",
+                [session_id, limit]
+            ).fetchall()
+        finally:
+            cursor.close()
+        return [{"seq": seq, "timestamp": ts, "session_id": session_id, "role": role, "content": content}
+                for seq, ts, role, content in rows]
+
+    def _write_loop(self):
+        cursor = self.conn.cursor()
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending and not self._closed:
+                        self._wake.wait(self.flush_interval)
+                    if not self._pending and self._closed:
+                        return
+                    batch, self._pending = self._pending, []
+                    self._inflight = batch
+                if batch:
+                    self._insert(cursor, batch)
+                with self._lock:
+                    self._inflight = []
+        finally:
+            cursor.close()
+
+    def _insert(self, cursor: Any, batch: List[Dict[str, Any]]):
+        try:
+            cursor.execute("BEGIN TRANSACTION")
+            cursor.executemany(
+                "INSERT INTO chat_history (timestamp, session_id, role, content, seq) VALUES (?, ?, ?, ?, ?)",
+                [[t["timestamp"], t["session_id"], t["role"], t["content"], t["seq"]] for t in batch]
+            )
+            cursor.execute("COMMIT")
+            self.written += len(batch)
+        except duckdb.Error as e:
+            try:
+                cursor.execute("ROLLBACK")
+            except duckdb.Error:
+                pass # Failed before the transaction began
+            # History is best effort: the turns stay in the ring buffers until evicted
+            self.write_errors += 1
+            print(f"❌ Failed to save {len(batch)} history messages: {e}")
+
+    def close(self):
+        """Writes every queued turn, then closes the database."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._writer.join()
+        self.conn.close()
@@ -0,0 +1,214 @@
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Promoted keys and their typed columns; read by the SQL generator and query rewriter
+CONTEXT_COLUMNS_DDL = """
+    CREATE TABLE IF NOT EXISTS context_columns (
+        key VARCHAR PRIMARY KEY,
+        column_name VARCHAR,
+        data_type VARCHAR,
+        promoted_at TIMESTAMP
+    );
+"""
+
+# Keys are inlined into SQL, so only plain identifiers qualify
+PROMOTABLE_KEY = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,40}$")
+CANONICAL_INT = re.compile(r"^-?(?:0|[1-9][0-9]{0,17})$")
+
+# `context->>'key'` (optionally `'$.key'`), or a quoted literal/identifier to skip over
+_CONTEXT_REF = re.compile(
+    r"(?P<ref>\bcontext\s*->>\s*'(?:\$\.)?(?P<key>[A-Za-z_][A-Za-z0-9_]*)')"
+    r"|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"",
+    re.IGNORECASE
+)
+
+def column_for(key: str) -> str:
+    return f"ctx_{key.lower()}"
+
+def is_int_value(value: Any) -> bool:
+    """True if `context->>key` would render the value as a canonical integer."""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    return isinstance(value, str) and bool(CANONICAL_INT.match(value))
+
+def rewrite_context_refs(sql: Optional[str], columns: Dict[str, Tuple[str, str]]) -> Optional[str]:
+    """
+    Replaces `context->>'key'` with the promoted column for `key`, so filters
+    read a typed column instead of parsing JSON per row. The rewrite keeps the
+    VARCHAR result of `->>`; quoted text is left untouched.
+    """
+    if not sql or not columns:
+        return sql
+
+    def replace(match):
+        if not match.group("ref"):
+            return match.group(0)
+        promoted = columns.get(match.group("key"))
+        if promoted is None:
+            return match.group(0)
+        column, data_type = promoted
+        return column if data_type == "VARCHAR" else f"{column}::VARCHAR"
+
+    return _CONTEXT_REF.sub(replace, sql)
+
+class ContextColumnManager:
+    """
+    Promotes frequent context keys out of the JSON `context` column into typed
+    `ctx_<key>` columns on `logs`.
+
+    Key frequencies are counted per inserted batch. Once `min_rows` rows have
+    been seen, every key present in at least `min_share` of them (up to
+    `max_columns` in total) is promoted: the column is added and backfilled
+    from `context`. Keys whose values were all integers become BIGINT, the
+    rest VARCHAR; a BIGINT column that later receives a non-integer value is
+    widened to VARCHAR, so the column always matches `context->>'key'`.
+
+    `context` itself is still written in full; promoted columns are a copy
+    that filters can use without JSON parsing.
+    """
+
+    def __init__(self, conn: Any, min_rows: int = 10000, min_share: float = 0.3,
+                 max_columns: int = 32, check_every: int = 50000):
+        self.conn = conn
+        self.min_rows = min_rows
+        self.min_share = min_share
+        self.max_columns = max_columns
+        self.check_every = check_every
+        self.rows_seen = 0
+        self.key_counts: Counter = Counter()
+        self.non_int_keys = set()
+        self._since_check = 0
+        self._lock = threading.Lock()
+        self.conn.execute(CONTEXT_COLUMNS_DDL)
+        self.columns = self.load(conn)
+
+    @staticmethod
+    def load(conn: Any) -> Dict[str, Tuple[str, str]]:
+        """Returns {key: (column, type)} for promoted keys (empty on databases that predate them)."""
+        try:
+            rows = conn.execute("SELECT key, column_name, data_type FROM context_columns ORDER BY key").fetchall()
+        except Exception:
+            return {}
+        return {key: (column, data_type) for key, column, data_type in rows}
+
+    def select_list(self) -> str:
+        """Extra projection filling promoted columns from the JSON text of a staged batch."""
+        return "".join(
+            f", TRY_CAST(context::JSON->>'{key}' AS {data_type}) AS {column}"
+            for key, (column, data_type) in self.columns.items()
+        )
+
+    def prepare(self, logs: List[Dict[str, Any]]) -> bool:
+        """
+        Counts key frequencies for a batch and widens BIGINT columns it does not fit.
+        Returns True if the `logs` schema changed.
+        """
+        changed = False
+        with self._lock:
+            for log in logs:
+                context = log.get("context")
+                if not context:
+                    continue
+                self.key_counts.update(context.keys())
+                for key, value in context.items():
+                    if key not in self.non_int_keys and not is_int_value(value):
+                        changed |= self._mark_non_int(key)
+            self.rows_seen += len(logs)
+            self._since_check += len(logs)
+        return changed
+
+    def prepare_sql(self, source_sql: str, params: Optional[List[Any]] = None) -> bool:
+        """prepare() for rows produced by a query, with the key statistics computed in SQL."""
+        rows = self.conn.execute(f"""
+            SELECT key, count(*), bool_and(coalesce(
+                json_type(value) IN ('BIGINT', 'UBIGINT')
+                OR (json_type(value) = 'VARCHAR' AND regexp_full_match(value->>'$', '{CANONICAL_INT.pattern[1:-1]}')),
+                false))
+            FROM (SELECT key, json_extract(context, '$."' || key || '"') AS value
+                  FROM (SELECT context, unnest(json_keys(context)) AS key FROM ({source_sql})))
+            GROUP BY key
+        """, params).fetchall()
+        total = self.conn.execute(f"SELECT count(*) FROM ({source_sql})", params).fetchone()[0]
+        changed = False
+        with self._lock:
+            for key, count, all_int in rows:
+                self.key_counts[key] += count
+                if not all_int and key not in self.non_int_keys:
+                    changed |= self._mark_non_int(key)
+            self.rows_seen += total
+            self._since_check += total
+        return changed
+
+    def _mark_non_int(self, key: str) -> bool:
+        """Records a key with a non-integer value; widens its column if it was BIGINT."""
+        self.non_int_keys.add(key)
+        promoted = self.columns.get(key)
+        if promoted and promoted[1] == "BIGINT":
+            self._widen(key)
+            return True
+        return False
+
+    def maybe_promote(self) -> List[str]:
+        """Promotes keys that crossed the frequency threshold. Returns the new columns."""
+        with self._lock:
+            if self.rows_seen < self.min_rows or (self.columns and self._since_check < self.check_every):
+                return []
+            self._since_check = 0
+            taken = {column for column, _ in self.columns.values()}
+            candidates = []
+            for key, count in self.key_counts.most_common():
+                if count < self.min_share * self.rows_seen:
+                    break
+                if key in self.columns or not PROMOTABLE_KEY.match(key) or column_for(key) in taken:
+                    continue
+                taken.add(column_for(key))
+                candidates.append(key)
+            candidates = candidates[:max(0, self.max_columns - len(self.columns))]
+            return [self._promote(key) for key in candidates]
+
+    def _promote(self, key: str) -> str:
+        column = column_for(key)
+        data_type = "VARCHAR" if key in self.non_int_keys else "BIGINT"
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            if data_type == "BIGINT":
+                # Rows from before this process started may hold non-integer values
+                mismatched = self.conn.execute(
+                    f"""
+                    SELECT count(*) FROM logs
+                    WHERE context->>'{key}' IS NOT NULL
+                      AND TRY_CAST(context->>'{key}' AS BIGINT)::VARCHAR IS DISTINCT FROM context->>'{key}'
+                    """
+                ).fetchone()[0]
+                if mismatched:
+                    data_type = "VARCHAR"
+            self.conn.execute(f"ALTER TABLE logs ADD COLUMN IF NOT EXISTS {column} {data_type}")
+            self.conn.execute(f"UPDATE logs SET {column} = TRY_CAST(context->>'{key}' AS {data_type})")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO context_columns VALUES (?, ?, ?, now()::TIMESTAMP)",
+                [key, column, data_type]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.columns[key] = (column, data_type)
+        print(f"🧱 Promoted context key '{key}' to column {column} ({data_type})")
+        return column
+
+    def _widen(self, key: str):
+        column, _ = self.columns[key]
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            self.conn.execute(f"ALTER TABLE logs ALTER {column} TYPE VARCHAR")
+            self.conn.execute("UPDATE context_columns SET data_type = 'VARCHAR' WHERE key = ?", [key])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.columns[key] = (column, "VARCHAR")
+        print(f"🧱 Widened {column} to VARCHAR (non-integer value seen)")
@@ -1,15 +1,159 @@
 import duckdb
 import json
-from typing import List, Dict, Any
+import pandas as pd
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 import os
 
+from shared.db.context_columns import ContextColumnManager
+from shared.utils.telemetry import tracer
+
+# Canonical layout of the `logs` table. Kept in one place so writers, readers
+# and test fixtures agree on the schema that generated SQL is checked against.
+LOGS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS logs (
+        timestamp TIMESTAMP,
+        severity VARCHAR,
+        service_name VARCHAR,
+        trace_id VARCHAR,
+        body VARCHAR,
+        environment VARCHAR,
+        app_id VARCHAR,
+        department VARCHAR,
+        host VARCHAR,
+        region VARCHAR,
+        context JSON,
+        template_id VARCHAR
+    );
+"""
+
+# Incrementally maintained aggregates for dashboard-style questions.
+# Both are keyed so a batch can be merged with INSERT ... ON CONFLICT.
+ROLLUP_TABLES_DDL = {
+    "logs_rollup_minute": """
+        CREATE TABLE IF NOT EXISTS logs_rollup_minute (
+            bucket TIMESTAMP,
+            service_name VARCHAR,
+            severity VARCHAR,
+            event_count BIGINT,
+            PRIMARY KEY (bucket, service_name, severity)
+        );
+    """,
+    "logs_rollup_template_hour": """
+        CREATE TABLE IF NOT EXISTS logs_rollup_template_hour (
+            bucket TIMESTAMP,
+            service_name VARCHAR,
+            severity VARCHAR,
+            template_id VARCHAR,
+            body VARCHAR,
+            event_count BIGINT,
+            PRIMARY KEY (bucket, service_name, severity, template_id)
+        );
+    """,
+}
+
+# Aggregations used both for per-batch merges and full rebuilds.
+# `{source}` is either the staging table or `logs`. Key columns cannot hold
+# NULL, so NULL keys are stored as ROLLUP_NULL and mapped back by readers
+# (see ROLLUP_VIEW_SQL). `body` is the template's latest text, for display only.
+ROLLUP_NULL = "chr(0)"
+
+ROLLUP_MERGE_SQL = {
+    "logs_rollup_minute": f"""
+        INSERT INTO logs_rollup_minute
+        SELECT date_trunc('minute', timestamp), coalesce(service_name, {ROLLUP_NULL}),
+               coalesce(severity, {ROLLUP_NULL}), count(*)
+        FROM {{source}}
+        WHERE timestamp IS NOT NULL
+        GROUP BY ALL
+        ON CONFLICT DO UPDATE SET event_count = event_count + excluded.event_count
+    """,
+    "logs_rollup_template_hour": f"""
+        INSERT INTO logs_rollup_template_hour
+        SELECT date_trunc('hour', timestamp), coalesce(service_name, {ROLLUP_NULL}),
+               coalesce(severity, {ROLLUP_NULL}), coalesce(template_id, {ROLLUP_NULL}),
+               arg_max(coalesce(body, ''), timestamp), count(*)
+        FROM {{source}}
+        WHERE timestamp IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT DO UPDATE SET
+            event_count = event_count + excluded.event_count,
+            body = excluded.body
+    """,
+}
+
+# The rollups with their NULL keys restored, for querying
+ROLLUP_VIEW_SQL = {
+    "logs_rollup_minute": f"""
+        SELECT bucket, nullif(service_name, {ROLLUP_NULL}) AS service_name,
+               nullif(severity, {ROLLUP_NULL}) AS severity, event_count
+        FROM logs_rollup_minute
+    """,
+    "logs_rollup_template_hour": f"""
+        SELECT bucket, nullif(service_name, {ROLLUP_NULL}) AS service_name,
+               nullif(severity, {ROLLUP_NULL}) AS severity,
+               nullif(template_id, {ROLLUP_NULL}) AS template_id, body, event_count
+        FROM logs_rollup_template_hour
+    """,
+}
+
+# Bumped whenever ROLLUP_MERGE_SQL changes what rows hold; older rollups are
+# migrated in place on open (see migrate_rollups), never rebuilt from `logs`,
+# which retention may already have emptied. Version 1 stored NULL keys as ''.
+ROLLUP_FORMAT = ("rollup_format", 2)
+
+# Rollup key columns that may hold ROLLUP_NULL
+ROLLUP_NULLABLE_KEYS = {
+    "logs_rollup_minute": ("service_name", "severity"),
+    "logs_rollup_template_hour": ("service_name", "severity", "template_id"),
+}
+
+# Highest write-ahead-log sequence applied per writer, committed in the same
+# transaction as the rows so replaying the log after a crash is idempotent.
+# Also records ROLLUP_FORMAT.
+WATERMARKS_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS ingest_watermarks (
+        name VARCHAR PRIMARY KEY,
+        seq BIGINT,
+        updated_at TIMESTAMP
+    );
+"""
+
+# One row per bulk-loaded file: its identity and how far it has been committed.
+# `committed_offset` is in decompressed bytes and moves in the same
+# transaction as the rows, so a rerun resumes exactly where the last one stopped.
+MANIFEST_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS ingest_manifest (
+        path VARCHAR PRIMARY KEY,
+        size BIGINT,
+        mtime_ns BIGINT,
+        head_hash VARCHAR,
+        head_bytes INTEGER,
+        codec VARCHAR,
+        committed_offset BIGINT,
+        lines BIGINT,
+        status VARCHAR,
+        updated_at TIMESTAMP
+    );
+"""
+
+MANIFEST_COLUMNS = ["path", "size", "mtime_ns", "head_hash", "head_bytes", "codec", "committed_offset", "lines", "status"]
+
+def _to_naive_utc(ts: Any) -> Any:
+    """Timestamps are stored as naive UTC; aware datetimes are converted first."""
+    if isinstance(ts, datetime) and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
 class DuckDBConnector:
-    def __init__(self, db_path: str = "data/target/logs.duckdb", read_only: bool = False):
+    def __init__(self, db_path: str = "data/target/logs.duckdb", read_only: bool = False,
+                 config: Optional[Dict[str, Any]] = None):
         self.db_path = db_path
-        self.history_path = "data/target/history.duckdb"
         # Ensure data directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
+        self.context_columns: Optional[ContextColumnManager] = None
+
         # 1. Connect to Logs DB (Read-Only or Read-Write)
         if read_only:
              # Wait for DB file to exist
@@ -23,7 +167,8 @@ class DuckDBConnector:
             max_retries = 30
             for i in range(max_retries):
                 try:
-                    self.conn = duckdb.connect(self.db_path, read_only=True, config={'access_mode': 'READ_ONLY'})
+                    self.conn = duckdb.connect(self.db_path, read_only=True,
+                                               config={'access_mode': 'READ_ONLY', **(config or {})})
                     print("✅ Connected to Logs DB (Read-Only).")
                     break
                 except Exception as e:
@@ -33,116 +178,189 @@ class DuckDBConnector:
                     else:
                         raise e
         else:
-            self.conn = duckdb.connect(self.db_path)
+            self.conn = duckdb.connect(self.db_path, config=config or {})
             self._init_schema() # Only inits logs table
-            
-        # 2. Connect to History DB (Always Read-Write)
-        # We use a separate connection for history to avoid locking conflicts with logs
+            # Frequent context keys get typed ctx_* columns (writer only)
+            self.context_columns = ContextColumnManager(self.conn)
+        # Chat history lives in its own file (shared/db/chat_history.py);
+        # concurrent readers share one instance through shared/db/reader_pool.py
+
+    def _init_schema(self):
+        """Initializes the logs table and its rollups."""
+        self.conn.execute(LOGS_TABLE_DDL)
+        # Older databases predate template_id
+        self.conn.execute("ALTER TABLE logs ADD COLUMN IF NOT EXISTS template_id VARCHAR")
+
+        existing = {row[0] for row in self.conn.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_name LIKE 'logs_rollup_%'"
+        ).fetchall()}
+        for ddl in ROLLUP_TABLES_DDL.values():
+            self.conn.execute(ddl)
+        self.conn.execute(WATERMARKS_TABLE_DDL)
+        self.conn.execute(MANIFEST_TABLE_DDL)
+
+        # Rollups written in an older format are migrated; rollups created on
+        # a DB that already holds logs are built once
+        name, version = ROLLUP_FORMAT
+        created = set(ROLLUP_TABLES_DDL) - existing
+        outdated = self.get_watermark(name) < version
+        if outdated and existing:
+            self.migrate_rollups(existing & set(ROLLUP_TABLES_DDL))
+        if created and self.conn.execute("SELECT count(*) FROM logs").fetchone()[0] > 0:
+            self.rebuild_rollups(created)
+        if created or outdated:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ingest_watermarks VALUES (?, ?, now()::TIMESTAMP)", [name, version]
+            )
+
+    def rebuild_rollups(self, tables: Optional[Iterable[str]] = None):
+        """
+        Recomputes rollup tables (all by default) from the raw logs table.
+        Buckets whose raw rows retention has expired are lost.
+        """
+        print("🧮 Rebuilding rollup tables from logs...")
+        self.conn.execute("BEGIN TRANSACTION")
         try:
-            self.history_conn = duckdb.connect(self.history_path)
-            self._init_history_schema()
-            print("✅ Connected to History DB.")
-        except Exception as e:
-            print(f"⚠️ Failed to connect to History DB: {e}")
-            self.history_conn = None
+            for table in tables or ROLLUP_MERGE_SQL:
+                self.conn.execute(f"DELETE FROM {table}")
+                self.conn.execute(ROLLUP_MERGE_SQL[table].format(source="logs"))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
 
-        # Auto-load catalog if present
-        if os.path.exists("data/system_catalog.csv"):
-            self.load_catalog("data/system_catalog.csv")
+    def migrate_rollups(self, tables: Iterable[str]):
+        """
+        Rewrites format-1 rollup keys in place: '' becomes ROLLUP_NULL. Format 1
+        merged NULL and '' into one key; it reads back as NULL, which is what
+        parsers store for a missing field. History older than `logs` is kept.
+        """
+        print("🧮 Migrating rollup tables to the current format...")
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            for table in tables:
+                for column in ROLLUP_NULLABLE_KEYS[table]:
+                    self.conn.execute(f"UPDATE {table} SET {column} = {ROLLUP_NULL} WHERE {column} = ''")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
 
-    def _init_schema(self):
-        """Initializes the logs table."""
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS logs (
-                timestamp TIMESTAMP,
-                level VARCHAR,
-                service VARCHAR,
-                message VARCHAR,
-                template_id VARCHAR
-            );
-        """)
-
-    def _init_history_schema(self):
-        """Initializes the history table in the separate DB."""
-        if self.history_conn:
-            self.history_conn.execute("""
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id UUID DEFAULT uuid(),
-                    timestamp TIMESTAMP DEFAULT current_timestamp,
-                    session_id VARCHAR,
-                    role VARCHAR,
-                    content VARCHAR
-                );
-            """)
-            
-    def save_message(self, session_id: str, role: str, content: str):
-        """Saves a chat message to history DB."""
-        if self.history_conn:
-            try:
-                self.history_conn.execute(
-                    "INSERT INTO chat_history (session_id, role, content) VALUES (?, ?, ?)",
-                    [session_id, role, content]
-                )
-                print(f"💾 Saved message to history: {role} - {content[:20]}...")
-            except Exception as e:
-                print(f"❌ Failed to save message: {e}")
-
-    def get_history(self, session_id: str = "default"):
-        """Retrieves chat history from history DB."""
-        if self.history_conn:
-            try:
-                rows = self.history_conn.execute(
-                    "SELECT role, content, timestamp FROM chat_history WHERE session_id = ? ORDER BY timestamp ASC",
-                    [session_id]
-                ).fetchall()
-                print(f"📖 Retrieved {len(rows)} history items for session {session_id}")
-                return rows
-            except Exception as e:
-                print(f"❌ Failed to get history: {e}")
-                return []
-        return []
-
-    def insert_batch(self, logs: List[Dict[str, Any]]):
+    def get_context_columns(self) -> Dict[str, Tuple[str, str]]:
+        """Returns promoted context keys as {key: (column, type)}."""
+        cursor = self.conn.cursor() # Callable from any thread
+        try:
+            return ContextColumnManager.load(cursor)
+        finally:
+            cursor.close()
+
+    def get_watermark(self, name: str) -> int:
+        """Returns the last sequence committed under `name` (0 if none)."""
+        row = self.conn.execute("SELECT seq FROM ingest_watermarks WHERE name = ?", [name]).fetchone()
+        return row[0] if row else 0
+
+    def get_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Returns every bulk-loaded file's manifest entry, keyed by path."""
+        rows = self.conn.execute(f"SELECT {', '.join(MANIFEST_COLUMNS)} FROM ingest_manifest").fetchall()
+        return {row[0]: dict(zip(MANIFEST_COLUMNS, row)) for row in rows}
+
+    def save_manifest(self, entry: Dict[str, Any]):
+        """Upserts one file's manifest entry (for files that produced no rows)."""
+        self._upsert_manifest(self.conn, entry)
+
+    @staticmethod
+    def _upsert_manifest(conn: Any, entry: Dict[str, Any]):
+        conn.execute(
+            f"INSERT OR REPLACE INTO ingest_manifest VALUES ({', '.join('?' * len(MANIFEST_COLUMNS))}, now()::TIMESTAMP)",
+            [entry.get(column) for column in MANIFEST_COLUMNS]
+        )
+
+    def insert_batch(self, logs: List[Dict[str, Any]], watermark: Optional[Tuple[str, int]] = None,
+                     manifest: Optional[Dict[str, Any]] = None):
         """
-        Inserts a batch of log records.
-        Expects a list of dictionaries matching the LogEvent schema.
+        Inserts a batch of log records and merges it into the rollup tables.
+        Expects LogRecords, or dictionaries matching the LogEvent schema.
+        Raw rows and rollups are committed in one transaction so they never drift.
+        A `(name, seq)` watermark or a file `manifest` entry, if given, is
+        committed in the same transaction.
         """
         if not logs:
             return
 
-        # Prepare data for insertion
-        # We need to ensure 'context' is serialized to a JSON string if it's a dict
-        # However, DuckDB's Python client handles dict -> JSON conversion automatically 
-        # if we use the right appender or insert method. 
-        # For simplicity and safety, we'll serialize explicitly for the SQL interface.
-        
-        values = []
-        for log in logs:
-            context_json = json.dumps(log.get("context", {}))
-            values.append((
-                log["timestamp"],
-                log["severity"],
-                log["service_name"],
-                log.get("trace_id"),
-                log["body"],
-                log.get("environment"),
-                log.get("app_id"),
-                log.get("department"),
-                log.get("host"),
-                log.get("region"),
-                context_json
-            ))
-
-        # Use executemany for batch insertion
-        insert_sql = """
-        INSERT INTO logs (timestamp, severity, service_name, trace_id, body, environment, app_id, department, host, region, context)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        # Key statistics for column promotion; may widen a promoted column first
+        if self.context_columns and self.context_columns.prepare(logs):
+            self.conn.execute("DROP TABLE IF EXISTS logs_batch")
+
+        # Build the batch column-wise: DuckDB scans a DataFrame in one vectorized
+        # call, while executemany pays a full statement round trip per row.
+        # Context is serialized to a JSON string explicitly for the JSON column.
+        frame = pd.DataFrame({
+            "timestamp": [_to_naive_utc(log["timestamp"]) for log in logs],
+            "severity": [log["severity"] for log in logs],
+            "service_name": [log["service_name"] for log in logs],
+            "trace_id": pd.Series([log.get("trace_id") for log in logs], dtype="string"),
+            "body": [log["body"] for log in logs],
+            "environment": pd.Series([log.get("environment") for log in logs], dtype="string"),
+            "app_id": pd.Series([log.get("app_id") for log in logs], dtype="string"),
+            "department": pd.Series([log.get("department") for log in logs], dtype="string"),
+            "host": pd.Series([log.get("host") for log in logs], dtype="string"),
+            "region": pd.Series([log.get("region") for log in logs], dtype="string"),
+            "context": [json.dumps(log.get("context", {})) for log in logs],
+            "template_id": pd.Series([log.get("template_id") for log in logs], dtype="string"),
+        })
+        self.conn.register("logs_batch_frame", frame)
+        try:
+            self._commit_staged("SELECT * FROM logs_batch_frame", None, watermark, manifest)
+        finally:
+            self.conn.unregister("logs_batch_frame")
+
+    def insert_select(self, source_sql: str, params: Optional[List[Any]] = None,
+                      manifest: Optional[Dict[str, Any]] = None):
+        """
+        Inserts the rows of a query (`logs` columns, context as JSON text) with
+        the same rollup merge and manifest transaction as insert_batch. Lets
+        sources that DuckDB scans natively skip building Python records.
         """
-        self.conn.executemany(insert_sql, values)
+        if self.context_columns and self.context_columns.prepare_sql(source_sql, params):
+            self.conn.execute("DROP TABLE IF EXISTS logs_batch")
+        self._commit_staged(source_sql, params, None, manifest)
+
+    def _commit_staged(self, source_sql: str, params: Optional[List[Any]],
+                       watermark: Optional[Tuple[str, int]], manifest: Optional[Dict[str, Any]]):
+        promoted = self.context_columns.select_list() if self.context_columns else ""
+
+        # Stage the batch so raw rows and rollup deltas come from the same data
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS logs_batch AS SELECT * FROM logs LIMIT 0")
+        self.conn.execute("BEGIN TRANSACTION")
+        try:
+            self.conn.execute("DELETE FROM logs_batch")
+            self.conn.execute(f"INSERT INTO logs_batch BY NAME SELECT *{promoted} FROM ({source_sql})", params)
+            self.conn.execute("INSERT INTO logs BY NAME SELECT * FROM logs_batch")
+            for merge_sql in ROLLUP_MERGE_SQL.values():
+                self.conn.execute(merge_sql.format(source="logs_batch"))
+            if watermark:
+                self.conn.execute(
+                    """
+                    INSERT INTO ingest_watermarks VALUES (?, ?, now()::TIMESTAMP)
+                    ON CONFLICT DO UPDATE SET seq = greatest(seq, excluded.seq), updated_at = excluded.updated_at
+                    """,
+                    list(watermark)
+                )
+            if manifest:
+                self._upsert_manifest(self.conn, manifest)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        # The staging table mirrors `logs`, so it is recreated after a promotion
+        if self.context_columns and self.context_columns.maybe_promote():
+            self.conn.execute("DROP TABLE IF EXISTS logs_batch")
 
     def query(self, sql: str) -> List[Any]:
         """Executes a raw SQL query and returns the result."""
-        return self.conn.execute(sql).fetchall()
+        with tracer.span("duckdb.query"):
+            return self.conn.execute(sql).fetchall()
 
     def close(self):
         self.conn.close()
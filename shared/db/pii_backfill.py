@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from shared.db.context_columns import ContextColumnManager
+from shared.utils.pii_masker import PIIMasker
+
+# Text columns that can hold PII, per table; `context` is masked as JSON
+MASKED_COLUMNS = {
+    "logs": ["body", "context"],
+    "logs_rollup_template_hour": ["body"],
+}
+
+class PIIBackfill:
+    """
+    Re-masks rows already in the database in place, e.g. after a PII rule is added.
+
+    Each table is processed in rowid ranges of `chunk_rows`, one transaction
+    per range, by `workers` cursors in parallel (default: one per CPU). The
+    masker's RE2 prefilter runs in SQL so only candidate rows reach the
+    `mask_pii` Arrow UDF, and only rows whose value actually changes are
+    rewritten. Promoted `ctx_*` columns are refreshed together with `context`.
+    """
+
+    def __init__(self, db: Any, masker: Optional[PIIMasker] = None, chunk_rows: int = 1_000_000,
+                 workers: Optional[int] = None):
+        self.db = db
+        self.masker = masker or PIIMasker()
+        self.chunk_rows = chunk_rows
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._local = threading.local()
+        self._cursors: List[Any] = []
+
+    def _cursor(self) -> Any:
+        """One cursor per worker thread (UDFs live in the shared catalog)."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self.db.conn.cursor()
+            self._local.cursor = cursor
+            self._cursors.append(cursor)
+        return cursor
+
+    def _update_sql(self, table: str, column: str) -> str:
+        udf = "mask_pii_json" if column == "context" else "mask_pii"
+        value = f"{column}::VARCHAR" if column == "context" else column
+        refresh = ""
+        if column == "context":
+            refresh = "".join(
+                f", {promoted} = TRY_CAST(m.masked::JSON->>'{key}' AS {data_type})"
+                for key, (promoted, data_type) in ContextColumnManager.load(self.db.conn).items()
+            )
+        # CASE keeps the UDF behind the prefilter; as a plain filter the
+        # optimizer may evaluate the UDF first
+        candidate = f"regexp_matches({value}, ?)" if self.masker.prefilter else "true"
+        return f"""
+            UPDATE {table} SET {column} = m.masked{refresh}
+            FROM (
+                SELECT rowid AS rid, {value} AS original,
+                       CASE WHEN {candidate} THEN {udf}({value}) END AS masked
+                FROM {table}
+                WHERE rowid >= ? AND rowid < ?
+            ) m
+            WHERE {table}.rowid = m.rid AND m.masked <> m.original
+        """
+
+    def _chunk(self, sql: str, lo: int, hi: int) -> int:
+        params = ([self.masker.prefilter] if self.masker.prefilter else []) + [lo, hi]
+        return self._cursor().execute(sql, params).fetchone()[0]
+
+    def run(self, tables: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Masks every configured column; returns rows, rows changed, seconds and rows/sec per table."""
+        # Registered on the owning connection: a UDF registered through a cursor
+        # must not outlive it
+        self.masker.register(self.db.conn)
+        stats = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            for table in tables or list(MASKED_COLUMNS):
+                rows, max_rowid = self.db.conn.execute(f"SELECT count(*), max(rowid) FROM {table}").fetchone()
+                ranges: List[Tuple[int, int]] = [
+                    (lo, lo + self.chunk_rows) for lo in range(0, (max_rowid or 0) + 1, self.chunk_rows)
+                ] if rows else []
+                started = time.perf_counter()
+                changed = 0
+                for column in MASKED_COLUMNS[table]:
+                    sql = self._update_sql(table, column)
+                    changed += sum(pool.map(lambda r: self._chunk(sql, *r), ranges))
+                seconds = time.perf_counter() - started
+                stats[table] = {"rows": rows, "changed": changed, "seconds": seconds,
+                                "rows_per_sec": rows / seconds if seconds else 0.0}
+                print(f"🛡️  {table}: {rows} rows, {changed} values re-masked in {seconds:.1f}s "
+                      f"({stats[table]['rows_per_sec']:,.0f} rows/s)")
+        for cursor in self._cursors:
+            cursor.close()
+        self._cursors = []
+        return stats
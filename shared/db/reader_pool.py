@@ -0,0 +1,103 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from shared.db.context_columns import ContextColumnManager
+from shared.db.duckdb_client import DuckDBConnector
+from shared.utils.telemetry import tracer
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+class ReaderPool:
+    """
+    Per-request cursors on one shared, read-only DuckDB database instance.
+
+    A DuckDB connection must not be used by two threads at once, but cursors
+    (child connections of the same instance) can: each request takes its own
+    cursor, and queries from concurrent requests run in parallel over one
+    buffer pool. At most `size` cursors are out at a time; further requests
+    wait for one to be returned. Returned cursors are reused.
+
+    `threads` and `memory_limit` are the instance's DuckDB settings, shared
+    by all of its cursors. Defaults come from LOGPILOT_DUCKDB_READERS,
+    LOGPILOT_DUCKDB_THREADS and LOGPILOT_DUCKDB_MEMORY_LIMIT (e.g. "2GB"),
+    else DuckDB's own (all cores, 80% of RAM).
+    """
+
+    def __init__(self, db_path: str = "data/target/logs.duckdb", size: Optional[int] = None,
+                 threads: Optional[int] = None, memory_limit: Optional[str] = None):
+        self.size = size or _env_int("LOGPILOT_DUCKDB_READERS") or 8
+        config = {}
+        threads = threads or _env_int("LOGPILOT_DUCKDB_THREADS")
+        if threads:
+            config["threads"] = threads
+        memory_limit = memory_limit or os.getenv("LOGPILOT_DUCKDB_MEMORY_LIMIT")
+        if memory_limit:
+            config["memory_limit"] = memory_limit
+        self.db = DuckDBConnector(db_path=db_path, read_only=True, config=config)
+        self.db_path = db_path
+        self._idle: List[Any] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.created = 0
+
+    @contextmanager
+    def cursor(self) -> Iterator[Any]:
+        """`with pool.cursor() as cursor:` a cursor owned by this thread until the block ends."""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError(f"Reader pool for {self.db_path} is closed")
+                if self._idle:
+                    cursor = self._idle.pop()
+                else:
+                    cursor = self.db.conn.cursor()
+                    self.created += 1
+            try:
+                yield cursor
+            finally:
+                with self._lock:
+                    if self._closed:
+                        cursor.close()
+                    else:
+                        self._idle.append(cursor)
+        finally:
+            self._slots.release()
+
+    def query(self, sql: str) -> List[Any]:
+        """Executes a raw SQL query on a pooled cursor and returns the result."""
+        with tracer.span("duckdb.query"), self.cursor() as cursor:
+            return cursor.execute(sql).fetchall()
+
+    def get_context_columns(self) -> Dict[str, Tuple[str, str]]:
+        """Returns promoted context keys as {key: (column, type)}."""
+        with self.cursor() as cursor:
+            return ContextColumnManager.load(cursor)
+
+    def close(self):
+        """Closes idle cursors and the instance; cursors still in use close when returned."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for cursor in idle:
+            cursor.close()
+        self.db.close()
+
+_pools: Dict[str, ReaderPool] = {}
+_pools_lock = threading.Lock()
+
+def get_reader_pool(db_path: str = "data/target/logs.duckdb") -> ReaderPool:
+    """The process-wide pool for `db_path`, opened on first use (not at import)."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = _pools[key] = ReaderPool(db_path)
+        return pool
@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from shared.db.duckdb_client import ROLLUP_TABLES_DDL
+
+class RetentionManager:
+    """
+    Enforces TTLs on the logs database and keeps the file compact.
+
+    - Raw rows in `logs` expire per service/severity (see config/retention_config.yaml).
+    - Rollup rows expire on their own, longer TTLs. Raw rows are merged into the
+      rollups when they are inserted, so expiring them downsamples old history
+      to rollup granularity instead of losing it.
+    - After deleting, a CHECKPOINT folds the WAL into the main file so freed
+      blocks can be reused.
+
+    Runs on its own cursor (a separate connection to the same database instance),
+    so it can live inside the ingestion process next to the writer. Deletes are
+    sliced by time to keep each transaction short.
+    """
+
+    def __init__(self, db: Any, policy: Optional[Dict[str, Any]] = None,
+                 config_path: str = "config/retention_config.yaml"):
+        self.db = db
+        self.policy = policy if policy is not None else self._load_config(config_path)
+        schedule = self.policy.get("schedule", {})
+        self.interval_sec = schedule.get("interval_minutes", 60) * 60
+        self.slice = timedelta(hours=schedule.get("delete_slice_hours", 6))
+        self.checkpoint = schedule.get("checkpoint", True)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_config(self, path: str) -> Dict[str, Any]:
+        # Resolve relative to project root, like the LLM config
+        base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
+        full_path = os.path.join(base_path, path)
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"Retention config not found at {full_path}")
+        with open(full_path, "r") as f:
+            return yaml.safe_load(f)["retention"]
+
+    def _ttl_expression(self) -> Tuple[str, List[Any]]:
+        """Builds a CASE expression giving each row's TTL in days, most specific rule first."""
+        raw = self.policy.get("raw", {})
+        branches, params = [], []
+        for rule in raw.get("rules", []):
+            branches.append("WHEN service_name = ? AND severity = ? THEN ?")
+            params += [rule["service"], rule["severity"], int(rule["ttl_days"])]
+        for service, days in (raw.get("services") or {}).items():
+            branches.append("WHEN service_name = ? THEN ?")
+            params += [service, int(days)]
+        for severity, days in (raw.get("severities") or {}).items():
+            branches.append("WHEN severity = ? THEN ?")
+            params += [severity, int(days)]
+
+        default = int(raw.get("default_ttl_days", 30))
+        if not branches:
+            return "?", [default]
+        return f"CASE {' '.join(branches)} ELSE ? END", params + [default]
+
+    def _min_raw_ttl(self) -> int:
+        raw = self.policy.get("raw", {})
+        ttls = [int(raw.get("default_ttl_days", 30))]
+        ttls += [int(r["ttl_days"]) for r in raw.get("rules", [])]
+        ttls += [int(d) for d in (raw.get("services") or {}).values()]
+        ttls += [int(d) for d in (raw.get("severities") or {}).values()]
+        return min(ttls)
+
+    def expire_raw(self, cursor: Any, now: datetime) -> int:
+        """Deletes raw rows past their TTL, oldest slice first. Returns rows deleted."""
+        oldest = cursor.execute("SELECT min(timestamp) FROM logs").fetchone()[0]
+        if oldest is None:
+            return 0
+
+        ttl_sql, ttl_params = self._ttl_expression()
+        horizon = now - timedelta(days=self._min_raw_ttl())
+        deleted = 0
+        lower = oldest
+        while lower < horizon:
+            upper = min(lower + self.slice, horizon)
+            # DuckDB reports the affected row count as the DELETE's result
+            deleted += cursor.execute(
+                f"""
+                DELETE FROM logs
+                WHERE timestamp >= ? AND timestamp < ?
+                  AND timestamp < ?::TIMESTAMP - to_days(CAST({ttl_sql} AS INTEGER))
+                """,
+                [lower, upper, now] + ttl_params
+            ).fetchone()[0]
+            lower = upper
+        return deleted
+
+    def expire_rollups(self, cursor: Any, now: datetime) -> Dict[str, int]:
+        """Deletes rollup buckets past their TTL."""
+        deleted = {}
+        for table, days in (self.policy.get("rollups") or {}).items():
+            if table not in ROLLUP_TABLES_DDL:
+                print(f"⚠️ Unknown rollup table in retention config: {table}")
+                continue
+            cutoff = now - timedelta(days=int(days))
+            deleted[table] = cursor.execute(
+                f"DELETE FROM {table} WHERE bucket < ?", [cutoff]
+            ).fetchone()[0]
+        return deleted
+
+    def compact(self, cursor: Any) -> bool:
+        """Checkpoints the database so space freed by deletes can be reused."""
+        try:
+            cursor.execute("CHECKPOINT")
+            return True
+        except Exception as e:
+            # Another transaction may hold the checkpoint lock; try again next cycle
+            print(f"⚠️ Checkpoint skipped: {e}")
+            return False
+
+    def apply(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Runs one retention pass: expire raw rows, expire rollups, compact."""
+        # Timestamps are stored as naive UTC
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        size_before = self._db_size()
+        cursor = self.db.conn.cursor()
+        try:
+            stats = {
+                "raw_deleted": self.expire_raw(cursor, now),
+                "rollups_deleted": self.expire_rollups(cursor, now),
+            }
+            stats["checkpointed"] = self.compact(cursor) if self.checkpoint else False
+        finally:
+            cursor.close()
+        stats["bytes_before"] = size_before
+        stats["bytes_after"] = self._db_size()
+        print(f"🧹 Retention pass: {stats}")
+        return stats
+
+    def _db_size(self) -> int:
+        path = getattr(self.db, "db_path", None)
+        if path and os.path.exists(path):
+            return os.path.getsize(path)
+        return 0
+
+    def start(self):
+        """Runs retention passes periodically on a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+        self._thread.start()
+        print(f"🗓️  Retention manager started (every {self.interval_sec // 60} min)")
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.apply()
+            except Exception as e:
+                # Write conflicts with the ingestion writer are retried next cycle
+                print(f"❌ Retention pass failed: {e}")
+            self._stop.wait(max(0.0, self.interval_sec - (time.time() - started)))
@@ -1,16 +1,23 @@
 import os
+import threading
 import yaml
-from typing import Optional, Dict, Any
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator
 import openai
 
+from shared.utils.telemetry import metrics, tracer
+
+TOKENS = metrics.counter("logpilot_llm_tokens_total", "Tokens reported by the LLM provider.", ("provider", "model", "kind"))
+
 class LLMClient:
     """
     A unified client for interacting with LLM providers (OpenAI, Gemini, Local).
     Reads configuration from config/llm_config.yaml.
+    `provider` overrides the configured default (e.g. to compare models).
     """
-    def __init__(self, config_path: str = "config/llm_config.yaml"):
+    def __init__(self, config_path: str = "config/llm_config.yaml", provider: Optional[str] = None):
         self.config = self._load_config(config_path)
-        self.provider_name = self.config["llm"]["default_provider"]
+        self.provider_name = provider or self.config["llm"]["default_provider"]
         self.provider_config = self.config["llm"]["providers"][self.provider_name]
         
         self.api_key = self._get_api_key()
@@ -22,6 +29,7 @@ class LLMClient:
             api_key=self.api_key,
             base_url=self.base_url
         )
+        self._local = threading.local() # Usage trackers of the calling thread
 
     def _load_config(self, path: str) -> Dict[str, Any]:
         # Resolve absolute path relative to project root
@@ -47,6 +55,33 @@ class LLMClient:
              return "missing"
         return api_key
 
+    @contextmanager
+    def track_usage(self) -> Iterator[Dict[str, int]]:
+        """
+        Counts calls and tokens of every `generate` made by this thread inside
+        the block. Safe with concurrent callers: each thread sees only its own.
+        """
+        usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        if not hasattr(self._local, "trackers"):
+            self._local.trackers = []
+        trackers = self._local.trackers
+        trackers.append(usage)
+        try:
+            yield usage
+        finally:
+            trackers.remove(usage)
+
+    def _record_usage(self, response: Any, model_name: str):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            TOKENS.inc(self.provider_name, model_name, "prompt", amount=usage.prompt_tokens or 0)
+            TOKENS.inc(self.provider_name, model_name, "completion", amount=usage.completion_tokens or 0)
+        for tracker in getattr(self._local, "trackers", ()):
+            tracker["calls"] += 1
+            if usage is not None:
+                tracker["prompt_tokens"] += usage.prompt_tokens or 0
+                tracker["completion_tokens"] += usage.completion_tokens or 0
+
     def generate(self, prompt: str, model_type: str = "fast") -> str:
         """
         Generates text from the LLM.
@@ -61,16 +96,19 @@ class LLMClient:
 
         print(f"🤖 LLM Call ({self.provider_name}/{model_name}): {prompt[:50]}...")
         
-        try:
-            response = self.client.chat.completions.create(
-                model=model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            return f"❌ Error generating response: {e}"
-            return f"❌ Error generating response: {e}"
+        with tracer.span("llm.generate", provider=self.provider_name, model=model_name) as span:
+            try:
+                response = self.client.chat.completions.create(
+                    model=model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.2
+                )
+                self._record_usage(response, model_name)
+                return response.choices[0].message.content
+            except Exception as e:
+                span.fail(e)
+                return f"❌ Error generating response: {e}"
+                return f"❌ Error generating response: {e}"
 
     def check_health(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,106 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional, Tuple, Union
+
+# (marker, answer): the first rule whose marker occurs in the prompt answers it
+Rule = Tuple[str, Union[str, Callable[[str], str]]]
+
+class StubLLMServer:
+    """
+    A local OpenAI-compatible chat completions endpoint with canned answers,
+    so benchmarks and tests can drive LLMClient without a model.
+
+    Latency is `latency` seconds plus up to `jitter`, drawn from a generator
+    seeded with the prompt: the same prompt always waits as long, whatever
+    the concurrency. Token usage is estimated at 4 characters per token.
+    `calls` counts requests per matched marker ("default" if none matched).
+    """
+
+    def __init__(self, rules: List[Rule], latency: float = 0.05, jitter: float = 0.0, seed: int = 0,
+                 default: str = "OK", host: str = "127.0.0.1", port: int = 0):
+        self.rules = rules
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.default = default
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def answer(self, prompt: str) -> str:
+        for marker, answer in self.rules:
+            if marker in prompt:
+                with self._lock:
+                    self.calls[marker] += 1
+                return answer(prompt) if callable(answer) else answer
+        with self._lock:
+            self.calls["default"] += 1
+        return self.default
+
+    def delay(self, prompt: str) -> float:
+        return self.latency + random.Random(f"{self.seed}:{prompt}").uniform(0, self.jitter)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass # Keep benchmark output clean
+
+            def _send(self, payload: dict):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+                time.sleep(stub.delay(prompt))
+                content = stub.answer(prompt)
+                self._send({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                              "total_tokens": (len(prompt) + len(content)) // 4},
+                })
+        return Handler
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def config(self) -> dict:
+        """An llm_config.yaml body whose default provider is this server."""
+        return {"llm": {"default_provider": "stub",
+                        "providers": {"stub": {"api_base": self.url, "default_model": "stub"}}}}
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Any, Dict, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional, Union
+import pydantic_core
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 class LogEvent(BaseModel):
     """
@@ -12,6 +13,7 @@ class LogEvent(BaseModel):
     service_name: str = Field(..., description="Name of the service that generated the log")
     trace_id: Optional[str] = Field(None, description="Distributed trace ID if available")
     body: str = Field(..., description="The raw log message or template")
+    template_id: Optional[str] = Field(None, description="Drain3 cluster ID of the mined template")
     
     # Standard Resource Attributes (Metadata)
     environment: Optional[str] = Field(None, description="Deployment environment (prod, staging, dev)")
@@ -36,3 +38,100 @@ class LogEvent(BaseModel):
                 "context": {"user_id": 123, "error_code": "PAY_001"}
             }
         }
+
+# Field order of LogEvent, shared by LogRecord
+LOG_FIELDS = tuple(LogEvent.model_fields)
+
+# Parses timestamps the way LogEvent does: pydantic writes UTC as "...Z",
+# which datetime.fromisoformat only accepts from Python 3.11 on
+TIMESTAMP = TypeAdapter(datetime)
+
+class LogRecord:
+    """
+    Compact, unvalidated twin of LogEvent for the ingestion hot path.
+
+    Building and dumping a LogEvent validates every field twice per line;
+    a slotted record costs one small allocation. Records can be read like
+    the dict `model_dump()` returns (`record["body"]`, `record.get(...)`),
+    so sinks accept either. Validation happens in RecordValidator, and at
+    API boundaries, which keep using LogEvent.
+    """
+    __slots__ = LOG_FIELDS
+
+    def __init__(self, timestamp: datetime, severity: str, service_name: str, body: str,
+                 template_id: Optional[str] = None, trace_id: Optional[str] = None,
+                 environment: Optional[str] = None, app_id: Optional[str] = None,
+                 department: Optional[str] = None, host: Optional[str] = None,
+                 region: Optional[str] = None, context: Optional[Dict[str, Any]] = None):
+        self.timestamp = timestamp
+        self.severity = severity
+        self.service_name = service_name
+        self.trace_id = trace_id
+        self.body = body
+        self.template_id = template_id
+        self.environment = environment
+        self.app_id = app_id
+        self.department = department
+        self.host = host
+        self.region = region
+        self.context = context if context is not None else {}
+
+    def __getitem__(self, name: str) -> Any:
+        return getattr(self, name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in LOG_FIELDS}
+
+    def to_json(self) -> bytes:
+        """Same bytes as `LogEvent.model_dump_json()`, via pydantic's serializer minus validation."""
+        return pydantic_core.to_json(self.to_dict())
+
+    @classmethod
+    def from_json(cls, payload: Union[str, bytes]) -> "LogRecord":
+        data = pydantic_core.from_json(payload)
+        data["timestamp"] = TIMESTAMP.validate_python(data["timestamp"])
+        return cls(**data)
+
+    def to_event(self) -> LogEvent:
+        """Full pydantic validation."""
+        return LogEvent(**self.to_dict())
+
+class RecordValidator:
+    """
+    Checks LogRecords against LogEvent off the critical path.
+
+    - off: no validation.
+    - sample: validates every `1/sample_rate`-th record; failures are
+      counted and printed, the record is still ingested.
+    - strict: validates every record and raises on the first failure
+      (debugging a new source).
+    """
+    MODES = ("off", "sample", "strict")
+
+    def __init__(self, mode: str = "sample", sample_rate: float = 0.01):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown validation mode: {mode} (expected one of {', '.join(self.MODES)})")
+        self.mode = mode
+        self.every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.seen = 0
+        self.checked = 0
+        self.failures = 0
+
+    def check(self, record: LogRecord) -> LogRecord:
+        if self.mode == "off":
+            return record
+        self.seen += 1
+        if self.mode == "sample" and (not self.every or self.seen % self.every):
+            return record
+        self.checked += 1
+        try:
+            record.to_event()
+        except ValidationError as e:
+            self.failures += 1
+            if self.mode == "strict":
+                raise
+            print(f"⚠️ Invalid log record ({self.failures} so far): {e.errors()[0]['msg']} in {record.service_name}")
+        return record
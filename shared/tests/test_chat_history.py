@@ -0,0 +1,64 @@
+from shared.db.chat_history import ChatHistoryStore
+
+def store(tmp_path, **kwargs) -> ChatHistoryStore:
+    return ChatHistoryStore(str(tmp_path / "history.duckdb"), **kwargs)
+
+def contents(turns):
+    return [turn["content"] for turn in turns]
+
+def test_sessions_are_separate_and_reads_are_bounded(tmp_path):
+    history = store(tmp_path, ring_size=4)
+    for i in range(10):
+        history.append("alice", "user", f"a{i}")
+    history.append("bob", "user", "b0")
+
+    assert contents(history.recent("alice", 3)) == ["a7", "a8", "a9"]
+    assert contents(history.recent("bob", 10)) == ["b0"]
+    assert history.recent("carol") == []
+    history.close()
+
+    # Everything queued was written on close; a new store reads it back in order
+    reopened = store(tmp_path, ring_size=4)
+    assert contents(reopened.recent("alice", 20)) == [f"a{i}" for i in range(10)]
+    assert contents(reopened.recent("alice", 2)) == ["a8", "a9"]
+    reopened.close()
+
+def test_ring_buffer_serves_follow_ups_from_memory(tmp_path):
+    history = store(tmp_path, ring_size=8)
+    history.append("s", "user", "q1")
+    history.append("s", "ai", "a1")
+    history.recent("s") # Miss: loads the ring from the table and the write queue
+    for i in range(5):
+        history.append("s", "user", f"q{i + 2}")
+        assert contents(history.recent("s", 2))[-1] == f"q{i + 2}"
+    assert (history.hits, history.misses) == (5, 1)
+    # Beyond the ring, the table is read
+    assert len(history.recent("s", 50)) == 7 and history.misses == 2
+    history.close()
+
+def test_least_recent_sessions_are_evicted(tmp_path):
+    history = store(tmp_path, max_sessions=2, flush_interval=60)
+    for session in ("a", "b", "c"):
+        history.append(session, "user", f"hello {session}")
+        history.recent(session)
+    assert list(history._rings) == ["b", "c"]
+    # Still queued, not written yet: an evicted session reads it from the queue
+    assert history.written == 0
+    assert contents(history.recent("a")) == ["hello a"]
+    history.close()
+    assert history.written == 3
+
+def test_history_files_without_seq_are_migrated(tmp_path):
+    import duckdb
+    path = str(tmp_path / "history.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute("CREATE TABLE chat_history (id UUID DEFAULT uuid(), timestamp TIMESTAMP DEFAULT current_timestamp, "
+                 "session_id VARCHAR, role VARCHAR, content VARCHAR)")
+    conn.execute("INSERT INTO chat_history (timestamp, session_id, role, content) VALUES "
+                 "('2025-01-01 10:00:00', 'default', 'user', 'old q'), ('2025-01-01 10:00:01', 'default', 'ai', 'old a')")
+    conn.close()
+
+    history = ChatHistoryStore(path)
+    history.append("default", "user", "new q")
+    assert contents(history.recent("default")) == ["old q", "old a", "new q"]
+    history.close()
@@ -0,0 +1,87 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.context_columns import rewrite_context_refs
+from shared.utils.context_extractor import extract_kv
+
+START = datetime(2025, 6, 1, 12, 0)
+
+def batch(n, offset=0, user_id=lambda i: str(i)):
+    return [{
+        "timestamp": START + timedelta(seconds=offset + i),
+        "severity": "INFO",
+        "service_name": "payment-service",
+        "body": "Payment processed",
+        "template_id": "1",
+        # user_id on every row, region on half, order_ref on a few
+        "context": {"user_id": user_id(offset + i), **({"region": "eu"} if i % 2 else {}),
+                    **({"order_ref": "A1"} if i % 10 == 0 else {})},
+    } for i in range(n)]
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = DuckDBConnector(db_path=str(tmp_path / "logs.duckdb"))
+    db.context_columns.min_rows = 100
+    db.context_columns.check_every = 100
+    yield db
+    db.close()
+
+def test_frequent_keys_are_promoted_and_backfilled(db):
+    db.insert_batch(batch(50))
+    assert db.get_context_columns() == {} # Below min_rows
+    db.insert_batch(batch(50, offset=50))
+
+    assert db.get_context_columns() == {
+        "region": ("ctx_region", "VARCHAR"),
+        "user_id": ("ctx_user_id", "BIGINT"),
+    }
+    # Rows written before the promotion were backfilled, later rows are filled on insert
+    db.insert_batch(batch(10, offset=100))
+    assert db.query("SELECT count(*) FROM logs WHERE ctx_user_id IS NULL") == [(0,)]
+    assert db.query("SELECT count(*) FROM logs WHERE ctx_user_id = 105") == [(1,)]
+    assert db.query("SELECT count(*) FROM logs WHERE ctx_region = 'eu'") == [(55,)]
+
+def test_non_integer_value_widens_column(db):
+    db.insert_batch(batch(100))
+    db.insert_batch(batch(1, offset=100, user_id=lambda i: "guest"))
+    assert db.get_context_columns()["user_id"] == ("ctx_user_id", "VARCHAR")
+    # The promoted column always agrees with the JSON value
+    assert db.query(
+        "SELECT count(*) FROM logs WHERE ctx_user_id IS DISTINCT FROM (context->>'user_id')"
+    ) == [(0,)]
+
+def test_rewritten_sql_matches_json_access(db):
+    db.insert_batch(batch(100))
+    columns = db.get_context_columns()
+    sql = "SELECT count(*) FROM logs WHERE (context->>'user_id') = '41' AND (context->>'$.region') = 'eu' AND body <> 'context->>''user_id'''"
+    rewritten = rewrite_context_refs(sql, columns)
+    assert "(ctx_user_id::VARCHAR) = '41'" in rewritten and "(ctx_region) = 'eu'" in rewritten
+    assert "'context->>''user_id'''" in rewritten # Literals are left alone
+    assert db.query(rewritten) == db.query(sql) == [(1,)]
+    assert rewrite_context_refs("SELECT context->>'order_ref' FROM logs", columns) == "SELECT context->>'order_ref' FROM logs"
+
+def test_extract_kv():
+    assert extract_kv("Login failed for user=admin ip=<IP> reason=bad_password") == {
+        "user": "admin", "ip": "<IP>", "reason": "bad_password"
+    }
+    assert extract_kv("query=a=b") == {"query": "a=b"}
+    assert extract_kv("Sending email to <EMAIL>") == {}
+
+def test_sql_statistics_match_python(db, tmp_path):
+    rows = batch(20) + [dict(batch(1)[0], context={"user_id": "007", "flag": True, "n": 3, "neg": "-4"})]
+    db.context_columns.prepare(rows)
+    expected = (dict(db.context_columns.key_counts), set(db.context_columns.non_int_keys))
+
+    other = DuckDBConnector(db_path=str(tmp_path / "other.duckdb"))
+    other.insert_select("SELECT * FROM read_json(?, format='newline_delimited', columns={context: 'JSON'})",
+                        [str(write_jsonl(tmp_path, rows))])
+    assert (dict(other.context_columns.key_counts), set(other.context_columns.non_int_keys)) == expected
+    assert other.query("SELECT count(*) FROM logs")[0][0] == 21
+    other.close()
+
+def write_jsonl(tmp_path, rows):
+    path = tmp_path / "contexts.jsonl"
+    path.write_text("".join(json.dumps({"context": row["context"]}) + "\n" for row in rows))
+    return path
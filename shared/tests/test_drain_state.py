@@ -0,0 +1,82 @@
+import os
+import random
+from drain3 import TemplateMiner
+from drain3.file_persistence import FilePersistence
+from shared.utils.template_miner import LogTemplateMiner
+
+def corpus(n, seed=7):
+    rng = random.Random(seed)
+    verbs = ["started", "stopped", "failed", "retried", "completed"]
+    lines = []
+    for i in range(n):
+        kind = rng.randrange(60) # Enough shapes to keep creating clusters
+        lines.append(f"job{kind} {rng.choice(verbs)} on host{rng.randrange(5)} after {rng.randrange(1000)} ms step {kind % 7}")
+    return lines
+
+def templates(miner):
+    return sorted((c.cluster_id, c.get_template()) for c in miner.miner.drain.clusters)
+
+def test_journal_restores_state_after_crash(tmp_path):
+    path = str(tmp_path / "drain3_state.bin")
+    lines = corpus(2000)
+
+    reference = LogTemplateMiner(persistence_file=str(tmp_path / "ref" / "state.bin"))
+    crashed = LogTemplateMiner(persistence_file=path)
+    for line in lines[:1500]:
+        reference.mine_template(line)
+        crashed.mine_template(line)
+    # Crash: no save_state/close, the lease dies with the process
+    crashed.state.close()
+
+    resumed = LogTemplateMiner(persistence_file=path)
+    assert not resumed.state.read_only
+    assert templates(resumed) == templates(reference)
+    # Mining continues identically, including cluster ids for new templates
+    for line in lines[1500:]:
+        assert resumed.mine_template_with_id(line) == reference.mine_template_with_id(line)
+
+def test_snapshot_cost_scales_with_changes(tmp_path):
+    miner = LogTemplateMiner(persistence_file=str(tmp_path / "state.bin"))
+    miner.state.min_compact_entries = 10
+    for line in corpus(5000):
+        miner.mine_template(line)
+    # Full snapshots only after the journal reaches half the tree: a handful, not one per change
+    assert 0 < miner.state.snapshots <= 10
+    miner.close()
+    assert os.path.getsize(str(tmp_path / "state.bin.journal")) == 0
+
+def test_snapshot_is_readable_by_drain3(tmp_path):
+    path = str(tmp_path / "state.bin")
+    miner = LogTemplateMiner(persistence_file=path)
+    for line in corpus(300):
+        miner.mine_template(line)
+    miner.close()
+
+    plain = TemplateMiner(FilePersistence(path), miner.config)
+    assert sorted(c.get_template() for c in plain.drain.clusters) == sorted(t for _, t in templates(miner))
+
+def test_second_writer_is_read_only(tmp_path):
+    path = str(tmp_path / "state.bin")
+    owner = LogTemplateMiner(persistence_file=path)
+    owner.mine_template("user 1 logged in")
+
+    other = LogTemplateMiner(persistence_file=path)
+    assert other.state.read_only and other.get_total_clusters() == 1
+    other.mine_template("disk full on volume 3")
+    other.save_state() # No-op without the lease
+    owner.close()
+
+    # The lease is free again and the owner's state is intact
+    after = LogTemplateMiner(persistence_file=path)
+    assert not after.state.read_only and after.get_total_clusters() == 1
+    after.close()
+
+def test_legacy_pickle_state_is_ignored(tmp_path):
+    path = str(tmp_path / "state.bin")
+    with open(path, "wb") as f:
+        f.write(b"\x80\x04not-a-drain3-snapshot")
+    miner = LogTemplateMiner(persistence_file=path)
+    assert miner.get_total_clusters() == 0
+    miner.mine_template("service restarted")
+    miner.close()
+    assert LogTemplateMiner(persistence_file=path).get_total_clusters() == 1
@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from pydantic import ValidationError
+from shared.log_schema import LogEvent, LogRecord, RecordValidator
+
+def make(**overrides):
+    fields = dict(timestamp=datetime(2025, 1, 1, 12, 0, 0, 250000, tzinfo=timezone.utc), severity="ERROR",
+                  service_name="payment-service", body="Payment failed for user <*>", template_id="7",
+                  context={"user_id": "123", "retry": 2})
+    fields.update(overrides)
+    return LogRecord(**fields)
+
+def test_record_matches_event_serialization():
+    record = make()
+    event = record.to_event()
+    assert record.to_dict() == event.model_dump()
+    assert record.to_json() == event.model_dump_json().encode("utf-8")
+    # WAL payloads written by either type decode to the same record
+    assert LogRecord.from_json(event.model_dump_json()).to_dict() == record.to_dict()
+    assert record["body"] == record.body and record.get("host") is None
+
+@pytest.mark.parametrize("timestamp", [
+    datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc),
+    datetime(2025, 1, 1, 12, 0, 0, 250000, tzinfo=timezone(timedelta(hours=2))),
+    datetime(2025, 1, 1, 12, 0),
+])
+def test_json_round_trip_keeps_timestamp(timestamp):
+    payload = make(timestamp=timestamp).to_json()
+    decoded = LogRecord.from_json(payload)
+    assert decoded.timestamp == timestamp and decoded.timestamp.utcoffset() == timestamp.utcoffset()
+    assert decoded.to_json() == payload
+
+def test_from_json_reads_utc_suffix():
+    # What pydantic writes for UTC; datetime.fromisoformat rejects the "Z" before Python 3.11
+    record = LogRecord.from_json(b'{"timestamp":"2025-01-01T00:00:00Z","severity":"INFO",'
+                                 b'"service_name":"svc","body":"ok"}')
+    assert record.timestamp == datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def test_validator_modes():
+    bad = make(severity=None)
+    assert RecordValidator(mode="off").check(bad) is bad
+
+    sampled = RecordValidator(mode="sample", sample_rate=0.5)
+    for _ in range(10):
+        sampled.check(bad)
+    assert (sampled.checked, sampled.failures) == (5, 5)
+
+    with pytest.raises(ValidationError):
+        RecordValidator(mode="strict").check(bad)
+    with pytest.raises(ValueError):
+        RecordValidator(mode="sometimes")
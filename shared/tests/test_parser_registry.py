@@ -0,0 +1,117 @@
+import time
+
+from shared.utils.log_fingerprint import diverse_sample, fingerprint, group_by_fingerprint
+from shared.utils.log_parser import LogParser
+from shared.utils.parser_registry import ParserRegistry
+
+LEARNED = r"\[(?P<timestamp>[\d/: ]+)\] <(?P<severity>\w+)> \((?P<service>[\w-]+)\) (?P<message>.*?)(?: trace=(?P<trace>\w+))?$"
+
+def custom(i):
+    return f"[2025/11/20 10:00:{i % 60:02d}] <{'WARN' if i % 2 else 'INFO'}> (billing-api) invoice {i} sent trace=t{i}"
+
+class FakeDiscovery:
+    def __init__(self, regex):
+        self.regex = regex
+        self.calls = []
+        self.held_out = []
+
+    def __call__(self, samples, held_out=None):
+        self.calls.append(samples)
+        self.held_out.append(held_out)
+        return self.regex
+
+def test_fingerprint_ignores_values_and_message():
+    assert fingerprint(custom(1)) == fingerprint(custom(42)) == "[9/9/9 9:9:9] <a> (a)"
+    assert fingerprint("2025-11-20 10:00:01 ERROR auth: x") != fingerprint(custom(1))
+    # Quoted strings and UUIDs are masked whole, whatever they contain
+    assert fingerprint('id=3fa85f64-5717-4562-b3fc-2c963f66afa6 "GET / HTTP/1.1" 200') == \
+           fingerprint('id=c0ffee00-0000-4000-8000-000000000001 "POST /a/b" 404') == 'a=a "" 9'
+
+def test_groups_and_diverse_sample():
+    lines = [custom(i) for i in range(50)] + [f"{i} | worker-{i % 4} | job done" for i in range(30)] + [custom(1)]
+    groups = group_by_fingerprint(lines)
+    assert [len(group) for group in groups.values()] == [50, 30]
+
+    ticket = [f"[2025/11/20 10:00:00] <INFO> (api) ticket {i} closed" for i in range(20)]
+    optional = "[2025/11/20 10:00:00] <INFO> (api) ticket 99 closed after retry 2 of 3"
+    sample = diverse_sample(ticket + [optional] + [custom(i) for i in range(20)], 4)
+    assert len(sample) == 4 and sample[0] == optional
+    assert any("invoice" in line for line in sample) and any("ticket" in line for line in sample[1:])
+
+def test_discovery_runs_once_per_shape_and_persists(tmp_path):
+    path = str(tmp_path / "parsers.json")
+    discovery = FakeDiscovery(LEARNED)
+    parser = LogParser(ParserRegistry(path, discover=discovery, min_samples=10, sample_size=3))
+    for i in range(200):
+        parser.parse(custom(i))
+        parser.registry.wait()
+    assert len(discovery.calls) == 1 and len(discovery.calls[0]) == 3
+    # The collected lines not in the sample rank candidates
+    assert len(discovery.held_out[0]) == 7 and not set(discovery.held_out[0]) & set(discovery.calls[0])
+
+    parsed = parser.parse(custom(7))
+    assert (parsed["severity"], parsed["service_name"], parsed["body"]) == ("WARN", "billing-api", "invoice 7 sent")
+    assert parsed["timestamp"].isoformat() == "2025-11-20T10:00:07+00:00"
+    assert parsed["context"] == {"trace": "t7"}
+    # Built-in formats never reach the registry
+    assert parser.parse("2025-11-24 10:00:00 INFO payment-service: ok")["service_name"] == "payment-service"
+    parser.registry.close()
+
+    # Precompiled from disk on the next start; no further discovery
+    restarted = LogParser(ParserRegistry(path, discover=discovery))
+    assert restarted.parse(custom(3))["service_name"] == "billing-api"
+    assert restarted.registry.hits[fingerprint(custom(3))] > 190
+    assert len(discovery.calls) == 1
+
+def test_failed_discovery_is_not_retried(tmp_path):
+    path = str(tmp_path / "parsers.json")
+    discovery = FakeDiscovery(r"(?P<word>nomatch)")
+    registry = ParserRegistry(path, discover=discovery, min_samples=2)
+    parser = LogParser(registry)
+    for i in range(10):
+        assert parser.parse(custom(i))["context"] == {"parse_error": "format_unknown"}
+    registry.close()
+    assert len(discovery.calls) == 1
+
+    registry = ParserRegistry(path, discover=discovery, min_samples=2)
+    for i in range(10):
+        LogParser(registry).parse(custom(i))
+    registry.close()
+    assert len(discovery.calls) == 1
+
+def test_patterns_are_tried_by_hit_count(tmp_path):
+    registry = ParserRegistry(str(tmp_path / "parsers.json"), resort_every=5)
+    registry._patterns = {"rare": ParserRegistry._compile(r"(?P<message>.*)"),
+                          "common": ParserRegistry._compile(r"(?P<message>x.*)")}
+    registry.hits = {"rare": 3, "common": 0}
+    registry._resort()
+    assert registry.match("xyz")[0] == "rare"
+    registry.hits["common"] = 10
+    for _ in range(4):
+        registry.match("xyz")
+    assert registry.match("xyz")[0] == "common"
+
+def test_rare_shapes_are_discovered_by_age_and_on_close(tmp_path):
+    discovery = FakeDiscovery(LEARNED)
+    registry = ParserRegistry(str(tmp_path / "parsers.json"), discover=discovery, max_age=0.2)
+    LogParser(registry).parse(custom(1))
+    deadline = time.time() + 5
+    while not discovery.calls and time.time() < deadline:
+        time.sleep(0.02)
+    assert discovery.calls == [[custom(1)]]
+
+    registry.observe("1 | worker-1 | job done")
+    registry.close() # Before it is old enough
+    assert discovery.calls[1] == ["1 | worker-1 | job done"]
+    assert len(registry.entries) == 2
+
+def test_collected_shapes_are_capped_least_recent_first(tmp_path):
+    discovery = FakeDiscovery(None)
+    registry = ParserRegistry(str(tmp_path / "parsers.json"), discover=discovery, max_fingerprints=2)
+    registry.observe(custom(1))
+    registry.observe("1 | worker-1 | job done")
+    registry.observe(custom(2)) # Most recent again
+    registry.observe("key=value other=1")
+    assert list(registry._samples) == [fingerprint(custom(1)), fingerprint("key=value other=1")]
+    registry.close()
+    assert sorted(map(sorted, discovery.calls)) == [sorted([custom(1), custom(2)]), ["key=value other=1"]]
@@ -0,0 +1,51 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.pii_backfill import PIIBackfill
+from shared.utils.pii_masker import PIIMasker
+
+START = datetime(2025, 6, 1, 12, 0)
+# A rule added after the data was loaded
+PHONE = {"phone": (r'\+\d{2} \d{3} \d{4}', '<PHONE_REDACTED>')}
+
+def rows(n):
+    return [{
+        "timestamp": START + timedelta(seconds=i),
+        "severity": "INFO",
+        "service_name": "crm",
+        "body": f"Called +44 555 {1000 + i}" if i % 3 == 0 else f"Ticket {i} closed",
+        "template_id": str(i % 3),
+        "context": {"contact": f"+44 555 {1000 + i}" if i % 3 == 0 else "none", "ticket": i},
+    } for i in range(n)]
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = DuckDBConnector(db_path=str(tmp_path / "logs.duckdb"))
+    db.context_columns.min_rows = 10
+    db.insert_batch(rows(30))
+    yield db
+    db.close()
+
+def test_backfill_applies_new_rule_in_place(db):
+    assert "contact" in db.get_context_columns()
+    masker = PIIMasker(patterns={**PIIMasker.PATTERNS, **PHONE},
+                       prefilters={**PIIMasker.PREFILTERS, "phone": r'\+\p{Nd}{2} '})
+    stats = PIIBackfill(db, masker, chunk_rows=7, workers=3).run()
+
+    assert stats["logs"]["rows"] == 30
+    assert stats["logs"]["changed"] == 20 # body and context of every third row
+    bodies = [row[0] for row in db.query("SELECT body FROM logs ORDER BY timestamp")]
+    assert bodies[:4] == ["Called <PHONE_REDACTED>", "Ticket 1 closed", "Ticket 2 closed", "Called <PHONE_REDACTED>"]
+    context, contact = db.query("SELECT context, ctx_contact FROM logs ORDER BY timestamp LIMIT 1")[0]
+    assert json.loads(context) == {"contact": "<PHONE_REDACTED>", "ticket": 0} and contact == "<PHONE_REDACTED>"
+    assert db.query("SELECT count(*) FROM logs_rollup_template_hour WHERE body LIKE '%+44%'")[0][0] == 0
+
+    # Idempotent: nothing left to change
+    assert PIIBackfill(db, masker, chunk_rows=7).run(["logs"])["logs"]["changed"] == 0
+
+def test_rule_without_prefilter_checks_every_row():
+    masker = PIIMasker(patterns={**PIIMasker.PATTERNS, **PHONE})
+    assert masker.prefilter is None
+    assert masker.mask_text("Call +44 555 1234 or a@b.com") == "Call <PHONE_REDACTED> or <EMAIL_REDACTED>"
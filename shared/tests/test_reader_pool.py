@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.reader_pool import ReaderPool
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "logs.duckdb")
+    writer = DuckDBConnector(db_path=path)
+    writer.conn.execute("INSERT INTO logs (timestamp, severity, service_name, body) "
+                        "SELECT now(), 'ERROR', 'svc-' || (i % 4), 'event ' || i FROM range(1000) t(i)")
+    writer.close()
+    return path
+
+def test_concurrent_queries_get_their_own_cursors(db_path):
+    pool = ReaderPool(db_path, size=4, threads=2, memory_limit="256MB")
+    assert pool.query("SELECT current_setting('threads')") == [(2,)]
+
+    results, errors = [], []
+    def worker(service: int):
+        try:
+            for _ in range(20):
+                results.append(pool.query(f"SELECT count(*) FROM logs WHERE service_name = 'svc-{service}'")[0][0])
+        except Exception as e: # A shared connection fails here under concurrency
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i % 4,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert results == [250] * 160
+    # Cursors are reused, never more than `size` at once
+    assert 1 <= pool.created <= 4
+    pool.close()
+
+def test_pool_bounds_cursors_in_use(db_path):
+    pool = ReaderPool(db_path, size=1)
+    entered = threading.Event()
+    def hold():
+        with pool.cursor():
+            entered.set()
+            time.sleep(0.2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(5)
+    started = time.perf_counter()
+    assert pool.query("SELECT 1") == [(1,)] # Waits for the held cursor
+    assert time.perf_counter() - started >= 0.1
+    holder.join()
+
+    pool.close()
+    pool.close() # Idempotent
+    with pytest.raises(RuntimeError):
+        pool.query("SELECT 1")
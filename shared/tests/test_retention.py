@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime, timedelta
+from shared.db.duckdb_client import DuckDBConnector
+from shared.db.retention import RetentionManager
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+POLICY = {
+    "raw": {
+        "default_ttl_days": 30,
+        "services": {"nginx": 7},
+        "severities": {"ERROR": 90},
+        "rules": [{"service": "nginx", "severity": "ERROR", "ttl_days": 60}],
+    },
+    "rollups": {"logs_rollup_minute": 100, "logs_rollup_template_hour": 365},
+    "schedule": {"delete_slice_hours": 24},
+}
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = DuckDBConnector(db_path=str(tmp_path / "logs.duckdb"))
+    batch = []
+    for age in [1, 10, 45, 75, 120]:
+        for service in ["auth-service", "nginx"]:
+            for severity in ["INFO", "ERROR"]:
+                batch.append({
+                    "timestamp": NOW - timedelta(days=age),
+                    "severity": severity,
+                    "service_name": service,
+                    "body": "msg",
+                    "template_id": "1",
+                })
+    db.insert_batch(batch)
+    yield db
+    db.close()
+
+def remaining(db, service, severity):
+    return sorted(
+        (NOW - row[0]).days for row in db.query(
+            f"SELECT timestamp FROM logs WHERE service_name = '{service}' AND severity = '{severity}'"
+        )
+    )
+
+def test_ttl_precedence(db):
+    stats = RetentionManager(db, policy=POLICY).apply(now=NOW)
+
+    assert remaining(db, "auth-service", "INFO") == [1, 10]           # default 30d
+    assert remaining(db, "auth-service", "ERROR") == [1, 10, 45, 75]  # severity 90d
+    assert remaining(db, "nginx", "INFO") == [1]                      # service 7d
+    assert remaining(db, "nginx", "ERROR") == [1, 10, 45]             # service+severity 60d
+    assert stats["raw_deleted"] == 10
+
+def test_rollups_outlive_raw_rows(db):
+    RetentionManager(db, policy=POLICY).apply(now=NOW)
+
+    # Raw rows older than 30 days are gone but still counted in the rollups,
+    # up to each rollup's own TTL
+    minute_total = db.query("SELECT sum(event_count) FROM logs_rollup_minute")[0][0]
+    hour_total = db.query("SELECT sum(event_count) FROM logs_rollup_template_hour")[0][0]
+    assert minute_total == 16 # 120-day-old buckets expired (100d TTL)
+    assert hour_total == 20
+
+def test_apply_is_idempotent(db):
+    manager = RetentionManager(db, policy=POLICY)
+    manager.apply(now=NOW)
+    stats = manager.apply(now=NOW)
+    assert stats["raw_deleted"] == 0
+    assert stats["rollups_deleted"]["logs_rollup_minute"] == 0
+    assert stats["checkpointed"] is True
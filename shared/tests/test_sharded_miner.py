@@ -0,0 +1,69 @@
+import random
+from shared.utils.sharded_miner import ShardedTemplateMiner, TemplateIdAllocator
+
+def corpus(n, seed=11):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(n):
+        service = f"svc-{rng.randrange(6)}"
+        items.append((service, f"{service} request {rng.randrange(1000)} took {rng.randrange(500)} ms"))
+    return items
+
+def test_services_do_not_share_clusters(tmp_path):
+    miner = ShardedTemplateMiner(state_dir=str(tmp_path))
+    a_id, _ = miner.mine_template_with_id("user 17 logged in", "auth")
+    b_id, _ = miner.mine_template_with_id("user 42 logged in", "billing")
+    # Same shape, different services: separate templates with distinct global ids
+    assert a_id != b_id
+    assert miner.mine_template_with_id("user 99 logged in", "auth")[0] == a_id
+    assert set(miner.tree_stats()) == {"auth", "billing"}
+    miner.close()
+
+def test_global_ids_survive_reopen(tmp_path):
+    items = corpus(500)
+    miner = ShardedTemplateMiner(state_dir=str(tmp_path))
+    first = miner.mine_batch(items)
+    miner.close()
+
+    reopened = ShardedTemplateMiner(state_dir=str(tmp_path))
+    assert reopened.get_total_clusters() == len({template_id for template_id, _ in first})
+    assert [template_id for template_id, _ in reopened.mine_batch(items)] == [template_id for template_id, _ in first]
+    reopened.close()
+
+def test_worker_processes_match_in_process(tmp_path):
+    items = corpus(2000)
+    local = ShardedTemplateMiner(state_dir=str(tmp_path / "local"))
+    remote = ShardedTemplateMiner(state_dir=str(tmp_path / "remote"), processes=2)
+    try:
+        expected = [template for _, template in local.mine_batch(items)]
+        assert [template for _, template in remote.mine_batch(items)] == expected
+        assert remote.tree_stats() == local.tree_stats()
+    finally:
+        local.close()
+        remote.close()
+
+def test_allocator_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "template_ids.jsonl")
+    one, two = TemplateIdAllocator(path), TemplateIdAllocator(path)
+    assert one.get("auth", 1) == 1
+    assert two.get("billing", 1) == 2 # Catches up on one's allocation first
+    assert two.get("auth", 1) == 1
+    assert one.get("billing", 1) == 2
+
+def test_non_owner_process_never_reuses_the_owners_ids(tmp_path):
+    owner = ShardedTemplateMiner(state_dir=str(tmp_path))
+    known_id, _ = owner.mine_template_with_id("Cache warmed in 120 ms", "api")
+    owner.save_state()
+    # Opens the same shard from a worker process while `owner` holds the lease
+    other = ShardedTemplateMiner(state_dir=str(tmp_path), processes=1)
+    try:
+        assert other.mine_template_with_id("Cache warmed in 95 ms", "api")[0] == known_id
+        quota_id, _ = other.mine_template_with_id("Disk quota exceeded for volume data-7", "api")
+        timeout_id, _ = owner.mine_template_with_id("Upstream timeout calling payments gateway after 30s", "api")
+        assert len({known_id, quota_id, timeout_id}) == 3
+        # Both processes keep resolving their own templates to their own ids
+        assert other.mine_template_with_id("Disk quota exceeded for volume data-9", "api")[0] == quota_id
+        assert owner.mine_template_with_id("Upstream timeout calling payments gateway after 45s", "api")[0] == timeout_id
+    finally:
+        other.close()
+        owner.close()
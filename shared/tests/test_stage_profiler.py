@@ -0,0 +1,87 @@
+import json
+import os
+import signal
+import threading
+import time
+
+from shared.utils.stage_profiler import StackSampler, StageProfiler
+
+def test_reports_per_interval_deltas_to_stats_file(tmp_path):
+    stats = tmp_path / "stats.jsonl"
+    profiler = StageProfiler(str(stats), echo=False)
+    profiler.timer("parse").add(0.5, items=1000)
+    with profiler.time("insert", 1000):
+        pass
+
+    first = profiler.report()
+    assert first["stages"]["parse"] == {"items": 1000, "batches": 1, "busy_sec": 0.5, "items_per_busy_sec": 2000.0}
+    assert first["stages"]["insert"]["items"] == 1000
+    assert first["lines_per_sec"] > 0
+
+    profiler.timer("parse").add(0.25, items=10)
+    second = profiler.report()
+    # Only what ran since the last report; the idle insert stage reads 0
+    assert second["stages"]["parse"]["items"] == 10
+    assert second["stages"]["insert"]["items"] == 0 and second["lines_per_sec"] == 0
+    assert profiler.report() is None # Nothing ran
+    assert profiler.totals()["parse"] == {"items": 1010, "batches": 2, "busy_sec": 0.75}
+
+    lines = [json.loads(line) for line in stats.read_text().splitlines()]
+    assert [line["stages"]["parse"]["items"] for line in lines] == [1000, 10]
+
+def test_throughput_counts_only_the_terminal_stages():
+    profiler = StageProfiler(echo=False, throughput=("insert", "native_scan"))
+    profiler.timer("parse").add(0.1, items=500)
+    profiler.timer("insert").add(0.1, items=400)
+    # Registered after insert, as when the first structured file is loaded
+    profiler.timer("native_scan").add(0.1, items=0)
+    profiler._last_time -= 1.0 # A one-second interval, for round numbers
+    assert 390 <= profiler.report()["lines_per_sec"] <= 400
+
+    profiler.timer("insert").add(0.1, items=100)
+    profiler.timer("native_scan").add(0.1, items=200)
+    profiler._last_time -= 1.0
+    assert 290 <= profiler.report()["lines_per_sec"] <= 300
+
+def test_background_reporter_flushes_on_stop(tmp_path):
+    profiler = StageProfiler(str(tmp_path / "stats.jsonl"), interval=0.05, echo=False).start()
+    timer = profiler.timer("mine")
+    for _ in range(5):
+        timer.add(0.001, items=100)
+        time.sleep(0.03)
+    profiler.stop()
+    lines = [json.loads(line) for line in (tmp_path / "stats.jsonl").read_text().splitlines()]
+    assert len(lines) >= 2
+    assert sum(line["stages"]["mine"]["items"] for line in lines) == 500
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_stack_sampler_writes_collapsed_stacks_on_signal(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy worker")
+    worker.start()
+    sampler = StackSampler(str(tmp_path), hz=200)
+    try:
+        assert sampler.install(signal.SIGUSR1)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.time() + 5
+        while not sampler.stacks and time.time() < deadline:
+            time.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.time() + 5
+        while not sampler.dumps and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+    assert len(sampler.dumps) == 1
+    lines = open(sampler.dumps[0]).read().splitlines()
+    # `thread;outer;...;inner count`, root first, as flamegraph.pl expects
+    busy = [line for line in lines if line.startswith("busy_worker;")]
+    assert busy and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_loop (test_stage_profiler.py:" in line for line in busy)
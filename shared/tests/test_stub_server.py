@@ -0,0 +1,22 @@
+import yaml
+
+from shared.llm.client import LLMClient
+from shared.llm.stub_server import StubLLMServer
+
+def test_stub_answers_by_marker_and_counts_usage(tmp_path):
+    stub = StubLLMServer([("### Intent", "sql"), ("### Echo", lambda prompt: prompt.upper())],
+                         latency=0.0, jitter=0.01, seed=1).start()
+    try:
+        config = tmp_path / "llm_config.yaml"
+        config.write_text(yaml.safe_dump(stub.config()))
+        client = LLMClient(config_path=str(config))
+        with client.track_usage() as usage:
+            assert client.generate("query\n### Intent") == "sql"
+            assert client.generate("### Echo") == "### ECHO"
+            assert client.generate("anything else") == "OK"
+        assert usage["calls"] == 3 and usage["prompt_tokens"] > 0
+        assert stub.calls == {"### Intent": 1, "### Echo": 1, "default": 1}
+        # Jitter is a function of the prompt, not of timing or call order
+        assert stub.delay("a") == stub.delay("a") <= 0.01
+    finally:
+        stub.stop()
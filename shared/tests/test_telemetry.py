@@ -0,0 +1,42 @@
+from shared.utils.telemetry import NOOP_SPAN, MetricsRegistry, Tracer, traced, configure, metrics, tracer
+
+def test_spans_render_as_prometheus_histograms():
+    registry = MetricsRegistry()
+    spans = Tracer(registry)
+    for _ in range(3):
+        with spans.span("node.generate_sql", model="stub") as span:
+            span.set("rows", 1)
+    try:
+        with spans.span("llm.generate"):
+            raise TimeoutError
+    except TimeoutError:
+        pass
+    registry.counter("logpilot_llm_tokens_total", "Tokens.", ("provider", "kind")).inc("stub", 'say "hi"', amount=12)
+    registry.callback("logpilot_cache_hit_ratio", "Hit ratio.", "gauge", ("cache",), lambda: {("sql_validator",): 0.75})
+
+    text = registry.render()
+    assert "# TYPE logpilot_span_duration_seconds histogram" in text
+    assert 'logpilot_span_duration_seconds_bucket{span="node.generate_sql",le="+Inf"} 3' in text
+    assert 'logpilot_span_duration_seconds_count{span="node.generate_sql"} 3' in text
+    assert 'logpilot_span_errors_total{span="llm.generate"} 1' in text
+    assert 'logpilot_llm_tokens_total{provider="stub",kind="say \\"hi\\""} 12' in text
+    assert 'logpilot_cache_hit_ratio{cache="sql_validator"} 0.75' in text
+    # Buckets are cumulative
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+               if line.startswith('logpilot_span_duration_seconds_bucket{span="llm.generate"')]
+    assert buckets == sorted(buckets) and buckets[-1] == 1
+
+def test_disabled_telemetry_records_nothing():
+    @traced("node.noop")
+    def node(state):
+        return state + 1
+
+    configure(False)
+    try:
+        assert tracer.span("anything") is NOOP_SPAN
+        assert node(1) == 2
+        assert 'span="node.noop"' not in metrics.render()
+    finally:
+        configure(True)
+    node(1)
+    assert 'logpilot_span_duration_seconds_count{span="node.noop"} 1' in metrics.render()
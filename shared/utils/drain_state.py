@@ -0,0 +1,198 @@
+import base64
+import json
+import os
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import jsonpickle
+from drain3.drain import Drain, LogCluster
+
+try:
+    import fcntl
+except ImportError: # Windows: no advisory locks, every process is a writer
+    fcntl = None
+
+class DrainStateStore:
+    """
+    Crash-safe persistence for a Drain3 tree.
+
+    - Snapshot (`<path>`): the full tree in Drain3's own format (jsonpickle,
+      optionally zlib+base64), so a plain `drain3.FilePersistence` can still
+      read it. It is written to a temp file, fsynced and renamed into place.
+    - Journal (`<path>.journal`): one JSON line per created or changed
+      cluster since the snapshot. Appending costs O(1) per change, and the
+      snapshot is rewritten only after `compact_ratio` x clusters changes,
+      so the amortized cost per change stays constant.
+    - Lease (`<path>.lock`): an exclusive flock. Only the holder writes; any
+      other process loads the state and mines in memory (read-only).
+
+    Journal entries carry the cluster size, which only grows. A stale entry
+    (older than the snapshot, e.g. after a crash mid-compaction) has a size
+    no larger than the snapshot's, so replay skips it. This makes replay
+    idempotent without versioning the two files together.
+    """
+
+    def __init__(self, path: str, compress: bool = True, compact_ratio: float = 0.5,
+                 min_compact_entries: int = 1000, sync_interval: float = 5.0):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.lock_path = f"{path}.lock"
+        self.compress = compress
+        self.compact_ratio = compact_ratio
+        self.min_compact_entries = min_compact_entries
+        self.sync_interval = sync_interval
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock_file = None
+        self._journal = None
+        self.journal_entries = 0
+        self.snapshots = 0
+        self._last_sync = time.monotonic()
+        self.read_only = not self._acquire_lease()
+
+    def _acquire_lease(self) -> bool:
+        if fcntl is None:
+            return True
+        self._lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            print(f"⚠️ Drain3 state at {self.path} is owned by another process; mining without persisting.")
+            return False
+        self._lock_file.seek(0)
+        self._lock_file.truncate()
+        self._lock_file.write(f"{os.getpid()}\n")
+        self._lock_file.flush()
+        return True
+
+    # Loading
+
+    def load(self, drain: Drain):
+        """Restores the snapshot, then replays the journal on top of it."""
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            try:
+                self._load_snapshot(drain)
+            except Exception as e:
+                # Older releases pickled a bare cluster list here, which Drain3 cannot read
+                print(f"⚠️ Ignoring unreadable Drain3 snapshot {self.path}: {e}")
+        replayed = self._replay_journal(drain)
+        if replayed:
+            print(f"♻️  Replayed {replayed} Drain3 journal entries")
+
+    def _load_snapshot(self, drain: Drain):
+        with open(self.path, "rb") as f:
+            state = f.read()
+        if self.compress:
+            state = zlib.decompress(base64.b64decode(state))
+        loaded: Drain = jsonpickle.loads(state, keys=True)
+        drain.id_to_cluster = loaded.id_to_cluster
+        drain.clusters_counter = loaded.clusters_counter
+        drain.root_node = loaded.root_node
+
+    def _replay_journal(self, drain: Drain) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+        applied = 0
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break # Torn tail from a crash mid-append
+                self.journal_entries += 1
+                if self._apply(drain, entry):
+                    applied += 1
+        return applied
+
+    @staticmethod
+    def _apply(drain: Drain, entry: Dict[str, Any]) -> bool:
+        cluster_id, size = entry["id"], entry["size"]
+        cluster = drain.id_to_cluster.get(cluster_id)
+        if entry["op"] == "created":
+            if cluster is not None:
+                return False
+            cluster = LogCluster(entry["tokens"], cluster_id)
+            cluster.size = size
+            drain.id_to_cluster[cluster_id] = cluster
+            # Creation tokens decide the tree path, exactly as when it was mined
+            drain.add_seq_to_prefix_tree(drain.root_node, cluster)
+            drain.clusters_counter = max(drain.clusters_counter, cluster_id)
+            return True
+        if cluster is None or size <= cluster.size:
+            return False
+        cluster.log_template_tokens = tuple(entry["tokens"])
+        cluster.size = size
+        return True
+
+    # Writing
+
+    def record(self, drain: Drain, change_type: str, cluster: LogCluster):
+        """Journals a created/changed cluster; compacts once the journal is large enough."""
+        if self.read_only or change_type == "none":
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        op = "created" if change_type == "cluster_created" else "changed"
+        self._journal.write(json.dumps({
+            "op": op,
+            "id": cluster.cluster_id,
+            "size": cluster.size,
+            # For a new cluster these are its creation tokens, which fix its tree path
+            "tokens": list(cluster.log_template_tokens),
+        }) + "\n")
+        self._journal.flush() # Survives a process crash; fsync happens in sync()
+        self.journal_entries += 1
+
+        if self.journal_entries >= max(self.min_compact_entries, self.compact_ratio * len(drain.id_to_cluster)):
+            self.snapshot(drain)
+        elif time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._journal is not None:
+            os.fsync(self._journal.fileno())
+        self._last_sync = time.monotonic()
+
+    def snapshot(self, drain: Drain):
+        """Writes a full snapshot atomically and starts an empty journal."""
+        if self.read_only:
+            return
+        state = jsonpickle.dumps(drain, keys=True).encode("utf-8")
+        if self.compress:
+            state = base64.b64encode(zlib.compress(state))
+        self._atomic_write(self.path, state)
+
+        # Entries before the snapshot are now redundant
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._atomic_write(self.journal_path, b"")
+        self.journal_entries = 0
+        self.snapshots += 1
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        tmp = f"{path}.tmp.{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def close(self, drain: Optional[Drain] = None):
+        if not self.read_only:
+            if drain is not None and self.journal_entries:
+                self.snapshot(drain)
+            elif self._journal is not None:
+                self.sync()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
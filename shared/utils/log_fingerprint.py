@@ -0,0 +1,62 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Values whose inner shape varies from line to line, masked as a whole first
+VALUE_MASKS = [
+    (re.compile(r'"[^"]*"'), '""'),
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "u"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "9"),
+]
+# Character classes: digit runs, and identifier-like words (`auth`, `billing-api`, `db.pool_1`)
+SHAPE_TOKEN = re.compile(r"\d+|[A-Za-z_][\w.-]*")
+
+def _shape(token: str) -> str:
+    return SHAPE_TOKEN.sub(lambda m: "9" if m.group()[0].isdigit() else "a", token)
+
+def line_shape(line: str, tokens: Optional[int] = None) -> List[str]:
+    """Token shapes of a line (all of them, or the first `tokens`); punctuation is kept as is."""
+    for pattern, mask in VALUE_MASKS:
+        line = pattern.sub(mask, line)
+    head = line.split(None, tokens)[:tokens] if tokens else line.split()
+    return [_shape(token) for token in head]
+
+def fingerprint(line: str, tokens: int = 4) -> str:
+    """
+    Shape of a line's leading tokens, e.g. `[9/9/9 9:9:9] <a> (a):` for
+    `[2025/11/20 10:00:01] <WARN> (billing-api): ...`. Lines of one format
+    share it; the free-text message after the header does not take part.
+    """
+    return " ".join(line_shape(line, tokens))
+
+def group_by_fingerprint(lines: Iterable[str], tokens: int = 4) -> Dict[str, List[str]]:
+    """Distinct lines grouped by fingerprint, in order of first appearance."""
+    groups: Dict[str, Dict[str, None]] = {}
+    for line in lines:
+        line = line.strip()
+        if line:
+            groups.setdefault(fingerprint(line, tokens), {})[line] = None
+    return {fp: list(group) for fp, group in groups.items()}
+
+def diverse_sample(lines: List[str], size: int = 5) -> List[str]:
+    """
+    Up to `size` lines that cover a group's variations: the longest line (it
+    carries the most optional fields), then one line per full-line shape,
+    most common shapes first, round-robin until `size` is reached.
+    """
+    if len(lines) <= size:
+        return list(lines)
+    by_shape: Dict[str, List[str]] = {}
+    for line in lines:
+        by_shape.setdefault(" ".join(line_shape(line)), []).append(line)
+    longest = max(lines, key=len)
+    picked = [longest]
+    queues = sorted(by_shape.values(), key=len, reverse=True)
+    depth = 0
+    while len(picked) < size and depth < len(queues[0]):
+        for queue in queues:
+            if depth < len(queue) and queue[depth] != longest:
+                picked.append(queue[depth])
+                if len(picked) == size:
+                    break
+        depth += 1
+    return picked
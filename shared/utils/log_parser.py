@@ -3,9 +3,24 @@ import json
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 
+from shared.utils.parser_registry import ParserRegistry
+
+# Tried in order on timestamps captured by learned patterns (None = ISO 8601)
+LEARNED_TIMESTAMP_FORMATS = [
+    None,
+    "%Y/%m/%d %H:%M:%S",
+    "%d/%b/%Y:%H:%M:%S %z",
+    "%d/%m/%Y %H:%M:%S",
+    "%b %d %H:%M:%S",
+    "%a %b %d %H:%M:%S %Y",
+    "epoch",
+]
+
 class LogParser:
     """
     Robust log parser supporting multiple formats (JSON, Syslog, Nginx, Standard).
+    With a `ParserRegistry`, patterns learned by schema discovery are tried
+    before the fallback, and unparsed lines are reported to it.
     Enforces UTC timestamps.
     """
     
@@ -39,6 +54,10 @@ class LogParser:
         re.DOTALL
     )
 
+    def __init__(self, registry: Optional[ParserRegistry] = None):
+        self.registry = registry
+        self._timestamp_formats: Dict[str, Optional[str]] = {} # Per learned pattern, once one works
+
     def parse(self, raw_log: str) -> Dict[str, Any]:
         """
         Parses a raw log string into structured components.
@@ -68,7 +87,14 @@ class LogParser:
         if match:
             return self._normalize(match.groupdict(), "nginx")
 
-        # Strategy 3: Fallback
+        # Strategy 3: Patterns learned by schema discovery
+        if self.registry:
+            learned = self.registry.match(raw_log)
+            if learned:
+                return self._normalize_learned(*learned, raw_log)
+            self.registry.observe(raw_log) # Discovery runs at most once per line shape
+
+        # Strategy 4: Fallback
         return {
             "timestamp": datetime.now(timezone.utc),
             "severity": "UNKNOWN",
@@ -82,9 +108,10 @@ class LogParser:
         # Map common JSON fields to our schema
         return {
             "timestamp": self._parse_timestamp(data.get("timestamp") or data.get("time") or data.get("date")),
-            "severity": data.get("severity") or data.get("level") or "INFO",
-            "service_name": data.get("service") or data.get("app") or "unknown",
-            "body": data.get("message") or data.get("msg") or raw_log,
+            # Sources may use numeric levels or structured messages; the schema wants strings
+            "severity": str(data.get("severity") or data.get("level") or "INFO"),
+            "service_name": str(data.get("service") or data.get("app") or "unknown"),
+            "body": str(data.get("message") or data.get("msg") or raw_log),
             "context": data # Keep full JSON as context
         }
 
@@ -130,6 +157,43 @@ class LogParser:
             
         return {}
 
+    def _normalize_learned(self, fp: str, match: re.Match, raw_log: str) -> Dict[str, Any]:
+        """Maps a learned pattern's named groups; groups beyond the schema go to context."""
+        data = {key: value for key, value in match.groupdict().items() if value is not None}
+        parsed = {
+            "timestamp": self._parse_learned_timestamp(fp, data.pop("timestamp", None)),
+            "severity": data.pop("severity", None) or "INFO",
+            "service_name": data.pop("service", None) or "unknown",
+            "body": data.pop("message", None) or raw_log,
+        }
+        if data:
+            parsed["context"] = data
+        return parsed
+
+    def _parse_learned_timestamp(self, fp: str, ts_str: Optional[str]) -> datetime:
+        """Tries the format that worked last for this pattern, then the known ones."""
+        if not ts_str:
+            return datetime.now(timezone.utc)
+        formats = LEARNED_TIMESTAMP_FORMATS
+        if fp in self._timestamp_formats:
+            formats = [self._timestamp_formats[fp]] + formats
+        for fmt in formats:
+            try:
+                if fmt == "epoch":
+                    seconds = float(ts_str)
+                    dt = datetime.fromtimestamp(seconds / 1000 if seconds > 1e11 else seconds, timezone.utc)
+                elif fmt:
+                    dt = datetime.strptime(ts_str, fmt)
+                else:
+                    dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+            except (ValueError, OverflowError):
+                continue
+            if dt.year == 1900: # No year in the format, as in syslog
+                dt = dt.replace(year=datetime.now().year)
+            self._timestamp_formats[fp] = fmt
+            return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc)
+
     def _parse_timestamp(self, ts_str: Optional[str], fmt: Optional[str] = None) -> datetime:
         """Helper to parse and normalize timestamp to UTC."""
         if not ts_str:
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from shared.utils.log_fingerprint import diverse_sample, fingerprint
+
+class ParserRegistry:
+    """
+    Named-group regexes learned by schema discovery, keyed by the fingerprint
+    of the lines they were learned from.
+
+    - Entries persist in one JSON file (written to a temp file and renamed into
+      place) and are compiled once at load. `match` tries them in order of hits.
+    - Lines nothing could parse are collected per fingerprint. Once `min_samples`
+      distinct ones are seen, `discover` gets a diverse sample of `sample_size`
+      of them, plus the rest as held-out lines, on a background thread, so
+      parsing never waits for the LLM. Rarer shapes are sent with what they
+      have once collected for `max_age` seconds, and by `close()`.
+    - At most `max_fingerprints` shapes are collected at once; the least
+      recently seen one is evicted to make room.
+    - Failed discoveries are recorded too: each fingerprint reaches `discover`
+      at most once. Delete its entry to retry.
+    """
+
+    def __init__(self, path: str = "data/state/parser_registry.json",
+                 discover: Optional[Callable[[List[str], List[str]], Optional[str]]] = None,
+                 min_samples: int = 20, sample_size: int = 5, read_only: bool = False,
+                 resort_every: int = 1000, max_age: float = 300.0, max_fingerprints: int = 1000):
+        self.path = path
+        self.discover = None if read_only else discover
+        self.min_samples = min_samples
+        self.sample_size = sample_size
+        self.read_only = read_only
+        self.resort_every = resort_every
+        self.max_age = max_age
+        self.max_fingerprints = max_fingerprints
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits: Dict[str, int] = {}
+        self._patterns: Dict[str, re.Pattern] = {}
+        self._ordered: List[Tuple[str, re.Pattern]] = []
+        self._since_sort = 0
+        # Distinct lines per fingerprint, least recently seen first
+        self._samples: "OrderedDict[str, Dict[str, None]]" = OrderedDict()
+        self._first_seen: Dict[str, float] = {} # Oldest first
+        self._requested: set = set()
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="schema-discovery") if self.discover else None
+        self._stop = threading.Event()
+        self._sweeper = None
+        if self.discover:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="schema-discovery-sweep", daemon=True)
+            self._sweeper.start()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            self.entries = json.load(f).get("parsers", {})
+        for fp, entry in self.entries.items():
+            self.hits[fp] = entry.get("hits", 0)
+            pattern = self._compile(entry.get("regex"))
+            if pattern:
+                self._patterns[fp] = pattern
+        self._resort()
+        print(f"🧩 Loaded {len(self._patterns)} learned parsers from {self.path}")
+
+    def save(self):
+        if self.read_only or not self.entries:
+            return
+        with self._lock:
+            parsers = {fp: dict(entry, hits=self.hits.get(fp, 0)) for fp, entry in self.entries.items()}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"parsers": parsers}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _compile(regex: Optional[str], samples: Optional[List[str]] = None) -> Optional[re.Pattern]:
+        """Compiles a learned regex; it must capture named groups on every sample."""
+        if not regex:
+            return None
+        try:
+            pattern = re.compile(regex)
+        except re.error:
+            return None
+        for sample in samples or []:
+            match = pattern.match(sample)
+            if not match or not match.groupdict():
+                return None
+        return pattern
+
+    def _resort(self):
+        # Swapped in whole: readers iterate whichever list they started with
+        self._ordered = sorted(self._patterns.items(), key=lambda item: -self.hits.get(item[0], 0))
+        self._since_sort = 0
+
+    def match(self, line: str) -> Optional[Tuple[str, re.Match]]:
+        """First learned pattern matching `line`, most used first, as (fingerprint, match)."""
+        for fp, pattern in self._ordered:
+            match = pattern.match(line)
+            if match:
+                self.hits[fp] = self.hits.get(fp, 0) + 1
+                self._since_sort += 1
+                if self._since_sort >= self.resort_every:
+                    self._resort()
+                return fp, match
+        return None
+
+    def observe(self, line: str):
+        """Records a line nothing could parse; may start discovery for its fingerprint."""
+        if self.discover is None:
+            return
+        fp = fingerprint(line)
+        with self._lock:
+            if fp in self.entries or fp in self._requested:
+                return
+            samples = self._samples.get(fp)
+            if samples is None:
+                if len(self._samples) >= self.max_fingerprints:
+                    evicted, _ = self._samples.popitem(last=False)
+                    del self._first_seen[evicted]
+                samples = self._samples[fp] = {}
+                self._first_seen[fp] = time.monotonic()
+            else:
+                self._samples.move_to_end(fp)
+            samples[line] = None
+            if len(samples) >= self.min_samples:
+                self._request(fp)
+
+    def flush(self, older_than: Optional[float] = None):
+        """
+        Starts discovery for fingerprints seen fewer than `min_samples` times:
+        all of them, or those first seen at least `older_than` seconds ago.
+        """
+        with self._lock:
+            cutoff = None if older_than is None else time.monotonic() - older_than
+            for fp, first_seen in list(self._first_seen.items()):
+                if cutoff is not None and first_seen > cutoff:
+                    break
+                self._request(fp)
+
+    def _sweep_loop(self):
+        while not self._stop.wait(max(self.max_age / 4, 0.05)):
+            self.flush(older_than=self.max_age)
+
+    def _request(self, fp: str):
+        # Called with the lock held
+        self._requested.add(fp)
+        del self._first_seen[fp]
+        lines = list(self._samples.pop(fp))
+        samples = diverse_sample(lines, self.sample_size)
+        chosen = set(samples)
+        held_out = [line for line in lines if line not in chosen]
+        self._pending.append(self._pool.submit(self._learn, fp, samples, held_out))
+
+    def _learn(self, fp: str, samples: List[str], held_out: List[str]):
+        try:
+            regex = self.discover(samples, held_out)
+        except Exception as e:
+            print(f"⚠️ Schema discovery failed for '{fp}': {e}")
+            regex = None
+        self.add(fp, regex, samples)
+
+    def add(self, fp: str, regex: Optional[str], samples: List[str]) -> bool:
+        """Records the outcome of discovery for a fingerprint; a None or invalid regex marks it failed."""
+        pattern = self._compile(regex, samples)
+        with self._lock:
+            self.entries[fp] = {
+                "regex": regex if pattern else None,
+                "samples": samples[:3],
+                "learned_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            }
+            self.hits.setdefault(fp, 0)
+            if pattern:
+                self._patterns[fp] = pattern
+                self._resort()
+        self.save()
+        print(f"🧩 Learned parser for '{fp}'" if pattern else f"⚠️ No parser learned for '{fp}'")
+        return pattern is not None
+
+    def wait(self):
+        """Blocks until every requested discovery has finished."""
+        while self._pending:
+            self._pending.pop(0).result()
+
+    def close(self):
+        """Sends every shape still collecting to discovery, waits for it and saves."""
+        if self._sweeper:
+            self._stop.set()
+            self._sweeper.join()
+        if self.discover:
+            self.flush()
+        self.wait()
+        if self._pool:
+            self._pool.shutdown()
+        self.save()
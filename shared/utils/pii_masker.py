@@ -1,5 +1,12 @@
+import json
 import re
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError: # Only the Arrow/DuckDB entry points need it
+    pa = None
 
 class PIIMasker:
     """
@@ -15,8 +22,24 @@ class PIIMasker:
         "ssn": (r'\b\d{3}-\d{2}-\d{4}\b', '<SSN_REDACTED>'),
     }
 
-    def __init__(self):
-        self.regexes = {k: (re.compile(p), r) for k, (p, r) in self.PATTERNS.items()}
+    # RE2 (Arrow/DuckDB) patterns matching a superset of each rule's hits; rows
+    # matching none of them are passed through without running Python regexes.
+    # \p{Nd} covers the Unicode digits that Python's \d accepts.
+    PREFILTERS = {
+        "email": r'@',
+        "ipv4": r'[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}',
+        "credit_card": r'(?:\p{Nd}[ -]*){13}',
+        "ssn": r'\p{Nd}{3}-\p{Nd}{2}-\p{Nd}{4}',
+    }
+
+    def __init__(self, patterns: Optional[Dict[str, Any]] = None, prefilters: Optional[Dict[str, str]] = None):
+        patterns = self.PATTERNS if patterns is None else patterns
+        prefilters = self.PREFILTERS if prefilters is None else prefilters
+        self.regexes = {k: (re.compile(p), r) for k, (p, r) in patterns.items()}
+        # A rule without a prefilter makes every row a candidate
+        self.prefilter = None
+        if all(name in prefilters for name in patterns):
+            self.prefilter = "|".join(f"(?:{prefilters[name]})" for name in patterns)
 
     def mask_text(self, text: str) -> str:
         """Masks PII in a string."""
@@ -44,3 +67,45 @@ class PIIMasker:
             else:
                 masked_context[k] = v
         return masked_context
+
+    def mask_json(self, text: str) -> str:
+        """Masks string values inside a JSON document, leaving keys and numbers intact."""
+        if not text:
+            return text
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return json.dumps(self.mask_context(data))
+        return json.dumps(self.mask_text(data) if isinstance(data, str) else data)
+
+    def mask_arrow(self, array: Any, mask_fn=None) -> Any:
+        """
+        Vectorized mask_text over an Arrow string array (a DuckDB UDF batch).
+        The RE2 prefilter runs over the whole batch in Arrow; only candidate
+        rows are converted to Python and masked.
+        """
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        mask_fn = mask_fn or self.mask_text
+        if self.prefilter is None:
+            candidates = pc.is_valid(array)
+        else:
+            candidates = pc.fill_null(pc.match_substring_regex(array, self.prefilter), False)
+        if not pc.any(candidates).as_py():
+            return array
+        masked = [mask_fn(value) for value in array.filter(candidates).to_pylist()]
+        return pc.replace_with_mask(array, candidates, pa.array(masked, type=array.type))
+
+    def register(self, conn: Any, name: str = "mask_pii"):
+        """
+        Registers `name(VARCHAR)` (mask_text) and `name_json(VARCHAR)` (mask_json)
+        as vectorized Arrow UDFs on a DuckDB connection.
+        """
+        def batch_udf(fn):
+            return lambda array: self.mask_arrow(array, fn)
+
+        for udf, fn in [(name, self.mask_text), (f"{name}_json", self.mask_json)]:
+            try:
+                conn.remove_function(udf) # Re-registering, e.g. after a rule change
+            except Exception:
+                pass
+            conn.create_function(udf, batch_udf(fn), ["VARCHAR"], "VARCHAR", type="arrow", side_effects=False)
@@ -0,0 +1,272 @@
+import json
+import multiprocessing as mp
+import os
+import re
+import threading
+import uuid
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+
+from shared.utils.template_miner import LogTemplateMiner
+
+try:
+    import fcntl
+except ImportError: # Windows: single-process allocation only
+    fcntl = None
+
+DEFAULT_SHARD = "_default"
+
+def shard_key(service_name: Optional[str]) -> str:
+    """Maps a service name to a file-safe shard key."""
+    if not service_name:
+        return DEFAULT_SHARD
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", service_name)
+
+def tree_stats(miner: LogTemplateMiner) -> Dict[str, int]:
+    """Size of a Drain tree: clusters, prefix-tree nodes and the longest leaf list searched per match."""
+    nodes, max_leaf, stack = 0, 0, [miner.miner.drain.root_node]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        max_leaf = max(max_leaf, len(node.cluster_ids))
+        stack.extend(node.key_to_child_node.values())
+    return {"clusters": miner.get_total_clusters(), "nodes": nodes, "max_leaf": max_leaf}
+
+class TemplateIdAllocator:
+    """
+    Hands out template IDs that are unique across shards and processes.
+
+    Each (shard, cluster key) pair gets a global integer the first time it
+    is seen. The key is the persisted Drain cluster id, or a process-unique
+    string for clusters a read-only process created (see _ShardSet.mine). Allocations are appended to a JSONL file under an exclusive
+    flock, after catching up on lines other processes appended, so writing
+    costs O(1) per new template.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._ids: Dict[Tuple[str, Union[int, str]], int] = {}
+        self._next = 1
+        self._read_pos = 0
+        self._lock = threading.Lock()
+        with open(self.path, "a+") as f:
+            self._catch_up(f)
+
+    def _catch_up(self, f):
+        f.seek(self._read_pos)
+        while True:
+            line = f.readline()
+            if not line.endswith("\n"):
+                break # Nothing more, or a torn tail a crashed writer never finished
+            self._read_pos = f.tell()
+            entry = json.loads(line)
+            self._ids[(entry["shard"], entry["local"])] = entry["id"]
+            self._next = max(self._next, entry["id"] + 1)
+
+    def get(self, shard: str, local_id: Union[int, str]) -> int:
+        key = (shard, local_id)
+        known = self._ids.get(key)
+        if known is not None:
+            return known
+        with self._lock, open(self.path, "a+") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                self._catch_up(f)
+                if key not in self._ids:
+                    global_id = self._next
+                    f.seek(0, os.SEEK_END)
+                    f.write(json.dumps({"shard": shard, "local": local_id, "id": global_id}) + "\n")
+                    f.flush()
+                    self._read_pos = f.tell()
+                    self._ids[key] = global_id
+                    self._next = global_id + 1
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return self._ids[key]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+class _ShardSet:
+    """The Drain trees one process owns, created lazily per shard."""
+    def __init__(self, state_dir: str, sim_th: float):
+        self.state_dir = state_dir
+        self.sim_th = sim_th
+        self.miners: Dict[str, LogTemplateMiner] = {}
+        # Highest cluster id loaded from disk, per read-only shard
+        self.loaded: Dict[str, int] = {}
+        self.token = uuid.uuid4().hex[:12]
+
+    def miner(self, shard: str) -> LogTemplateMiner:
+        miner = self.miners.get(shard)
+        if miner is None:
+            path = os.path.join(self.state_dir, "shards", f"{shard}.bin")
+            miner = self.miners[shard] = LogTemplateMiner(persistence_file=path, sim_th=self.sim_th)
+            if miner.state.read_only:
+                self.loaded[shard] = max(miner.miner.drain.id_to_cluster, default=0)
+        return miner
+
+    def mine(self, shard: str, message: str) -> Tuple[Union[int, str], str]:
+        """
+        Returns (cluster key, template). A read-only tree numbers its new
+        clusters independently of the owner, which persists its own under the
+        same ids; those are keyed by this process instead, so they never
+        share a global id with the owner's.
+        """
+        local_id, template = self.miner(shard).mine_template_with_id(message)
+        local_id = int(local_id)
+        if shard in self.loaded and local_id > self.loaded[shard]:
+            return f"{self.token}:{local_id}", template
+        return local_id, template
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {shard: tree_stats(miner) for shard, miner in self.miners.items()}
+
+    def save(self):
+        for miner in self.miners.values():
+            miner.save_state()
+
+    def close(self):
+        for miner in self.miners.values():
+            miner.close()
+
+def _shard_worker(state_dir: str, sim_th: float, inbox, outbox):
+    """Worker process loop: mines sub-batches for the shards routed to it."""
+    shards = _ShardSet(state_dir, sim_th)
+    while True:
+        msg = inbox.get()
+        if msg is None:
+            shards.close()
+            outbox.put(None)
+            return
+        if msg == "save":
+            shards.save()
+            outbox.put("saved")
+            continue
+        if msg == "stats":
+            outbox.put(shards.stats())
+            continue
+        outbox.put([shards.mine(shard, message) for shard, message in msg])
+
+class ShardedTemplateMiner:
+    """
+    Template mining with one Drain tree per service.
+
+    Services no longer share a tree, so unrelated services cannot merge into
+    each other's clusters, and each tree (and its leaf lists) stays small.
+    Cluster ids are local to a shard; TemplateIdAllocator maps them to
+    global template ids. A process that opens shards another process owns
+    (e.g. the bulk loader next to the ingestion worker) shares the owner's
+    ids for clusters on disk and gets fresh ones for clusters it creates.
+
+    - processes=0: all shards live in this process (`mine_template_with_id`).
+    - processes=N: shards are spread over N worker processes by a stable hash
+      of the service. `mine_batch` mines a batch across all of them in parallel.
+
+    State lives under `state_dir`: `shards/<service>.bin` (+ journal, per
+    DrainStateStore) and `template_ids.jsonl` for the global id map.
+    """
+    def __init__(self, state_dir: str = "data/state/drain3_shards", sim_th: float = 0.5,
+                 processes: int = 0):
+        self.state_dir = state_dir
+        self.sim_th = sim_th
+        self.processes = processes
+        os.makedirs(os.path.join(state_dir, "shards"), exist_ok=True)
+        self.ids = TemplateIdAllocator(os.path.join(state_dir, "template_ids.jsonl"))
+        self._local: Optional[_ShardSet] = None
+        self._workers = []
+        self._lock = threading.Lock()
+
+        if processes > 0:
+            # spawn: forking a process that already runs pipeline threads is unsafe
+            ctx = mp.get_context("spawn")
+            for _ in range(processes):
+                inbox, outbox = ctx.Queue(), ctx.Queue()
+                proc = ctx.Process(target=_shard_worker, args=(state_dir, sim_th, inbox, outbox), daemon=True)
+                proc.start()
+                self._workers.append((proc, inbox, outbox))
+        else:
+            self._local = _ShardSet(state_dir, sim_th)
+
+    def _worker_index(self, shard: str) -> int:
+        return zlib.crc32(shard.encode("utf-8")) % len(self._workers)
+
+    def mine_template_with_id(self, log_message: str, service_name: Optional[str] = None) -> Tuple[str, str]:
+        """Mines one message in its service's tree. Returns (global template id, template)."""
+        return self.mine_batch([(service_name, log_message)])[0]
+
+    def mine_template(self, log_message: str, service_name: Optional[str] = None) -> str:
+        return self.mine_template_with_id(log_message, service_name)[1]
+
+    def mine_batch(self, items: List[Tuple[Optional[str], str]]) -> List[Tuple[str, str]]:
+        """Mines (service_name, message) pairs, in order. Uses all workers at once."""
+        keyed = [(shard_key(service), message) for service, message in items]
+        with self._lock:
+            if self._local is not None:
+                mined = [self._local.mine(shard, message) for shard, message in keyed]
+            else:
+                mined = self._mine_remote(keyed)
+            return [
+                (str(self.ids.get(shard, local_id)), template)
+                for (shard, _), (local_id, template) in zip(keyed, mined)
+            ]
+
+    def _mine_remote(self, keyed: List[Tuple[str, str]]) -> List[Tuple[Union[int, str], str]]:
+        # Order within a shard is preserved, so each tree sees the same sequence as in-process
+        positions: List[List[int]] = [[] for _ in self._workers]
+        parts: List[List[Tuple[str, str]]] = [[] for _ in self._workers]
+        for i, (shard, message) in enumerate(keyed):
+            w = self._worker_index(shard)
+            positions[w].append(i)
+            parts[w].append((shard, message))
+
+        for (_, inbox, _), part in zip(self._workers, parts):
+            if part:
+                inbox.put(part)
+        mined: List[Optional[Tuple[Union[int, str], str]]] = [None] * len(keyed)
+        for (_, _, outbox), part, pos in zip(self._workers, parts, positions):
+            if part:
+                for i, result in zip(pos, outbox.get()):
+                    mined[i] = result
+        return mined
+
+    def get_total_clusters(self) -> int:
+        # Every cluster that produced a template has a global id
+        return len(self.ids)
+
+    def tree_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-shard tree sizes (see `tree_stats`), from every process."""
+        with self._lock:
+            if self._local is not None:
+                return self._local.stats()
+            stats = {}
+            for _, inbox, _ in self._workers:
+                inbox.put("stats")
+            for _, _, outbox in self._workers:
+                stats.update(outbox.get())
+            return stats
+
+    def save_state(self):
+        """Snapshots every shard, wherever it lives."""
+        with self._lock:
+            if self._local is not None:
+                self._local.save()
+                return
+            for _, inbox, _ in self._workers:
+                inbox.put("save")
+            for _, _, outbox in self._workers:
+                outbox.get()
+
+    def close(self):
+        with self._lock:
+            if self._local is not None:
+                self._local.close()
+                return
+            for _, inbox, _ in self._workers:
+                inbox.put(None)
+            for proc, _, outbox in self._workers:
+                outbox.get()
+                proc.join(10)
+            self._workers = []
@@ -0,0 +1,224 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+class StageTimer:
+    """
+    Cumulative items, batches and busy seconds of one pipeline stage.
+    Each stage is updated by a single thread, so updates take no lock;
+    the reporter only reads the totals and diffs them per interval.
+    """
+    __slots__ = ("name", "items", "batches", "seconds")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    def add(self, seconds: float, items: int = 1):
+        self.items += items
+        self.batches += 1
+        self.seconds += seconds
+
+class _Timing:
+    __slots__ = ("timer", "items", "started")
+
+    def __init__(self, timer: StageTimer, items: int):
+        self.timer, self.items = timer, items
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(time.perf_counter() - self.started, self.items)
+        return False
+
+class StageProfiler:
+    """
+    Per-stage counters and timers for the ingestion hot path.
+
+    Stages record one `add` per batch (or per item on a stage thread), and
+    a background thread summarizes every `interval` seconds: items, busy
+    seconds and items per busy second per stage, plus the lines per wall
+    second through the `throughput` stages (the ones that finish a line,
+    summed). Summaries are appended as JSON lines to `stats_path` and, with
+    `echo`, printed as a one-line progress report.
+    """
+
+    def __init__(self, stats_path: Optional[str] = None, interval: float = 10.0, echo: bool = True,
+                 throughput: Sequence[str] = ("insert",)):
+        self.stats_path = stats_path
+        self.interval = interval
+        self.echo = echo
+        self.throughput = tuple(throughput)
+        self.timers: Dict[str, StageTimer] = {} # Insertion order is pipeline order
+        self._last: Dict[str, tuple] = {}
+        self._last_time = time.perf_counter()
+        self._lock = threading.Lock() # Serializes reports, not updates
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def timer(self, name: str) -> StageTimer:
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = StageTimer(name)
+        return timer
+
+    def time(self, name: str, items: int = 1) -> _Timing:
+        """`with profiler.time("mine", len(batch)):` adds the block's duration to a stage."""
+        return _Timing(self.timer(name), items)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        return {name: {"items": t.items, "batches": t.batches, "busy_sec": round(t.seconds, 3)}
+                for name, t in list(self.timers.items())}
+
+    def report(self) -> Optional[dict]:
+        """Summarizes the interval since the last report; None if nothing ran in it."""
+        with self._lock:
+            now = time.perf_counter()
+            elapsed = now - self._last_time
+            stages = {}
+            for name, t in list(self.timers.items()):
+                items, batches, seconds = t.items, t.batches, t.seconds
+                prev = self._last.get(name, (0, 0, 0.0))
+                self._last[name] = (items, batches, seconds)
+                delta = (items - prev[0], batches - prev[1], seconds - prev[2])
+                stages[name] = {"items": delta[0], "batches": delta[1], "busy_sec": round(delta[2], 4),
+                                "items_per_busy_sec": round(delta[0] / delta[2], 1) if delta[2] > 0 else 0.0}
+            lines = sum(stages[name]["items"] for name in self.throughput if name in stages)
+            self._last_time = now
+            if not any(stage["batches"] for stage in stages.values()):
+                return None
+            summary = {
+                "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "pid": os.getpid(),
+                "interval_sec": round(elapsed, 3),
+                "lines_per_sec": round(lines / elapsed, 1) if elapsed > 0 else 0.0,
+                "stages": stages,
+            }
+            if self.stats_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.stats_path)), exist_ok=True)
+                with open(self.stats_path, "a") as f:
+                    f.write(json.dumps(summary) + "\n")
+            if self.echo:
+                shares = " ".join(f"{name} {stage['busy_sec'] / elapsed:.0%}" for name, stage in stages.items())
+                print(f"⏱️  {lines:,} lines in {elapsed:.1f}s ({summary['lines_per_sec']:,.0f}/s) | busy: {shares}")
+            return summary
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self) -> "StageProfiler":
+        if self._thread is None:
+            self._stop.clear()
+            self._last_time = time.perf_counter()
+            self._thread = threading.Thread(target=self._loop, name="stage-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> Optional[dict]:
+        """Stops the reporter and writes the final, partial interval."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.report()
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    On-demand sampling profiler: while active, a thread snapshots every
+    other thread's stack `hz` times a second. Stopping writes the counts in
+    the collapsed format (`thread;outer;...;inner count`) that flamegraph.pl,
+    speedscope and inferno read, to `directory/stacks-<pid>-<time>.folded`.
+
+    `install` toggles it with a signal (SIGUSR1 by default):
+    `kill -USR1 <pid>` starts sampling, a second signal (or `max_seconds`)
+    stops and dumps. Worker processes are not sampled.
+    """
+
+    def __init__(self, directory: str = "data/state/profiles", hz: float = 100.0, max_seconds: float = 60.0):
+        self.directory = directory
+        self.hz = hz
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.dumps: List[str] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)).replace(";", ":").replace(" ", "_"))
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def _loop(self):
+        deadline = time.monotonic() + self.max_seconds
+        period = 1.0 / self.hz
+        while not self._stop.wait(period) and time.monotonic() < deadline:
+            self.sample()
+        self.dump()
+
+    def dump(self) -> Optional[str]:
+        if not self.stacks:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"stacks-{os.getpid()}-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        stacks, self.stacks = self.stacks, Counter()
+        with open(path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+        self.dumps.append(path)
+        print(f"🔥 Wrote {sum(stacks.values())} stack samples to {path}")
+        return path
+
+    def start(self) -> "StackSampler":
+        if not self.active:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+            self._thread.start()
+            print(f"🔥 Sampling stacks at {self.hz:.0f} Hz (up to {self.max_seconds:.0f}s)")
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def toggle(self, *_):
+        if self.active:
+            self._stop.set() # The sampler thread dumps on its way out; never join in a handler
+        else:
+            self.start()
+
+    def install(self, signum: Optional[int] = None) -> bool:
+        """Toggles sampling on `signum`; False where signals are unavailable (Windows, non-main thread)."""
+        signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, self.toggle)
+        return True
@@ -0,0 +1,239 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError: # Spans are still timed into the metrics below
+    otel_trace = None
+
+# Seconds; from a DuckDB point lookup up to a slow LLM answer
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: Tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """A monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.registry, self.name, self.help, self.labels = registry, name, help, labels
+        self.values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self.values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set, as Prometheus expects."""
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.registry, self.name, self.help, self.labels = registry, name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[Tuple, List] = {} # label values -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        if not self.registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(label_values)
+            if series is None:
+                series = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        for label_values, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+class Callback:
+    """A metric read from its owner at scrape time (e.g. a cache's own hit counters)."""
+
+    def __init__(self, name: str, help: str, kind: str, labels: Tuple[str, ...], fn: Callable[[], Dict[Tuple, float]]):
+        self.name, self.help, self.kind, self.labels, self.fn = name, help, kind, labels, fn
+
+    def samples(self) -> Iterable[str]:
+        for label_values, value in sorted(self.fn().items()):
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format by `render`.
+    When disabled, updates return after a single attribute check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get(name, lambda: Counter(self, name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(name, lambda: Histogram(self, name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, kind: str, labels: Tuple[str, ...],
+                 fn: Callable[[], Dict[Tuple, float]]) -> Callback:
+        """Registers (or replaces) a metric computed by `fn` on every scrape."""
+        with self._lock:
+            self._metrics[name] = Callback(name, help, kind, labels, fn)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Drops recorded values (tests); registered callbacks stay."""
+        with self._lock:
+            for metric in self._metrics.values():
+                if not isinstance(metric, Callback):
+                    metric.values.clear()
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def fail(self, error: BaseException):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Span:
+    """One timed operation; nested through OpenTelemetry's context when it is installed."""
+    __slots__ = ("tracer", "name", "attributes", "started", "failed", "_otel", "_otel_span")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self.tracer, self.name, self.attributes = tracer, name, attributes
+        self.failed = False
+        self._otel = None
+
+    def __enter__(self):
+        if self.tracer.otel is not None:
+            self._otel = self.tracer.otel.start_as_current_span(self.name, attributes=self.attributes)
+            self._otel_span = self._otel.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        if exc is not None:
+            self.failed = True
+        self.tracer.durations.observe(elapsed, self.name)
+        if self.failed:
+            self.tracer.errors.inc(self.name)
+        if self._otel is not None:
+            self._otel.__exit__(exc_type, exc, tb)
+        return False
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel_span.set_attribute(key, value)
+
+    def fail(self, error: BaseException):
+        """Marks a handled error (the caller returns a fallback instead of raising)."""
+        self.failed = True
+        if self._otel is not None:
+            self._otel_span.record_exception(error)
+
+class Tracer:
+    """
+    Times spans (graph nodes, LLM calls, SQL, KB queries) into the
+    `logpilot_span_duration_seconds` histogram. Spans also go through the
+    OpenTelemetry API when it is installed, so a configured SDK exports them.
+    Disabled, `span` returns a shared no-op.
+    """
+
+    def __init__(self, metrics: MetricsRegistry):
+        self.metrics = metrics
+        self.otel = otel_trace.get_tracer("logpilot") if otel_trace else None
+        self.durations = metrics.histogram("logpilot_span_duration_seconds", "Duration of traced operations.", ("span",))
+        self.errors = metrics.counter("logpilot_span_errors_total", "Traced operations that failed.", ("span",))
+
+    @property
+    def enabled(self) -> bool:
+        return self.metrics.enabled
+
+    def span(self, name: str, **attributes):
+        if not self.metrics.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+def _env_enabled() -> bool:
+    return os.getenv("LOGPILOT_TELEMETRY", "1").lower() not in ("0", "false", "off", "no")
+
+metrics = MetricsRegistry(enabled=_env_enabled())
+tracer = Tracer(metrics)
+
+def configure(enabled: bool):
+    """Turns spans and metric updates on or off for the whole process."""
+    metrics.enabled = enabled
+
+def traced(name: Optional[str] = None):
+    """Decorator: runs the function inside a span (default name: the function's)."""
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+            with Span(tracer, span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -1,12 +1,19 @@
 import os
+import threading
+from typing import Tuple
 from drain3 import TemplateMiner
 from drain3.template_miner_config import TemplateMinerConfig
-from drain3.file_persistence import FilePersistence
+
+from shared.utils.drain_state import DrainStateStore
 
 class LogTemplateMiner:
     """
     Wrapper around Drain3 for log template mining.
     Extracts constant templates from variable log messages.
+
+    State is persisted by DrainStateStore (snapshot + change journal) rather
+    than Drain3's handler, which rewrites the whole tree on every new cluster.
+    Only one process may persist a given state file; others mine read-only.
     """
     def __init__(self, persistence_file: str = "data/state/drain3_state.bin", sim_th: float = 0.5):
         self.config = TemplateMinerConfig()
@@ -16,24 +23,45 @@ class LogTemplateMiner:
 
         # Ensure data directory exists
         os.makedirs(os.path.dirname(persistence_file), exist_ok=True)
-        
-        self.persistence = FilePersistence(persistence_file)
-        self.miner = TemplateMiner(self.persistence, self.config)
+
+        self.miner = TemplateMiner(None, self.config)
+        self.state = DrainStateStore(persistence_file, compress=self.config.snapshot_compress_state,
+                                     sync_interval=self.config.snapshot_interval_minutes * 60)
+        self.state.load(self.miner.drain)
+        self._lock = threading.Lock()
+
+    def _mine(self, log_message: str) -> dict:
+        with self._lock:
+            result = self.miner.add_log_message(log_message)
+            if result["change_type"] != "none":
+                cluster = self.miner.drain.id_to_cluster.get(result["cluster_id"])
+                self.state.record(self.miner.drain, result["change_type"], cluster)
+            return result
 
     def mine_template(self, log_message: str) -> str:
         """
         Processes a log message and returns its template.
         This updates the internal Drain tree structure.
         """
-        result = self.miner.add_log_message(log_message)
-        return result["template_mined"]
+        return self._mine(log_message)["template_mined"]
+
+    def mine_template_with_id(self, log_message: str) -> Tuple[str, str]:
+        """
+        Same as mine_template, but also returns the Drain cluster ID
+        so events can be grouped by template even as the template text evolves.
+        """
+        result = self._mine(log_message)
+        return str(result["cluster_id"]), result["template_mined"]
 
     def get_total_clusters(self) -> int:
         return len(self.miner.drain.clusters)
 
     def save_state(self):
-        """Saves the current state to disk."""
-        import pickle
-        # Convert clusters to list if it's a view, then pickle
-        state = pickle.dumps(list(self.miner.drain.clusters))
-        self.persistence.save_state(state)
+        """Writes a full snapshot to disk (atomically) and resets the change journal."""
+        with self._lock:
+            self.state.snapshot(self.miner.drain)
+
+    def close(self):
+        """Snapshots pending changes and releases the writer lease."""
+        with self._lock:
+            self.state.close(self.miner.drain)
@@ -1,20 +1,19 @@
 import sys
 import os
-import shutil
+import tempfile
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
 from shared.utils.template_miner import LogTemplateMiner
 
-def test_drain3_mining():
+def test_drain3_mining(tmp_path):
     print("🧪 Testing Drain3 Integration...")
     
-    # Cleanup old state
-    if os.path.exists("data/test_drain3_state.bin"):
-        os.remove("data/test_drain3_state.bin")
+    # Fresh state: the snapshot, its .journal and its .lock all live in a throwaway directory
+    state_file = os.path.join(str(tmp_path), "test_drain3_state.bin")
 
-    miner = LogTemplateMiner(persistence_file="data/test_drain3_state.bin", sim_th=0.5)
+    miner = LogTemplateMiner(persistence_file=state_file, sim_th=0.5)
     
     logs = [
         "Payment processed for user_id=101 amount=50.00",
@@ -41,11 +40,14 @@ def test_drain3_mining():
         
     # Verify Persistence
     print("\n💾 Verifying Persistence...")
-    miner2 = LogTemplateMiner(persistence_file="data/test_drain3_state.bin")
+    miner.close()
+    miner2 = LogTemplateMiner(persistence_file=state_file)
     if miner2.get_total_clusters() == 2:
         print("✅ SUCCESS: State loaded correctly.")
     else:
         print("❌ FAILURE: State failed to load.")
+    miner2.close()
 
 if __name__ == "__main__":
-    test_drain3_mining()
+    with tempfile.TemporaryDirectory() as workdir:
+        test_drain3_mining(workdir)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from scripts.generate_corpus import generate_corpus
+from shared.utils.log_parser import LogParser
+from shared.utils.pii_masker import PIIMasker
+
+def read_corpus(directory):
+    return {name: open(os.path.join(directory, name), "rb").read() for name in sorted(os.listdir(directory))}
+
+def test_corpus_is_seeded_and_independent_of_workers(tmp_path):
+    stats = generate_corpus(str(tmp_path / "a"), megabytes=1, seed=7, templates=50)
+    generate_corpus(str(tmp_path / "b"), megabytes=1, seed=7, templates=50, workers=2)
+    generate_corpus(str(tmp_path / "c"), megabytes=1, seed=8, templates=50)
+    first = read_corpus(tmp_path / "a")
+    assert first == read_corpus(tmp_path / "b") != read_corpus(tmp_path / "c")
+    assert sorted(first) == ["corpus-json-000.jsonl", "corpus-nginx-000.log",
+                             "corpus-standard-000.log", "corpus-syslog-000.log"]
+    assert stats["bytes"] == sum(map(len, first.values())) >= 1024 * 1024
+
+def test_every_format_parses_and_pii_is_present(tmp_path):
+    generate_corpus(str(tmp_path), megabytes=1, seed=1, pii_density=0.2)
+    parser, masker = LogParser(), PIIMasker()
+    for name, data in read_corpus(tmp_path).items():
+        lines = data.decode().splitlines()[:2000]
+        parsed = [parser.parse(line) for line in lines]
+        assert not any(p["context"].get("parse_error") for p in parsed if isinstance(p.get("context"), dict)), name
+        masked = sum(masker.mask_text(line) != line for line in lines)
+        # nginx carries a client IP on every line; the others on about pii_density of them
+        assert masked == len(lines) if "nginx" in name else 0.1 < masked / len(lines) < 0.3, name